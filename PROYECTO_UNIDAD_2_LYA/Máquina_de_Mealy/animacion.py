@@ -0,0 +1,110 @@
+# animacion.py
+import collections
+
+from definiciones import DURACION_CAIDA_MS, INTERVALO_CUADRO_MS
+
+# -----------------------------
+# Animaciones sobre items de un Canvas
+# -----------------------------
+# Los items se crean una sola vez; en cada cuadro solo se mueven con canvas.move
+# La hora sale del reloj de los temporizadores (real con Tk, virtual en simulaciones)
+# La posición depende del tiempo transcurrido, no de cuántos cuadros se dibujaron:
+# si Tk se atrasa, la animación se salta cuadros pero termina a tiempo y en el lugar correcto
+# Cada cuadro se programa contra un reloj fijo (inicio + k * intervalo), así el atraso no se acumula
+#
+# Estadísticas por animación (estadisticas()):
+#   cuadros dibujados, fps logrados, peor cuadro (ms entre dos cuadros), cuadros perdidos
+#   (un intervalo de 2.5 cuadros cuenta como 1 perdido, etc.)
+# Las de las últimas animaciones quedan en ULTIMAS para revisarlas cuando la UI se siente lenta
+
+ULTIMAS = collections.deque(maxlen=20)
+
+
+class EstadisticasCuadros:
+    def __init__(self, intervalo_ms):
+        self.intervalo = intervalo_ms
+        self.cuadros = 0
+        self.perdidos = 0
+        self.peor = 0.0
+        self._primero = None
+        self._ultimo = None
+
+    def marcar(self, ahora):
+        if self._ultimo is not None:
+            delta = ahora - self._ultimo
+            self.peor = max(self.peor, delta)
+            self.perdidos += max(0, round(delta / self.intervalo) - 1)
+        else:
+            self._primero = ahora
+        self._ultimo = ahora
+        self.cuadros += 1
+
+    def resumen(self):
+        duracion = (self._ultimo - self._primero) if self.cuadros > 1 else 0.0
+        return {
+            "cuadros": self.cuadros,
+            "fps": (self.cuadros - 1) * 1000 / duracion if duracion else 0.0,
+            "peor_ms": self.peor,
+            "perdidos": self.perdidos,
+            "duracion_ms": duracion,
+        }
+
+
+# AnimacionLineal(temporizadores, canvas, items, dx, dy, duracion_ms, intervalo_ms, al_terminar, nombre)
+# Mueve 'items' (ya creados) un total de (dx, dy) píxeles en 'duracion_ms'
+# Cada cuadro es el temporizador 'nombre' (una animación nueva con el mismo nombre reemplaza a la anterior)
+# al_terminar() corre en el hilo de Tk cuando los items llegan al destino
+
+class AnimacionLineal:
+    def __init__(self, temporizadores, canvas, items, dx=0, dy=0, duracion_ms=DURACION_CAIDA_MS,
+                 intervalo_ms=INTERVALO_CUADRO_MS, al_terminar=None, nombre="animacion"):
+        self.temporizadores = temporizadores
+        self.nombre = nombre
+        self.canvas = canvas
+        self.items = list(items)
+        self.dx = dx
+        self.dy = dy
+        self.reloj = temporizadores.reloj
+        self.duracion = duracion_ms
+        self.intervalo = intervalo_ms
+        self.al_terminar = al_terminar
+        self.stats = EstadisticasCuadros(intervalo_ms)
+        self._hecho = (0, 0)   # desplazamiento ya aplicado (entero: coords de Tk)
+        self._inicio = None
+        self._k = 0
+
+    def iniciar(self):
+        self._inicio = self.reloj.ahora_ms()
+        self._k = 0
+        self._cuadro()
+        return self
+
+    def cancelar(self):
+        self.temporizadores.cancelar(self.nombre)
+
+    def _cuadro(self):
+        ahora = self.reloj.ahora_ms()
+        self.stats.marcar(ahora)
+
+        progreso = min(1.0, (ahora - self._inicio) / self.duracion) if self.duracion else 1.0
+        objetivo = (round(self.dx * progreso), round(self.dy * progreso))
+        mover_x = objetivo[0] - self._hecho[0]
+        mover_y = objetivo[1] - self._hecho[1]
+        if mover_x or mover_y:
+            for item in self.items:
+                self.canvas.move(item, mover_x, mover_y)
+            self._hecho = objetivo
+
+        if progreso >= 1.0:
+            ULTIMAS.append(self.stats.resumen())
+            if self.al_terminar:
+                self.al_terminar()
+            return
+
+        # siguiente cuadro en el reloj fijo; si ya se pasó, saltar al próximo que todavía no llega
+        self._k = max(self._k + 1, int((ahora - self._inicio) / self.intervalo) + 1)
+        espera = self._inicio + self._k * self.intervalo - self.reloj.ahora_ms()
+        self.temporizadores.programar(self.nombre, max(1, espera), self._cuadro)
+
+    def estadisticas(self):
+        return self.stats.resumen()
@@ -0,0 +1,54 @@
+# arranque.py
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# -----------------------------
+# Medición del arranque (opcional)
+# -----------------------------
+# Cuánto tarda main.py en mostrar una ventana usable, por etapas, en segundos desde la primera línea de main.py:
+#   importaciones:    terminaron los import de main.py (tkinter, interfaz, máquina; PIL y graphviz ya no)
+#   ventana:          VendingMachineApp construida (widgets creados, todavía sin dibujar)
+#   primera_pintura:  la pantalla principal ya se dibujó (VendingMachineApp.al_primera_pintura)
+#   miniaturas:       la última miniatura de producto quedó en su tarjeta (llegan después de la primera pintura)
+#
+# Activación: python main.py --medir-arranque
+# Al llegar las miniaturas (o a los 'limite_s' segundos) se cierra la ventana y se imprime una línea JSON;
+# benchmark.py la usa para seguir el arranque entre versiones
+# Durante la medición el journal es un archivo vacío en un temporal: no se recupera ni se ensucia el real
+
+class MedicionArranque:
+    def __init__(self, inicio, importado):
+        self.inicio = inicio
+        self.marcas = {"importaciones": importado - inicio}
+        self._carpeta = tempfile.mkdtemp(prefix="arranque_")
+        self.ruta_journal = os.path.join(self._carpeta, "journal.bin")
+
+    def marcar(self, etapa):
+        # Solo cuenta la primera vez que se alcanza cada etapa
+        self.marcas.setdefault(etapa, time.perf_counter() - self.inicio)
+
+    def seguir(self, app, al_terminar, limite_s=10, intervalo_ms=10):
+        # Marca la primera pintura y después espera a que no queden miniaturas pendientes
+        main = app.frames["PantallaMain"]
+        limite = time.perf_counter() + limite_s
+
+        def revisar():
+            if not main._miniaturas_pendientes:
+                self.marcar("miniaturas")
+            elif time.perf_counter() < limite:
+                app.root.after(intervalo_ms, revisar)
+                return
+            al_terminar()
+
+        def pintada():
+            self.marcar("primera_pintura")
+            revisar()
+
+        app.al_primera_pintura(pintada)
+
+    def reportar(self):
+        shutil.rmtree(self._carpeta, ignore_errors=True)
+        print(json.dumps({etapa: round(s, 6) for etapa, s in self.marcas.items()}), flush=True)
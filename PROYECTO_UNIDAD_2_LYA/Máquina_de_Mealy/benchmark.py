@@ -0,0 +1,780 @@
+# benchmark.py
+import argparse
+import contextlib
+import copy
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import maquina
+from definiciones import Input, Output, PRODUCTOS
+from especificacion import compilar_tabla
+from maquina import MaquinaDispensadoraMealy
+from salidas_headless import funciones_nulas, funciones_inertes
+
+# -----------------------------
+# Micro-benchmarks de las rutas calientes de la máquina
+# -----------------------------
+# Cada benchmark es una función que recibe el número de repeticiones y
+# regresa (cantidad de operaciones, segundos transcurridos)
+# Uso: python benchmark.py [--filtro texto] [--rondas N] [--json resultados.json] [--baseline base.json]
+# Todo corre sin red; los de Tk usan un Xvfb propio si no hay DISPLAY (ver display_virtual)
+
+# Secuencias de entrada con guion fijo (compra completa, cancelación y errores)
+COMPRA = [
+    (Input.LETRA, "A"), (Input.NUMERO, "1"),
+    (Input.INSERT_10, None), (Input.INSERT_5, None),
+    (Input.CONFIRMAR, None),
+]
+CANCELACION = [
+    (Input.LETRA, "B"), (Input.NUMERO, "2"),
+    (Input.INSERT_5, None), (Input.CANCELAR, None),
+]
+ERRORES = [
+    (Input.LETRA, "Z"), (Input.NUMERO, "3"),
+    (Input.INSERT_1, None), (Input.CONFIRMAR, None),
+]
+
+
+def _medir_secuencias(secuencias, repeticiones):
+    # Stock "infinito" durante la medición; se restaura al final
+    stock_original = {code: prod["stock"] for code, prod in PRODUCTOS.items()}
+    for prod in PRODUCTOS.values():
+        prod["stock"] = 10**9
+
+    # Máquina en modo headless: solo se mide la lógica de transición
+    m = MaquinaDispensadoraMealy(funciones_nulas)
+    procesar = m.procesar_entrada
+    eventos = sum(len(s) for s in secuencias) * repeticiones
+    try:
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            for secuencia in secuencias:
+                for entrada, valor in secuencia:
+                    procesar(entrada, valor)
+                m._reset()
+        dt = time.perf_counter() - t0
+    finally:
+        for code, stock in stock_original.items():
+            PRODUCTOS[code]["stock"] = stock
+    return eventos, dt
+
+
+def bench_procesar_entrada(repeticiones=50_000):
+    return _medir_secuencias([COMPRA, CANCELACION, ERRORES], repeticiones)
+
+
+# Misma medición con la tabla compilada sin contadores de transiciones (contar=False):
+# la diferencia con "procesar_entrada" es lo que cuesta el mapa de calor
+def bench_procesar_sin_contadores(repeticiones=50_000):
+    original = maquina._TRANSICIONES
+    maquina._TRANSICIONES = compilar_tabla(MaquinaDispensadoraMealy, contar=False)
+    try:
+        return _medir_secuencias([COMPRA, CANCELACION, ERRORES], repeticiones)
+    finally:
+        maquina._TRANSICIONES = original
+
+
+def catalogo_grande(letras="ABCDEFGH", segundas="XYZ", numeros=range(100, 400)):
+    # Catálogo de gabinete grande: códigos de dos letras y tres números (AX100..HZ399, 7,200 por omisión)
+    return {
+        f"{a}{b}{n}": {"nombre": f"Producto {a}{b}{n}", "precio": 15, "stock": 10**9}
+        for a in letras for b in segundas for n in numeros
+    }
+
+
+def bench_procesar_catalogo_grande(repeticiones=20_000):
+    # Compra y cancelación tecleando códigos de 5 caracteres: cada tecla se valida en el trie del catálogo
+    # Comparar con "procesar_entrada": el costo por evento no debe crecer con el tamaño del catálogo
+    m = MaquinaDispensadoraMealy(funciones_nulas, productos=catalogo_grande())
+    compra = [(Input.LETRA, "H"), (Input.LETRA, "Z"), (Input.NUMERO, "3"), (Input.NUMERO, "9"),
+              (Input.NUMERO, "9"), (Input.INSERT_10, None), (Input.INSERT_5, None), (Input.CONFIRMAR, None)]
+    cancelacion = [(Input.LETRA, "A"), (Input.LETRA, "X"), (Input.NUMERO, "1"), (Input.NUMERO, "0"),
+                   (Input.NUMERO, "0"), (Input.INSERT_5, None), (Input.CANCELAR, None)]
+    procesar = m.procesar_entrada
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        for secuencia in (compra, cancelacion):
+            for entrada, valor in secuencia:
+                procesar(entrada, valor)
+            m._reset()
+    dt = time.perf_counter() - t0
+    return (len(compra) + len(cancelacion)) * repeticiones, dt
+
+
+# Payload típico de cada salida (los que arma maquina.py)
+PAYLOADS = {
+    Output.SHOW_CODE: None,
+    Output.SHOW_PRICE: {"nombre": "Coca-Cola", "precio": 15},
+    Output.UPDATE_TOTAL: 15,
+    Output.DELIVER: {"nombre": "Coca-Cola", "precio": 15, "cambio": 5},
+    Output.RETURN_CHANGE: 5,
+    Output.SHOW_MESSAGE: "Faltan $5",
+    Output.SHOW_CHANGE: 5,
+}
+
+
+def _medir_emit(salida, repeticiones=500_000, suscriptores=0):
+    # Costo de MaquinaDispensadoraMealy._emit con handlers vacíos (solo el despacho)
+    m = MaquinaDispensadoraMealy(funciones_inertes)
+    for _ in range(suscriptores):
+        m.suscribir(salida, lambda machine, payload=None: None)
+    emit = m._emit
+    payload = PAYLOADS[salida]
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        emit(salida, payload)
+    return repeticiones, time.perf_counter() - t0
+
+
+def bench_flujos_virtuales(compras=5_000):
+    # Compras completas por segundo con reloj virtual: selección, monedas, confirmar, animación,
+    # paso a PantallaGrafo y reset; cada 4ª compra se abandona y la cancela el temporizador de inactividad
+    from reloj import RelojVirtual
+    from salidas_headless import SalidasTemporizadas
+    from temporizadores import Temporizadores
+
+    reloj = RelojVirtual()
+    temporizadores = Temporizadores(reloj)
+    salidas = SalidasTemporizadas(temporizadores)
+    catalogo = copy.deepcopy(PRODUCTOS)
+    for prod in catalogo.values():
+        prod["stock"] = 10**9
+    m = MaquinaDispensadoraMealy(salidas.funciones, productos=catalogo)
+    m.temporizadores = temporizadores
+
+    t0 = time.perf_counter()
+    for k in range(compras):
+        m.procesar_entrada(Input.LETRA, "A")
+        m.procesar_entrada(Input.NUMERO, "1")
+        m.procesar_entrada(Input.INSERT_10)
+        m.procesar_entrada(Input.INSERT_5)
+        if k % 4 != 3:
+            m.procesar_entrada(Input.CONFIRMAR)
+        reloj.correr()
+    dt = time.perf_counter() - t0
+    assert salidas.entregas + salidas.devoluciones == compras
+    return compras, dt
+
+
+def bench_flota_vectorizada(maquinas=10_000, pasos=100):
+    # Operaciones = máquinas-pasos (requiere numpy)
+    from flota_vectorizada import FlotaVectorizada, generar_entradas
+    flota = FlotaVectorizada(maquinas)
+    flota.ejecutar(generar_entradas(maquinas, pasos))
+    return flota.pasos_maquina, flota.segundos
+
+
+def _medir_journal(politica, eventos=20_000, **opciones):
+    # Entradas por segundo anexadas al journal con una política de fsync (archivo temporal)
+    from journal import Journal
+
+    carpeta = tempfile.mkdtemp(prefix="bench_journal_")
+    ruta = os.path.join(carpeta, "journal.bin")
+    secuencia = COMPRA + CANCELACION
+    j = Journal(ruta, PRODUCTOS, politica=politica, **opciones)
+    try:
+        t0 = time.perf_counter()
+        for k in range(eventos):
+            entrada, valor = secuencia[k % len(secuencia)]
+            j.registrar_entrada(entrada, valor)
+        j.cerrar()
+        dt = time.perf_counter() - t0
+    finally:
+        j.cerrar()
+        os.remove(ruta)
+        os.rmdir(carpeta)
+    return eventos, dt
+
+
+def bench_journal_evento():
+    return _medir_journal("evento", eventos=2_000)
+
+
+def bench_journal_lote():
+    return _medir_journal("lote", cada_n=64)
+
+
+def bench_journal_intervalo():
+    return _medir_journal("intervalo", intervalo=0.05)
+
+
+def bench_reproduccion(eventos=100_000):
+    # Eventos por segundo al indexar un journal sintético (reproducción completa + puntos de control)
+    from reproduccion import Reproductor, generar_journal
+
+    carpeta = tempfile.mkdtemp(prefix="bench_reproduccion_")
+    ruta = os.path.join(carpeta, "journal.bin")
+    try:
+        generar_journal(ruta, eventos)
+        r = Reproductor(ruta, guardar_puntos=False)
+        t0 = time.perf_counter()
+        total = r.indexar()
+        dt = time.perf_counter() - t0
+    finally:
+        os.remove(ruta)
+        os.rmdir(carpeta)
+    return total, dt
+
+
+# -----------------------------
+# Interfaz: miniaturas, refresh_products, grafo
+# -----------------------------
+# Estos benchmarks usan los archivos reales de IMG/ y la especificación real del grafo
+# Las cachés en disco (miniaturas y renders) se redirigen a carpetas temporales: "frío" empieza siempre
+# sin nada guardado y una corrida no ensucia las cachés de la aplicación ni depende de ellas
+# Los que crean widgets necesitan un display; sin él (y sin Xvfb) se reportan como omitidos
+# Los que solo usan PIL o Graphviz corren en cualquier máquina
+
+class Omitido(Exception):
+    # El benchmark no puede correr aquí (sin display, sin 'dot'...); main() lo reporta y sigue
+    pass
+
+
+@contextlib.contextmanager
+def _miniaturas_temporales():
+    # interfaz_usuario.MINIATURAS apunta a una caché nueva con la carpeta de disco en un temporal
+    import interfaz_usuario
+    from miniaturas import CacheMiniaturas
+
+    carpeta = tempfile.mkdtemp(prefix="bench_miniaturas_")
+    original = interfaz_usuario.MINIATURAS
+    interfaz_usuario.MINIATURAS = CacheMiniaturas(dir_cache=carpeta)
+    try:
+        yield carpeta
+    finally:
+        interfaz_usuario.MINIATURAS = original
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def _codigos_con_imagen():
+    from miniaturas import CacheMiniaturas
+    cache = CacheMiniaturas()
+    codigos = [code for code in sorted(PRODUCTOS) if cache.firma(code) is not None]
+    if not codigos:
+        raise Omitido("no hay imágenes en IMG/")
+    return codigos
+
+
+def _vaciar(carpeta):
+    for nombre in os.listdir(carpeta):
+        os.remove(os.path.join(carpeta, nombre))
+
+
+def _raiz():
+    # Ventana de Tk oculta; Omitido si no hay display
+    import tkinter as tk
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        raise Omitido("sin display (instale Xvfb o defina DISPLAY)")
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise Omitido(f"Tk no pudo abrir el display: {e}")
+    root.withdraw()
+    return root
+
+
+def _medir_preparar_miniatura(repeticiones, frio):
+    # Operaciones = miniaturas preparadas (PIL, sin widgets)
+    # frío: se decodifica y escala el original; disco: se lee el PNG ya escalado de la caché en disco
+    import interfaz_usuario
+    from miniaturas import CacheMiniaturas
+
+    codigos = _codigos_con_imagen()
+    with _miniaturas_temporales() as carpeta:
+        for code in codigos:
+            interfaz_usuario.preparar_miniatura(code)
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            # caché nueva en cada vuelta: sin rutas ni fotos en memoria
+            interfaz_usuario.MINIATURAS = CacheMiniaturas(dir_cache=carpeta)
+            if frio:
+                _vaciar(carpeta)
+            for code in codigos:
+                interfaz_usuario.preparar_miniatura(code)
+        dt = time.perf_counter() - t0
+    return repeticiones * len(codigos), dt
+
+
+def bench_preparar_miniatura_frio(repeticiones=5):
+    return _medir_preparar_miniatura(repeticiones, frio=True)
+
+
+def bench_preparar_miniatura_disco(repeticiones=100):
+    return _medir_preparar_miniatura(repeticiones, frio=False)
+
+
+def _medir_cargar_imagen_producto(repeticiones, frio):
+    # Operaciones = PhotoImage obtenidas con cargar_imagen_producto (requiere display)
+    # frío: decodificar + escalar + PhotoImage; memoria: la foto ya está en la caché de nivel 1
+    import interfaz_usuario
+    from miniaturas import CacheMiniaturas
+
+    codigos = _codigos_con_imagen()
+    root = _raiz()
+    try:
+        with _miniaturas_temporales() as carpeta:
+            for code in codigos:
+                interfaz_usuario.cargar_imagen_producto(code)
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                if frio:
+                    interfaz_usuario.MINIATURAS = CacheMiniaturas(dir_cache=carpeta)
+                    _vaciar(carpeta)
+                for code in codigos:
+                    interfaz_usuario.cargar_imagen_producto(code)
+            dt = time.perf_counter() - t0
+    finally:
+        root.destroy()
+    return repeticiones * len(codigos), dt
+
+
+def bench_cargar_imagen_producto_frio(repeticiones=5):
+    return _medir_cargar_imagen_producto(repeticiones, frio=True)
+
+
+def bench_cargar_imagen_producto_memoria(repeticiones=20_000):
+    return _medir_cargar_imagen_producto(repeticiones, frio=False)
+
+
+def _medir_refresh_products(repeticiones, todo_cambio, productos=PRODUCTOS):
+    # Operaciones = llamadas a PantallaMain.refresh_products con la app completa (requiere display)
+    # Las miniaturas se cargan antes de crear la app, así refresh_products no manda trabajo al ejecutor
+    # sin cambios: ninguna versión del inventario cambió (el caso de cada evento)
+    # todo cambió: se olvida lo que muestran las tarjetas visibles y se vuelven a configurar todas
+    # Con el catálogo grande solo hay tarjetas para lo visible: el costo debe ser el mismo que con 16
+    import interfaz_usuario
+    import salidas
+
+    root = _raiz()
+    app = None
+    try:
+        with _miniaturas_temporales():
+            for code in PRODUCTOS:
+                interfaz_usuario.cargar_imagen_producto(code)
+            m = MaquinaDispensadoraMealy(funciones_nulas, productos=copy.deepcopy(productos))
+            app = interfaz_usuario.VendingMachineApp(root, m)
+            root.update_idletasks()
+            main = app.frames["PantallaMain"]
+            refresh = main.refresh_products
+            refresh()
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                if todo_cambio:
+                    main.grilla.invalidar()
+                refresh()
+            dt = time.perf_counter() - t0
+    finally:
+        if app is not None:
+            app.ejecutor.cerrar()
+        salidas.set_app(None)
+        root.destroy()
+    return repeticiones, dt
+
+
+def bench_refresh_products(repeticiones=20_000):
+    return _medir_refresh_products(repeticiones, todo_cambio=False)
+
+
+def bench_refresh_products_todo(repeticiones=2_000):
+    return _medir_refresh_products(repeticiones, todo_cambio=True)
+
+
+def bench_refresh_products_grande(repeticiones=20_000):
+    return _medir_refresh_products(repeticiones, todo_cambio=False, productos=catalogo_grande())
+
+
+def bench_refresh_products_grande_todo(repeticiones=2_000):
+    return _medir_refresh_products(repeticiones, todo_cambio=True, productos=catalogo_grande())
+
+
+def _medir_construir_app(repeticiones, productos):
+    # Operaciones = VendingMachineApp completas construidas y dibujadas (update_idletasks), con la grilla
+    # de productos; cada una con su raíz (crearla no se mide). Con 16 o con 7,200 productos deben tardar lo mismo
+    import interfaz_usuario
+    import salidas
+
+    dt = 0.0
+    with _miniaturas_temporales():
+        for _ in range(repeticiones):
+            m = MaquinaDispensadoraMealy(funciones_nulas, productos=copy.deepcopy(productos))
+            root = _raiz()
+            app = None
+            try:
+                t0 = time.perf_counter()
+                app = interfaz_usuario.VendingMachineApp(root, m)
+                root.update_idletasks()
+                dt += time.perf_counter() - t0
+            finally:
+                if app is not None:
+                    app.ejecutor.cerrar()
+                salidas.set_app(None)
+                root.destroy()
+    return repeticiones, dt
+
+
+def bench_construir_app(repeticiones=10):
+    return _medir_construir_app(repeticiones, PRODUCTOS)
+
+
+def bench_construir_app_grande(repeticiones=10):
+    return _medir_construir_app(repeticiones, catalogo_grande())
+
+
+def bench_desplazar_grilla(repeticiones=2_000):
+    # Operaciones = pasos de scroll (una fila) por la grilla del catálogo grande, reciclando tarjetas
+    import interfaz_usuario
+    import salidas
+
+    root = _raiz()
+    app = None
+    try:
+        with _miniaturas_temporales():
+            m = MaquinaDispensadoraMealy(funciones_nulas, productos=catalogo_grande())
+            app = interfaz_usuario.VendingMachineApp(root, m)
+            root.update_idletasks()
+            grilla = app.frames["PantallaMain"].grilla
+            t0 = time.perf_counter()
+            for i in range(repeticiones):
+                grilla.canvas.yview_scroll(1 if (i // 500) % 2 == 0 else -1, "units")
+                root.update_idletasks()
+            dt = time.perf_counter() - t0
+    finally:
+        if app is not None:
+            app.ejecutor.cerrar()
+        salidas.set_app(None)
+        root.destroy()
+    return repeticiones, dt
+
+
+def _medir_grafo(repeticiones, frio):
+    # Operaciones = llamadas a salidas.generar_grafo_png (requiere graphviz y el ejecutable 'dot')
+    # frío: caché de renders vacía (memoria y disco), se ejecuta 'dot'; caliente: acierto en memoria
+    # En los dos casos el DOT ya está armado (fuente_dot y _grafo_estados se cachean por proceso)
+    import cache_render
+    import salidas
+
+    if salidas._graphviz() is None:
+        raise ImportError("graphviz no disponible")
+    if shutil.which("dot") is None:
+        raise Omitido("'dot' no está en el PATH")
+
+    carpeta = tempfile.mkdtemp(prefix="bench_grafo_")
+    dir_original = cache_render.DIR_CACHE
+    cache_render.DIR_CACHE = carpeta
+    cache_render.limpiar_memoria()
+    try:
+        if salidas.generar_grafo_png() is None:
+            raise Omitido("Graphviz no pudo generar el PNG")
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            if frio:
+                cache_render.limpiar_memoria()
+                _vaciar(carpeta)
+            salidas.generar_grafo_png()
+        dt = time.perf_counter() - t0
+    finally:
+        cache_render.DIR_CACHE = dir_original
+        cache_render.limpiar_memoria()
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return repeticiones, dt
+
+
+def bench_grafo_frio(repeticiones=5):
+    return _medir_grafo(repeticiones, frio=True)
+
+
+def bench_grafo_caliente(repeticiones=20_000):
+    return _medir_grafo(repeticiones, frio=False)
+
+
+# PNG con el tamaño de un render de grafo_estados a 800 dpi (elipses, flechas y texto sobre blanco)
+# Se dibuja con PIL para que la medición no dependa de tener 'dot' ni de su versión
+TAMANO_GRAFO = (6400, 2400)
+
+
+def _png_grafo(carpeta):
+    from PIL import Image, ImageDraw
+
+    ancho, alto = TAMANO_GRAFO
+    img = Image.new("RGB", TAMANO_GRAFO, "white")
+    dibujo = ImageDraw.Draw(img)
+    for i, color in enumerate(("lightblue", "lightgreen", "yellow")):
+        x = 400 + i * 2200
+        dibujo.ellipse((x, alto // 3, x + 1400, 2 * alto // 3), fill=color, outline="black", width=12)
+        for k in range(12):
+            y = 80 + k * 190
+            dibujo.line((x + 1400, alto // 2, x + 2200, y), fill="#444444", width=8)
+            dibujo.text((x + 1500, y), f"ENTRADA {k} [guarda] / SALIDA", fill="black")
+    ruta = os.path.join(carpeta, "grafo_estados.png")
+    img.save(ruta, format="PNG")
+    return ruta
+
+
+def bench_preparar_imagen_grafo(repeticiones=3):
+    # Operaciones = PantallaGrafo.preparar_imagen (abrir + redimensionar con PIL, sin widgets)
+    from pantalla_grafo import PantallaGrafo
+
+    carpeta = tempfile.mkdtemp(prefix="bench_pantalla_grafo_")
+    try:
+        ruta = _png_grafo(carpeta)
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            PantallaGrafo.preparar_imagen(ruta)
+        dt = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return repeticiones, dt
+
+
+def bench_cargar_imagen_grafo(repeticiones=3):
+    # Operaciones = PantallaGrafo.cargar_imagen completa (PIL + PhotoImage + Label; requiere display)
+    from pantalla_grafo import PantallaGrafo
+
+    carpeta = tempfile.mkdtemp(prefix="bench_pantalla_grafo_")
+    root = _raiz()
+    try:
+        ruta = _png_grafo(carpeta)
+        pantalla = PantallaGrafo(root, app=None)
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            pantalla.cargar_imagen(ruta)
+        dt = time.perf_counter() - t0
+        if getattr(pantalla, "img_tk", None) is None:
+            raise Omitido("cargar_imagen no mostró la imagen")
+    finally:
+        root.destroy()
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return repeticiones, dt
+
+
+
+# -----------------------------
+# Arranque
+# -----------------------------
+# Cada medición es un proceso nuevo (nada cacheado en memoria); operaciones = arranques
+# importar main: solo los import de main.py, sin crear la ventana (no necesita display)
+# primera pintura: python main.py --medir-arranque hasta que la pantalla principal se dibujó (ver arranque.py)
+
+def _correr_python(*args, timeout=60):
+    # Última línea de stdout de un intérprete nuevo en la carpeta del proyecto (sin métricas ni trazas)
+    entorno = {k: v for k, v in os.environ.items() if k not in ("MEALY_METRICAS", "MEALY_TRAZA")}
+    proceso = subprocess.run([sys.executable, *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             env=entorno, capture_output=True, text=True, timeout=timeout)
+    lineas = proceso.stdout.strip().splitlines()
+    if proceso.returncode != 0 or not lineas:
+        error = proceso.stderr.strip().splitlines()
+        raise Omitido(f"{args[0]} falló: {error[-1] if error else proceso.returncode}")
+    return lineas[-1]
+
+
+def bench_importar_main(repeticiones=5):
+    total = 0.0
+    for _ in range(repeticiones):
+        total += float(_correr_python(
+            "-c", "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"))
+    return repeticiones, total
+
+
+def bench_primera_pintura(repeticiones=3):
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        raise Omitido("sin display (instale Xvfb o defina DISPLAY)")
+    total = 0.0
+    for _ in range(repeticiones):
+        total += json.loads(_correr_python("main.py", "--medir-arranque"))["primera_pintura"]
+    return repeticiones, total
+
+
+BENCHMARKS = {
+    "procesar_entrada": bench_procesar_entrada,
+    "procesar_entrada sin contadores": bench_procesar_sin_contadores,
+    "procesar_entrada catálogo de 7,200": bench_procesar_catalogo_grande,
+    **{f"emit {salida.name}": (lambda s=salida: _medir_emit(s)) for salida in Output},
+    "emit SHOW_MESSAGE +2 suscriptores": lambda: _medir_emit(Output.SHOW_MESSAGE, suscriptores=2),
+    "compras completas (reloj virtual)": bench_flujos_virtuales,
+    "flota_vectorizada": bench_flota_vectorizada,
+    "journal (fsync por evento)": bench_journal_evento,
+    "journal (fsync cada 64)": bench_journal_lote,
+    "journal (fsync cada 50 ms)": bench_journal_intervalo,
+    "reproduccion de journal": bench_reproduccion,
+    "preparar_miniatura (frío)": bench_preparar_miniatura_frio,
+    "preparar_miniatura (disco)": bench_preparar_miniatura_disco,
+    "cargar_imagen_producto (frío)": bench_cargar_imagen_producto_frio,
+    "cargar_imagen_producto (memoria)": bench_cargar_imagen_producto_memoria,
+    "refresh_products (sin cambios)": bench_refresh_products,
+    "refresh_products (todo cambió)": bench_refresh_products_todo,
+    "refresh_products catálogo de 7,200 (sin cambios)": bench_refresh_products_grande,
+    "refresh_products catálogo de 7,200 (todo cambió)": bench_refresh_products_grande_todo,
+    "construir VendingMachineApp": bench_construir_app,
+    "construir VendingMachineApp catálogo de 7,200": bench_construir_app_grande,
+    "desplazar grilla catálogo de 7,200": bench_desplazar_grilla,
+    "generar_grafo_png (frío)": bench_grafo_frio,
+    "generar_grafo_png (caliente)": bench_grafo_caliente,
+    "PantallaGrafo.preparar_imagen": bench_preparar_imagen_grafo,
+    "PantallaGrafo.cargar_imagen": bench_cargar_imagen_grafo,
+    "arranque: importar main": bench_importar_main,
+    "arranque: primera pintura": bench_primera_pintura,
+}
+
+
+# -----------------------------
+# Display virtual
+# -----------------------------
+# En Linux sin DISPLAY (servidor de CI, contenedor, SSH) se levanta un Xvfb propio para los benchmarks
+# con widgets y se apaga al terminar; si ya hay DISPLAY, o no es Linux, no se hace nada
+# Sin Xvfb instalado los benchmarks de Tk se reportan como omitidos
+
+@contextlib.contextmanager
+def display_virtual(resolucion="1280x1024x24"):
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        yield os.environ.get("DISPLAY")
+        return
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        yield None
+        return
+
+    numero = next(n for n in range(99, 200)
+                  if not os.path.exists(f"/tmp/.X{n}-lock") and not os.path.exists(f"/tmp/.X11-unix/X{n}"))
+    proceso = subprocess.Popen([xvfb, f":{numero}", "-screen", "0", resolucion, "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        limite = time.monotonic() + 10
+        while (not os.path.exists(f"/tmp/.X11-unix/X{numero}") and proceso.poll() is None
+               and time.monotonic() < limite):
+            time.sleep(0.05)
+        if proceso.poll() is not None or not os.path.exists(f"/tmp/.X11-unix/X{numero}"):
+            print("[benchmark] Xvfb no arrancó; se omiten los benchmarks de Tk")
+            yield None
+            return
+        os.environ["DISPLAY"] = f":{numero}"
+        try:
+            yield os.environ["DISPLAY"]
+        finally:
+            del os.environ["DISPLAY"]
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(5)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+# -----------------------------
+# Resultados en JSON y comparación con una línea base
+# -----------------------------
+# --json ruta:      guarda los resultados (eventos/s de cada benchmark, la mejor de --rondas corridas)
+#                   junto con el entorno (Python, plataforma, CPUs, commit) para saber qué se comparó
+# --baseline ruta:  un JSON guardado antes con --json; cada benchmark que baje más de --umbral
+#                   (10 % por omisión) se marca como REGRESIÓN y el proceso termina con código 1
+# Uso típico:
+#   python benchmark.py --rondas 3 --json baseline.json               (en la rama principal)
+#   python benchmark.py --rondas 3 --baseline baseline.json --json actual.json
+
+def _commit():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def entorno(display=None):
+    return {
+        "fecha": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementacion": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": _commit(),
+        "display": display,
+    }
+
+
+def correr(benchmarks, rondas=1):
+    # Regresa (resultados, omitidos); de cada benchmark se queda la ronda más rápida
+    resultados, omitidos = {}, {}
+    for nombre, bench in benchmarks.items():
+        try:
+            medidas = [bench() for _ in range(rondas)]
+        except (ImportError, Omitido) as e:
+            omitidos[nombre] = str(e)
+            print(f"{nombre:<34} omitido ({e})")
+            continue
+        ops, dt = max(medidas, key=lambda medida: medida[0] / medida[1])
+        resultados[nombre] = {
+            "ops": ops,
+            "segundos": round(dt, 6),
+            "por_segundo": ops / dt,
+            "rondas": [round(o / d, 1) for o, d in medidas],
+        }
+        print(f"{nombre:<34} {ops / dt:>14,.0f} eventos/s  ({ops} en {dt:.3f} s)")
+    return resultados, omitidos
+
+
+def comparar(resultados, baseline, umbral=0.10):
+    # Imprime el cambio de cada benchmark respecto a la línea base; regresa los nombres con regresión
+    regresiones = []
+    anteriores = baseline.get("resultados", {})
+    print()
+    print(f"{'comparación con la línea base':<34} {'antes':>14} {'ahora':>14} {'cambio':>8}")
+    for nombre, actual in resultados.items():
+        anterior = anteriores.get(nombre)
+        if anterior is None:
+            print(f"{nombre:<34} {'—':>14} {actual['por_segundo']:>14,.0f}      nuevo")
+            continue
+        cambio = actual["por_segundo"] / anterior["por_segundo"] - 1
+        marca = ""
+        if cambio < -umbral:
+            marca = "  REGRESIÓN"
+            regresiones.append(nombre)
+        print(f"{nombre:<34} {anterior['por_segundo']:>14,.0f} {actual['por_segundo']:>14,.0f} "
+              f"{cambio:>+8.1%}{marca}")
+    faltantes = len(anteriores.keys() - resultados.keys())
+    if faltantes:
+        print(f"({faltantes} benchmarks de la línea base no se midieron en esta corrida)")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas calientes de la máquina y la interfaz")
+    parser.add_argument("--filtro", help="solo los benchmarks cuyo nombre contiene este texto")
+    parser.add_argument("--rondas", type=int, default=1, help="corridas por benchmark (se reporta la mejor)")
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="caída relativa que cuenta como regresión")
+    args = parser.parse_args()
+
+    benchmarks = {nombre: bench for nombre, bench in BENCHMARKS.items()
+                  if not args.filtro or args.filtro.lower() in nombre.lower()}
+    with display_virtual() as display:
+        resultados, omitidos = correr(benchmarks, max(1, args.rondas))
+        info = entorno(display)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"entorno": info, "rondas": args.rondas, "resultados": resultados, "omitidos": omitidos},
+                      f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("entorno", {}).get("plataforma") != info["plataforma"]:
+            print("[benchmark] aviso: la línea base se midió en otra plataforma")
+        regresiones = comparar(resultados, baseline, args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresión(es) mayores a {args.umbral:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
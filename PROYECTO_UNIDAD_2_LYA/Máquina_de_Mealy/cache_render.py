@@ -0,0 +1,113 @@
+# cache_render.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# -----------------------------
+# Caché de renders de Graphviz
+# -----------------------------
+# La clave es un hash del código DOT y de las opciones de render (formato, motor)
+# Si el grafo no cambia, la clave tampoco: se regresa el archivo ya generado sin lanzar 'dot'
+# Si cambia cualquier nodo, arista o atributo, cambia el hash y se genera un archivo nuevo
+# Nivel 1: diccionario en memoria clave → ruta
+# Nivel 2: carpeta .cache_grafos/ junto a este archivo (sobrevive entre ejecuciones)
+# Los dos niveles tienen tope (LRU): el mapa de calor cambia con cada compra y cada versión es un
+# archivo nuevo; sin tope la memoria y la carpeta crecerían sin fin
+#   MAX_MEMORIA:  entradas del nivel 1; al pasarse se olvida la usada hace más tiempo
+#   MAX_ARCHIVOS: archivos del nivel 2; al escribir uno nuevo se borran los de uso más viejo
+#                 (el uso se marca con la fecha de modificación: un acierto en disco la actualiza)
+#
+# Hilos: renderizar_cacheado corre en el pool de EjecutorFondo (dos hilos)
+# _candado protege _memoria y _en_curso; un render de una clave que ya se está generando no lanza
+# otro 'dot': espera a que termine el primero y usa su archivo. El temporal lleva pid e hilo en el nombre
+
+DIR_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_grafos")
+MAX_MEMORIA = 32
+MAX_ARCHIVOS = 64
+
+_memoria = OrderedDict()
+_en_curso = {}      # clave → threading.Event del hilo que la está generando
+_candado = threading.Lock()
+
+
+def clave_render(fuente, formato="png", motor="dot"):
+    h = hashlib.sha256()
+    for parte in (motor, formato, fuente):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# renderizar_cacheado(grafo, nombre, formato)
+# grafo: objeto graphviz (Digraph/Graph)
+# nombre: prefijo legible del archivo en la caché (ej. "grafo_estados")
+# Regresa la ruta absoluta del archivo renderizado
+
+def renderizar_cacheado(grafo, nombre="grafo", formato="png"):
+    clave = clave_render(grafo.source, formato, grafo.engine)
+
+    while True:
+        with _candado:
+            ruta = _memoria.get(clave)
+            if ruta is not None and os.path.exists(ruta):
+                _memoria.move_to_end(clave)
+                return ruta
+            evento = _en_curso.get(clave)
+            if evento is None:
+                evento = _en_curso[clave] = threading.Event()
+                break
+        # otro hilo la está generando: esperar y volver a buscar (si falló, este hilo la intenta)
+        evento.wait()
+
+    try:
+        ruta = os.path.join(DIR_CACHE, f"{nombre}-{clave[:16]}.{formato}")
+        if os.path.exists(ruta):
+            _tocar(ruta)
+        else:
+            datos = grafo.pipe(format=formato)
+            os.makedirs(DIR_CACHE, exist_ok=True)
+            # escribir a un temporal y renombrar: nunca queda un PNG a medias en la caché
+            temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+            podar_disco()
+
+        with _candado:
+            _memoria[clave] = ruta
+            _memoria.move_to_end(clave)
+            while len(_memoria) > MAX_MEMORIA:
+                _memoria.popitem(last=False)
+        return ruta
+    finally:
+        with _candado:
+            del _en_curso[clave]
+        evento.set()
+
+
+def _tocar(ruta):
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+
+
+def podar_disco(maximo=None):
+    # Deja en DIR_CACHE solo los 'maximo' archivos usados más recientemente (los .tmp en curso no se tocan)
+    maximo = MAX_ARCHIVOS if maximo is None else maximo
+    try:
+        entradas = [e for e in os.scandir(DIR_CACHE) if e.is_file() and not e.name.endswith(".tmp")]
+    except OSError:
+        return
+    entradas.sort(key=lambda e: e.stat().st_mtime_ns, reverse=True)
+    for e in entradas[maximo:]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+def limpiar_memoria():
+    with _candado:
+        _memoria.clear()
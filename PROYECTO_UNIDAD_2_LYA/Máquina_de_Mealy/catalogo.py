@@ -0,0 +1,112 @@
+# catalogo.py
+import re
+
+from definiciones import Input, PRODUCTOS, VALOR_MONEDAS
+
+# -----------------------------
+# Catálogo de códigos de producto (trie de prefijos)
+# -----------------------------
+# Un código son letras seguidas de números: A1, B12, AB3... El teclado los arma tecla por tecla,
+# así que la pregunta en cada tecla es "¿lo que lleva escrito es el inicio de algún código?"
+# El trie responde eso recorriendo un nodo por carácter: O(largo del código) sin importar cuántos
+# productos haya (16 o miles), y sin listas fijas de letras o números en la máquina
+#
+# Reglas:
+#   - formato [A-Z]+[0-9]+ (mayúsculas); si no, ValueError
+#   - ningún código es prefijo de otro (A1 y A10 no pueden convivir): al completar un código se
+#     selecciona de inmediato, sin esperar una tecla más para saber si el código seguía
+#
+# nodo(prefijo):       nodo del trie o None si ningún código empieza así
+# es_prefijo(prefijo): algún código empieza así (incluye los códigos completos)
+# es_codigo(codigo):   el código existe completo
+# siguientes(prefijo): caracteres que pueden seguir (p. ej. para resaltar teclas)
+# codigos(prefijo):    los códigos que empiezan con 'prefijo', en orden
+# letras / numeros:    alfabeto del teclado (tuplas ordenadas con los caracteres que aparecen en los códigos)
+
+_FORMATO = re.compile(r"[A-Z]+[0-9]+")
+
+
+class _Nodo:
+    __slots__ = ("hijos", "codigo")
+
+    def __init__(self):
+        self.hijos = {}
+        self.codigo = None   # el código completo si aquí termina uno
+
+
+class Catalogo:
+    def __init__(self, codigos):
+        # codigos: iterable de códigos (un diccionario con la forma de PRODUCTOS sirve tal cual)
+        self._raiz = _Nodo()
+        self._total = 0
+        letras, numeros = set(), set()
+        for codigo in sorted(codigos):
+            if not isinstance(codigo, str) or not _FORMATO.fullmatch(codigo):
+                raise ValueError(f"[catalogo] código inválido: {codigo!r} (letras y luego números, p. ej. A1 o AB12)")
+            nodo = self._raiz
+            for caracter in codigo:
+                if nodo.codigo is not None:
+                    raise ValueError(f"[catalogo] el código {nodo.codigo} es prefijo de {codigo}")
+                nodo = nodo.hijos.setdefault(caracter, _Nodo())
+                (letras if caracter.isalpha() else numeros).add(caracter)
+            if nodo.hijos:
+                raise ValueError(f"[catalogo] el código {codigo} es prefijo de otro código")
+            nodo.codigo = codigo
+            self._total += 1
+        self.letras = tuple(sorted(letras))
+        self.numeros = tuple(sorted(numeros))
+
+    def __len__(self):
+        return self._total
+
+    def __contains__(self, codigo):
+        return self.es_codigo(codigo)
+
+    def nodo(self, prefijo):
+        nodo = self._raiz
+        for caracter in prefijo:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return None
+        return nodo
+
+    def es_prefijo(self, prefijo):
+        return self.nodo(prefijo) is not None
+
+    def es_codigo(self, codigo):
+        nodo = self.nodo(codigo)
+        return nodo is not None and nodo.codigo is not None
+
+    def siguientes(self, prefijo=""):
+        nodo = self.nodo(prefijo)
+        return sorted(nodo.hijos) if nodo is not None else []
+
+    def codigos(self, prefijo=""):
+        # Recorrido en profundidad con los hijos en orden: los códigos salen ordenados
+        inicio = self.nodo(prefijo)
+        pila = [inicio] if inicio is not None else []
+        while pila:
+            nodo = pila.pop()
+            if nodo.codigo is not None:
+                yield nodo.codigo
+            pila.extend(nodo.hijos[c] for c in sorted(nodo.hijos, reverse=True))
+
+    def rango_letras(self):
+        # Texto para los mensajes: "A-D" (o "A" si hay una sola letra)
+        if not self.letras:
+            return ""
+        return self.letras[0] if len(self.letras) == 1 else f"{self.letras[0]}-{self.letras[-1]}"
+
+    def simbolos_entrada(self):
+        # Alfabeto de símbolos para simulaciones: cada entrada junto con su valor
+        return (
+            [(Input.LETRA, letra) for letra in self.letras]
+            + [(Input.NUMERO, numero) for numero in self.numeros]
+            + [(moneda, None) for moneda in VALOR_MONEDAS]
+            + [(Input.CONFIRMAR, None), (Input.CANCELAR, None)]
+        )
+
+
+# Catálogo de PRODUCTOS (el de la interfaz y el que usan las simulaciones por omisión)
+CATALOGO = Catalogo(PRODUCTOS)
+SIMBOLOS_ENTRADA = CATALOGO.simbolos_entrada()
@@ -1,16 +1,15 @@
 # definiciones.py
 from enum import Enum, auto
 
+# Estado, Input y Output tienen que coincidir con maquina_spec.json (lo revisa especificacion.py)
 class Estado(Enum):
     INICIO = auto()
     BUILD_CODE = auto()
     ESPERANDO_DINERO = auto()
-    PROCESSING = auto()
-    FIN = auto()
 
 class Input(Enum):
-    LETRA = auto()     # valor: 'A'..'D'
-    NUMERO = auto()    # valor: '1'..'4'
+    LETRA = auto()     # valor: una letra del código ('A'..'D' con PRODUCTOS)
+    NUMERO = auto()    # valor: un dígito del código ('1'..'4' con PRODUCTOS)
     INSERT_1 = auto()  # valor: cantidad insertada
     INSERT_5 = auto()  # valor: cantidad insertada
     INSERT_10 = auto() # valor: cantidad insertada
@@ -27,6 +26,27 @@ class Output(Enum):
     SHOW_MESSAGE = auto()   # mensajes en pantalla3
     SHOW_CHANGE = auto()    # alias para RETURN_CHANGE
 
+# Valor en pesos de cada entrada de moneda
+VALOR_MONEDAS = {
+    Input.INSERT_1: 1,
+    Input.INSERT_5: 5,
+    Input.INSERT_10: 10,
+    Input.INSERT_20: 20,
+}
+
+# Sin actividad durante este tiempo con una transacción abierta, la máquina cancela sola
+INACTIVIDAD_MS = 10_000
+
+# Tiempos de la interfaz (ms); salidas.py y salidas_headless.py programan con estos mismos valores
+RETARDO_MENSAJE_MS = 1500          # un mensaje vuelve a "Seleccione un producto…"
+RETARDO_CAMBIO_MS = 2000           # tras devolver cambio: reset del display y la bandeja
+RETARDO_PANTALLA_GRAFO_MS = 5000   # tras entregar: pasar a PantallaGrafo
+DURACION_CAIDA_MS = 420            # animación de caída del producto (antes 14 pasos de 30 ms)
+INTERVALO_CUADRO_MS = 16           # intervalo objetivo entre cuadros de animación
+
+# Las letras y números válidos del teclado, y el alfabeto de símbolos para simulaciones
+# (SIMBOLOS_ENTRADA), salen de los códigos de PRODUCTOS: ver catalogo.py
+
 # Productos A1..D4 (nombres, precios y stock inicial)
 PRODUCTOS = {
     "A1": {"nombre": "Agua Ciel", "precio": 12, "stock": 10},
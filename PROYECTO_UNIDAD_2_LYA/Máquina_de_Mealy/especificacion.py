@@ -0,0 +1,327 @@
+# especificacion.py
+import functools
+import json
+import math
+import os
+
+from definiciones import Estado, Input, Output
+
+# -----------------------------
+# Especificación declarativa de la máquina de Mealy
+# -----------------------------
+# Estados, entradas, salidas y transiciones están en un solo lugar: maquina_spec.json
+# De ahí salen la tabla de despacho de MaquinaDispensadoraMealy (compilar_tabla) y el grafo DOT
+# que muestra PantallaGrafo (fuente_dot); ya no hay una copia a mano de las transiciones en salidas.py
+#
+# Cada transición es (desde, entrada) → lista de ramas que se prueban en orden:
+#   guarda:   método de la máquina (maquina, entrada, valor) → bool; sin guarda la rama siempre aplica
+#   accion:   método (maquina, entrada, valor) que modifica la transacción y regresa el payload
+#   mensaje:  en lugar de accion: texto para SHOW_MESSAGE ({valor}, {codigo}, {faltante}, {seleccionado}, {letras})
+#   hacia:    estado siguiente (sin 'hacia' la máquina se queda donde está)
+#   salida:   Output que se emite con el payload (con 'mensaje' es SHOW_MESSAGE)
+#   despues:  método (maquina) que corre después de emitir, p. ej. _reset
+#   etiqueta: texto de la rama en el grafo cuando no tiene guarda (p. ej. "sin stock")
+# desde: "*" (todos los estados que no tengan una fila propia para esa entrada) o una lista de estados
+# entrada: un Input o un grupo de 'grupos' (MONEDA = INSERT_1..INSERT_20)
+# externas: aristas que no dispara una entrada (el reset que hace la UI); solo aparecen en el grafo
+#
+# La lectura del JSON se guarda en caché por (ruta, mtime, tamaño): importar la máquina y dibujar
+# el grafo leen el archivo una sola vez por proceso, y si el archivo cambia se vuelve a leer
+
+RUTA_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maquina_spec.json")
+
+
+def cargar(ruta=RUTA_SPEC):
+    st = os.stat(ruta)
+    return _cargar(ruta, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _cargar(ruta, mtime_ns, tamano):
+    with open(ruta, encoding="utf-8") as f:
+        crudo = json.load(f)
+    return _normalizar(crudo)
+
+
+def _error(texto):
+    raise ValueError(f"[especificacion] {texto}")
+
+
+# -----------------------------
+# Validación y normalización
+# -----------------------------
+# Los nombres del JSON tienen que coincidir con los enums de definiciones.py
+# Cada par (estado, entrada) queda cubierto exactamente una vez y su última rama no lleva guarda,
+# así la tabla compilada es total: toda entrada de Input tiene manejador en todo estado
+
+def _normalizar(crudo):
+    estados = [e["nombre"] for e in crudo["estados"]]
+    if set(estados) != {e.name for e in Estado}:
+        _error(f"los estados {estados} no coinciden con definiciones.Estado")
+    if set(crudo["entradas"]) != {i.name for i in Input}:
+        _error("las entradas no coinciden con definiciones.Input")
+    if set(crudo["salidas"]) != {o.name for o in Output}:
+        _error("las salidas no coinciden con definiciones.Output")
+    if crudo["inicial"] not in estados:
+        _error(f"estado inicial desconocido: {crudo['inicial']}")
+    grupos = crudo.get("grupos", {})
+
+    filas = {estado: {} for estado in estados}
+    comodines = []
+    for t in crudo["transiciones"]:
+        entradas = grupos.get(t["entrada"], [t["entrada"]])
+        for entrada in entradas:
+            if entrada not in crudo["entradas"]:
+                _error(f"entrada desconocida: {entrada}")
+        ramas = tuple(_normalizar_rama(r, t["entrada"], estados) for r in t["ramas"])
+        if not ramas or ramas[-1]["guarda"]:
+            _error(f"{t['desde']} / {t['entrada']}: la última rama no puede tener guarda")
+        for rama in ramas:
+            rama["con_guardas"] = len(ramas) > 1
+        if t["desde"] == "*":
+            comodines.append((entradas, ramas))
+            continue
+        for estado in t["desde"]:
+            if estado not in filas:
+                _error(f"estado desconocido: {estado}")
+            for entrada in entradas:
+                if entrada in filas[estado]:
+                    _error(f"transición repetida: {estado} / {entrada}")
+                filas[estado][entrada] = ramas
+
+    for entradas, ramas in comodines:
+        for estado in estados:
+            for entrada in entradas:
+                filas[estado].setdefault(entrada, ramas)
+
+    for estado in estados:
+        faltan = [e for e in crudo["entradas"] if e not in filas[estado]]
+        if faltan:
+            _error(f"{estado} no tiene transición para {faltan}")
+
+    return {
+        "nombre": crudo.get("nombre", "Máquina de Mealy"),
+        "inicial": crudo["inicial"],
+        "estados": [(e["nombre"], e.get("color", "white")) for e in crudo["estados"]],
+        "filas": filas,
+        "externas": crudo.get("externas", []),
+        "grafo": crudo.get("grafo", {}),
+    }
+
+
+def _normalizar_rama(rama, etiqueta_entrada, estados):
+    if "mensaje" in rama and "accion" in rama:
+        _error(f"rama con 'mensaje' y 'accion' a la vez: {rama}")
+    hacia = rama.get("hacia")
+    if hacia is not None and hacia not in estados:
+        _error(f"estado desconocido: {hacia}")
+    salida = "SHOW_MESSAGE" if "mensaje" in rama else rama.get("salida")
+    if salida is not None and salida not in Output.__members__:
+        _error(f"salida desconocida: {salida}")
+    return {
+        "entrada": etiqueta_entrada,
+        "guarda": rama.get("guarda"),
+        "accion": rama.get("accion"),
+        "mensaje": rama.get("mensaje"),
+        "hacia": hacia,
+        "salida": salida,
+        "despues": rama.get("despues"),
+        "etiqueta": rama.get("etiqueta"),
+    }
+
+
+# -----------------------------
+# Compilar la tabla de despacho
+# -----------------------------
+# compilar_tabla(clase) → {Estado: {Input: manejador(maquina, entrada, valor)}}
+# Guardas, acciones y 'despues' se buscan una vez por nombre en la clase de la máquina
+# Una fila de una sola rama se compila a su efecto directo; con guardas, a un ciclo corto sobre las ramas
+# Orden de cada rama: accion/mensaje → cambio de estado → emitir salida → despues
+# (el estado ya cambió cuando corren los handlers de salida, igual que en los métodos originales)
+#
+# Contadores: cada rama de cada estado tiene un índice fijo (transiciones(): lista de (estado, rama))
+# y su efecto hace maquina.conteo[índice] += 1; la máquina preasigna conteo = [0] * len(transiciones())
+# Una rama es una transición (estado, entrada, salida); las monedas (grupo MONEDA) comparten contador
+# contar=False compila la tabla sin contadores (para medir cuánto cuestan)
+
+@functools.lru_cache(maxsize=4)
+def _transiciones(ruta, mtime_ns, tamano):
+    spec = cargar(ruta)
+    lista = []
+    for estado, fila in spec["filas"].items():
+        vistas = set()
+        for ramas in fila.values():
+            if id(ramas) not in vistas:
+                vistas.add(id(ramas))
+                lista.extend((estado, rama) for rama in ramas)
+    return tuple(lista)
+
+
+def transiciones(ruta=RUTA_SPEC):
+    st = os.stat(ruta)
+    return _transiciones(ruta, st.st_mtime_ns, st.st_size)
+
+
+def compilar_tabla(clase, ruta=RUTA_SPEC, contar=True):
+    spec = cargar(ruta)
+    tabla = {}
+    indice = 0
+    for estado, fila in spec["filas"].items():
+        tabla[Estado[estado]] = {}
+        compiladas = {}
+        for entrada, ramas in fila.items():
+            # las entradas de un mismo grupo comparten manejador (y contadores) dentro del estado;
+            # el orden de los índices es el mismo que el de transiciones()
+            manejador = compiladas.get(id(ramas))
+            if manejador is None:
+                manejador = compiladas[id(ramas)] = _compilar_fila(clase, ramas, indice if contar else None)
+                indice += len(ramas)
+            tabla[Estado[estado]][Input[entrada]] = manejador
+    return tabla
+
+
+def _metodo(clase, nombre):
+    if nombre is None:
+        return None
+    fn = getattr(clase, nombre, None)
+    if not callable(fn):
+        _error(f"{clase.__name__} no tiene el método '{nombre}'")
+    return fn
+
+
+def _compilar_rama(clase, rama, indice):
+    guarda = _metodo(clase, rama["guarda"])
+    accion = _metodo(clase, rama["accion"])
+    despues = _metodo(clase, rama["despues"])
+    plantilla = rama["mensaje"]
+    hacia = Estado[rama["hacia"]] if rama["hacia"] else None
+    salida = Output[rama["salida"]] if rama["salida"] else None
+
+    def efecto(m, entrada, valor):
+        if indice is not None:
+            m.conteo[indice] += 1
+        if accion is not None:
+            payload = accion(m, entrada, valor)
+        elif plantilla is not None:
+            payload = m._mensaje(plantilla, valor)
+        else:
+            payload = None
+        if hacia is not None:
+            m.estado = hacia
+        if salida is not None:
+            m._emit(salida, payload)
+        if despues is not None:
+            despues(m)
+    return guarda, efecto
+
+
+def _compilar_fila(clase, ramas, indice):
+    pasos = tuple(
+        _compilar_rama(clase, rama, None if indice is None else indice + j) for j, rama in enumerate(ramas)
+    )
+    if len(pasos) == 1:
+        return pasos[0][1]
+
+    def manejar(m, entrada, valor):
+        for guarda, efecto in pasos:
+            if guarda is None or guarda(m, entrada, valor):
+                efecto(m, entrada, valor)
+                return
+    return manejar
+
+
+# -----------------------------
+# Grafo DOT
+# -----------------------------
+# fuente_dot() → texto DOT del diagrama de estados (salidas.py lo renderiza con graphviz)
+# Una arista por par (desde, hacia); cada rama que la recorre es una línea "ENTRADA [guarda] / SALIDA"
+# fuente_dot(conteo=maquina.conteo) dibuja el mapa de calor: cada línea lleva sus veces (×N) y el grosor
+# y el color de la arista crecen con el total (escala logarítmica respecto a la arista más usada)
+# Una rama con 'etiqueta' la usa; si no, el nombre de su guarda; la final sin etiqueta es [si no]; las externas se dibujan punteadas
+
+def _escapar(texto):
+    return str(texto).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _cita(texto):
+    return f'"{_escapar(texto)}"'
+
+
+def _cita_lineas(lineas):
+    # etiqueta de varias líneas: cada una escapada y unidas con el salto de línea de DOT (\\n)
+    return '"' + "\\n".join(_escapar(linea) for linea in lineas) + '"'
+
+
+def _etiqueta_rama(rama):
+    texto = rama["entrada"]
+    if rama["etiqueta"]:
+        texto += f" [{rama['etiqueta']}]"
+    elif rama["guarda"]:
+        texto += f" [{rama['guarda'].lstrip('_')}]"
+    elif rama["con_guardas"]:
+        texto += " [si no]"
+    if rama["salida"]:
+        texto += f" / {rama['salida']}"
+    return texto
+
+
+def aristas(ruta=RUTA_SPEC, conteo=None):
+    # {(desde, hacia): {etiqueta: veces}} en el orden de la especificación (veces = 0 sin conteo)
+    resultado = {}
+    for i, (estado, rama) in enumerate(transiciones(ruta)):
+        etiquetas = resultado.setdefault((estado, rama["hacia"] or estado), {})
+        etiqueta = _etiqueta_rama(rama)
+        etiquetas[etiqueta] = etiquetas.get(etiqueta, 0) + (conteo[i] if conteo is not None else 0)
+    return resultado
+
+
+# Color de la arista: de gris (sin uso) a rojo (la más usada)
+_FRIO = (0xBB, 0xBB, 0xBB)
+_CALIENTE = (0xD6, 0x27, 0x28)
+
+
+def _calor(veces, maximo):
+    if not maximo or not veces:
+        return 0.0
+    return math.log1p(veces) / math.log1p(maximo)
+
+
+def _color(t):
+    return "#" + "".join(f"{round(f + (c - f) * t):02x}" for f, c in zip(_FRIO, _CALIENTE))
+
+
+def _fuente(ruta, conteo):
+    spec = cargar(ruta)
+    lineas = [f"// {spec['nombre']}", "digraph {"]
+    for atributo, valor in spec["grafo"].items():
+        lineas.append(f"\t{atributo}={_cita(valor)}")
+    for estado, color in spec["estados"]:
+        forma = "doublecircle" if estado == spec["inicial"] else "circle"
+        lineas.append(f"\t{_cita(estado)} [shape={forma} style=filled fillcolor={_cita(color)}]")
+    todas = aristas(ruta, conteo)
+    maximo = max((sum(e.values()) for e in todas.values()), default=0)
+    for (desde, hacia), etiquetas in todas.items():
+        if conteo is None:
+            lineas.append(f"\t{_cita(desde)} -> {_cita(hacia)} [label={_cita_lineas(etiquetas)}]")
+            continue
+        t = _calor(sum(etiquetas.values()), maximo)
+        texto = [f"{etiqueta} ×{veces}" if veces else etiqueta for etiqueta, veces in etiquetas.items()]
+        lineas.append(f"\t{_cita(desde)} -> {_cita(hacia)} [label={_cita_lineas(texto)} "
+                      f"penwidth={1 + 7 * t:.2f} color={_cita(_color(t))} fontcolor={_cita(_color(t))}]")
+    for externa in spec["externas"]:
+        lineas.append(f"\t{_cita(externa['desde'])} -> {_cita(externa['hacia'])} "
+                      f"[label={_cita(externa.get('etiqueta', ''))} style=dashed]")
+    lineas.append("}")
+    return "\n".join(lineas) + "\n"
+
+
+@functools.lru_cache(maxsize=4)
+def _fuente_dot(ruta, mtime_ns, tamano):
+    return _fuente(ruta, None)
+
+
+def fuente_dot(ruta=RUTA_SPEC, conteo=None):
+    if conteo is not None:
+        return _fuente(ruta, conteo)
+    st = os.stat(ruta)
+    return _fuente_dot(ruta, st.st_mtime_ns, st.st_size)
@@ -0,0 +1,174 @@
+# flota_procesos.py
+import argparse
+import copy
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from catalogo import SIMBOLOS_ENTRADA
+from definiciones import Input, Output, PRODUCTOS, VALOR_MONEDAS
+from inventario import InventarioConcurrente
+from maquina import MaquinaDispensadoraMealy
+from salidas_headless import funciones_nulas
+
+# -----------------------------
+# Flota de máquinas repartida en varios procesos
+# -----------------------------
+# Las máquinas se dividen en shards; cada shard corre en un proceso de un ProcessPoolExecutor
+# Cada máquina tiene su PROPIA copia del catálogo (nombres, precios y stock), como en flota_vectorizada.py:
+# ninguna máquina (ni ningún proceso) toca el stock de otra, y los totales no dependen de cuántos
+# shards o procesos haya (verificar_invariancia lo comprueba)
+# Al proceso solo se le manda (índices de máquinas, eventos, semilla, catálogo): las entradas
+# se generan dentro del shard para no serializar millones de eventos
+# Al final se suman las ventas y los deltas de stock de todos los shards
+
+
+# -----------------------------
+# Generador de entradas por máquina
+# -----------------------------
+# La secuencia de cada máquina depende solo de (semilla, número de máquina), no del número de shards
+# Las monedas y CONFIRMAR tienen más peso para que ocurran compras completas
+
+_PESOS = [3 if entrada in VALOR_MONEDAS or entrada == Input.CONFIRMAR else 1 for entrada, _ in SIMBOLOS_ENTRADA]
+
+def generar_eventos(semilla, maquina_id, eventos):
+    rng = random.Random(semilla * 1_000_003 + maquina_id)
+    return rng.choices(SIMBOLOS_ENTRADA, weights=_PESOS, k=eventos)
+
+
+# -----------------------------
+# Trabajo de un shard (corre dentro del proceso hijo)
+# -----------------------------
+# Las máquinas del shard se intercalan: en cada paso cada máquina procesa un evento
+# Regresa ventas por código, delta de stock por código (sumado sobre las máquinas), ingresos y tiempos del shard
+
+def _correr_shard(ids, eventos, semilla, productos):
+    ventas = dict.fromkeys(productos, 0)
+    ingresos = 0
+
+    def registrar_venta(machine, payload=None):
+        nonlocal ingresos
+        ventas[machine.selected_code] += 1
+        ingresos += payload["precio"]
+        machine._reset()
+
+    funciones = dict(funciones_nulas)
+    funciones[Output.DELIVER] = registrar_venta
+
+    t0 = time.perf_counter()
+    catalogos = [copy.deepcopy(productos) for _ in ids]
+    maquinas = [MaquinaDispensadoraMealy(funciones, inventario=InventarioConcurrente(c)) for c in catalogos]
+    secuencias = [generar_eventos(semilla, i, eventos) for i in ids]
+    procesar = [m.procesar_entrada for m in maquinas]
+    for paso in range(eventos):
+        for k, fn in enumerate(procesar):
+            entrada, valor = secuencias[k][paso]
+            fn(entrada, valor)
+    segundos = time.perf_counter() - t0
+
+    return {
+        "maquinas": len(ids),
+        "eventos": len(ids) * eventos,
+        "segundos": segundos,
+        "ventas": ventas,
+        "delta_stock": {code: sum(c[code]["stock"] for c in catalogos) - len(ids) * productos[code]["stock"]
+                        for code in productos},
+        "ingresos": ingresos,
+        "pid": os.getpid(),
+    }
+
+
+def _repartir(maquinas, shards):
+    # Reparte los ids 0..maquinas-1 en 'shards' bloques contiguos casi iguales
+    base, resto = divmod(maquinas, shards)
+    inicio = 0
+    for k in range(shards):
+        fin = inicio + base + (1 if k < resto else 0)
+        yield list(range(inicio, fin))
+        inicio = fin
+
+
+# -----------------------------
+# ejecutar_flota → corre la flota completa y combina los resultados
+# -----------------------------
+# maquinas: total de máquinas; eventos: eventos por máquina
+# procesos: tamaño del pool (por omisión os.cpu_count()); shards: por omisión uno por proceso
+# Regresa un diccionario con los totales combinados, la lista de resultados por shard y el rendimiento
+
+def ejecutar_flota(maquinas, eventos, procesos=None, shards=None, semilla=0, productos=None):
+    productos = PRODUCTOS if productos is None else productos
+    procesos = procesos or os.cpu_count() or 1
+    shards = min(shards or procesos, maquinas)
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            pool.submit(_correr_shard, ids, eventos, semilla, productos)
+            for ids in _repartir(maquinas, shards)
+        ]
+        por_shard = [f.result() for f in futuros]
+    segundos = time.perf_counter() - t0
+
+    ventas = dict.fromkeys(productos, 0)
+    delta_stock = dict.fromkeys(productos, 0)
+    for r in por_shard:
+        for code in productos:
+            ventas[code] += r["ventas"][code]
+            delta_stock[code] += r["delta_stock"][code]
+
+    total_eventos = maquinas * eventos
+    return {
+        "maquinas": maquinas,
+        "eventos": total_eventos,
+        "procesos": procesos,
+        "shards": por_shard,
+        "ventas": ventas,
+        "delta_stock": delta_stock,
+        "ingresos": sum(r["ingresos"] for r in por_shard),
+        "segundos": segundos,
+        "eventos_por_segundo": total_eventos / segundos if segundos else 0.0,
+    }
+
+
+# -----------------------------
+# verificar_invariancia → los totales no dependen del número de procesos
+# -----------------------------
+# Corre la misma flota (misma semilla) con cada tamaño de pool y compara ventas, delta de stock e ingresos
+
+def verificar_invariancia(maquinas=200, eventos=200, procesos=None, semilla=0, productos=None):
+    procesos = procesos or sorted({1, 2, os.cpu_count() or 1})
+    base = None
+    for p in procesos:
+        r = ejecutar_flota(maquinas, eventos, procesos=p, semilla=semilla, productos=productos)
+        totales = (r["ventas"], r["delta_stock"], r["ingresos"])
+        if base is None:
+            base = totales
+        assert totales == base, f"procesos={p}: totales distintos a procesos={procesos[0]}"
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula una flota de máquinas en varios procesos.")
+    parser.add_argument("--maquinas", type=int, default=2_000)
+    parser.add_argument("--eventos", type=int, default=500, help="eventos por máquina")
+    parser.add_argument("--procesos", type=int, nargs="*",
+                        help="tamaños de pool a comparar (por omisión 1..cpu_count)")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    verificar_invariancia(semilla=args.semilla)
+    print("verificación de invariancia (1, 2 y N procesos): OK")
+
+    tamanos = args.procesos or list(range(1, (os.cpu_count() or 1) + 1))
+    base = None
+    for p in tamanos:
+        r = ejecutar_flota(args.maquinas, args.eventos, procesos=p, semilla=args.semilla)
+        base = base or r["eventos_por_segundo"] / p
+        escala = r["eventos_por_segundo"] / base
+        print(f"procesos={p:<3} {r['eventos_por_segundo']:>12,.0f} eventos/s  "
+              f"escala {escala:.2f}x  ventas={sum(r['ventas'].values())}  ingresos=${r['ingresos']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# flota_vectorizada.py
+import copy
+import time
+
+import numpy as np
+
+from catalogo import CATALOGO, Catalogo, SIMBOLOS_ENTRADA
+from definiciones import Estado, Input, Output, PRODUCTOS, VALOR_MONEDAS
+
+# -----------------------------
+# Simulador vectorizado de una flota de máquinas Mealy
+# -----------------------------
+# Avanza N máquinas a la vez con arreglos de NumPy en lugar de un objeto por máquina
+# Cada máquina tiene: estado, codigo_buffer (índice de letra), slot seleccionado, crédito y su propio stock
+# Las entradas se codifican como "símbolos" (entrada + valor), p. ej. LETRA 'A' o INSERT_10
+# Una matriz de entradas tiene forma (N, pasos): la columna t es la entrada de cada máquina en el paso t
+# SIN_ENTRADA (-1) deja a la máquina quieta en ese paso
+# La semántica es la de MaquinaDispensadoraMealy en modo headless (DELIVER resetea la máquina)
+# Los códigos tienen que ser de una letra y un número (la matriz slot_de); el teclado se valida con el
+# catálogo de cada flota igual que en la máquina: una letra o un número que no aparece en sus códigos es inválido
+
+SIN_ENTRADA = -1
+SIN_SALIDA = 0
+
+# Alfabeto de símbolos: (Input, valor)
+SIMBOLOS = SIMBOLOS_ENTRADA
+INDICE_SIMBOLO = {simbolo: i for i, simbolo in enumerate(SIMBOLOS)}
+LETRAS = list(CATALOGO.letras)
+NUMEROS = list(CATALOGO.numeros)
+
+# Clases de símbolo (qué rama de la función de transición aplica)
+_LETRA, _NUMERO, _MONEDA, _CONFIRMAR, _CANCELAR = range(5)
+_CLASE_INPUT = {Input.LETRA: _LETRA, Input.NUMERO: _NUMERO, Input.CONFIRMAR: _CONFIRMAR, Input.CANCELAR: _CANCELAR}
+
+
+# -----------------------------
+# Tablas de búsqueda (se construyen una vez al importar)
+# -----------------------------
+# CLASE[s], LETRA_DE[s], NUMERO_DE[s], VALOR_DE[s]: propiedades de cada símbolo
+# SIGUIENTE[e, s] y SALIDA[e, s]: estado y salida de la rama "exitosa" de la transición
+# Las guardas que dependen de datos (stock, crédito, código existente) se aplican con máscaras en paso()
+
+def _tablas_simbolos():
+    k = len(SIMBOLOS)
+    clase = np.empty(k, dtype=np.int8)
+    letra_de = np.full(k, -1, dtype=np.int8)
+    numero_de = np.full(k, -1, dtype=np.int8)
+    valor_de = np.zeros(k, dtype=np.int32)
+    for i, (entrada, valor) in enumerate(SIMBOLOS):
+        clase[i] = _CLASE_INPUT.get(entrada, _MONEDA)
+        if entrada == Input.LETRA:
+            letra_de[i] = LETRAS.index(valor)
+        elif entrada == Input.NUMERO:
+            numero_de[i] = NUMEROS.index(valor)
+        elif entrada in VALOR_MONEDAS:
+            valor_de[i] = VALOR_MONEDAS[entrada]
+    return clase, letra_de, numero_de, valor_de
+
+CLASE, LETRA_DE, NUMERO_DE, VALOR_DE = _tablas_simbolos()
+
+
+def _tablas_transicion():
+    n_estados = max(e.value for e in Estado) + 1
+    siguiente = np.zeros((n_estados, len(SIMBOLOS)), dtype=np.int8)
+    salida = np.zeros((n_estados, len(SIMBOLOS)), dtype=np.int8)
+    for estado in Estado:
+        e = estado.value
+        esperando = estado == Estado.ESPERANDO_DINERO
+        for s, clase in enumerate(CLASE):
+            if clase == _LETRA:
+                siguiente[e, s], salida[e, s] = Estado.BUILD_CODE.value, Output.SHOW_CODE.value
+            elif clase == _NUMERO:
+                if estado == Estado.BUILD_CODE:
+                    siguiente[e, s], salida[e, s] = Estado.ESPERANDO_DINERO.value, Output.SHOW_PRICE.value
+                else:
+                    siguiente[e, s], salida[e, s] = e, Output.SHOW_MESSAGE.value
+            elif clase == _MONEDA:
+                siguiente[e, s] = e
+                salida[e, s] = Output.UPDATE_TOTAL.value if esperando else Output.SHOW_MESSAGE.value
+            elif clase == _CONFIRMAR:
+                if esperando:
+                    siguiente[e, s], salida[e, s] = Estado.INICIO.value, Output.DELIVER.value
+                else:
+                    siguiente[e, s], salida[e, s] = e, Output.SHOW_MESSAGE.value
+            else:
+                siguiente[e, s], salida[e, s] = Estado.INICIO.value, Output.RETURN_CHANGE.value
+    return siguiente, salida
+
+SIGUIENTE, SALIDA = _tablas_transicion()
+
+
+# -----------------------------
+# FlotaVectorizada
+# -----------------------------
+# n: número de máquinas
+# productos: catálogo inicial (cada máquina recibe su propia copia del stock)
+# paso(columna): avanza todas las máquinas con un símbolo cada una; regresa la salida de cada una
+# ejecutar(matriz): corre todas las columnas; regresa la matriz de salidas (N, pasos)
+# maquinas_pasos_por_segundo(): rendimiento acumulado de paso()
+
+class FlotaVectorizada:
+    def __init__(self, n, productos=None):
+        productos = PRODUCTOS if productos is None else productos
+        self.n = n
+        self.codigos = sorted(productos)
+        indice = {code: i for i, code in enumerate(self.codigos)}
+        catalogo = Catalogo(productos)
+        if any(len(code) != 2 for code in self.codigos):
+            raise ValueError("[flota_vectorizada] solo códigos de una letra y un número (p. ej. A1)")
+        self.letra_valida = np.array([letra in catalogo.letras for letra in LETRAS], dtype=bool)
+        self.numero_valido = np.array([numero in catalogo.numeros for numero in NUMEROS], dtype=bool)
+
+        # slot de cada combinación (letra, número); -1 si el código no existe en el catálogo
+        self.slot_de = np.full((len(LETRAS), len(NUMEROS)), -1, dtype=np.int16)
+        for i, letra in enumerate(LETRAS):
+            for j, numero in enumerate(NUMEROS):
+                self.slot_de[i, j] = indice.get(letra + numero, -1)
+
+        self.precio = np.array([productos[c]["precio"] for c in self.codigos], dtype=np.int32)
+        self.stock = np.tile(np.array([productos[c]["stock"] for c in self.codigos], dtype=np.int32), (n, 1))
+
+        self.estado = np.full(n, Estado.INICIO.value, dtype=np.int8)
+        self.codigo_buffer = np.full(n, -1, dtype=np.int8)
+        self.slot = np.full(n, -1, dtype=np.int16)
+        self.credito = np.zeros(n, dtype=np.int32)
+
+        self.pasos_maquina = 0
+        self.segundos = 0.0
+
+    def paso(self, columna):
+        t0 = time.perf_counter()
+        columna = np.asarray(columna)
+        activo = columna != SIN_ENTRADA
+        s = np.where(activo, columna, 0)
+        e = self.estado
+        clase = np.where(activo, CLASE[s], -1)
+
+        siguiente = SIGUIENTE[e, s]
+        salida = SALIDA[e, s]
+        resetear = np.zeros(self.n, dtype=bool)
+
+        # LETRA: nuevo buffer, se descarta la selección (el crédito se conserva)
+        # Letra que no aparece en el catálogo → mensaje, la máquina no cambia
+        m = clase == _LETRA
+        invalida = np.zeros(self.n, dtype=bool)
+        invalida[m] = ~self.letra_valida[LETRA_DE[s[m]]]
+        siguiente[invalida] = e[invalida]
+        salida[invalida] = Output.SHOW_MESSAGE.value
+        m &= ~invalida
+        self.codigo_buffer[m] = LETRA_DE[s[m]]
+        self.slot[m] = -1
+
+        # NUMERO en BUILD_CODE: número que no aparece en el catálogo → mensaje y se borra el código
+        # (el crédito se conserva); código inexistente o sin stock → mensaje y reset
+        m = (clase == _NUMERO) & (e == Estado.BUILD_CODE.value)
+        idx = np.nonzero(m)[0]
+        if idx.size:
+            invalido = ~self.numero_valido[NUMERO_DE[s[idx]]]
+            malos = idx[invalido]
+            siguiente[malos] = Estado.INICIO.value
+            salida[malos] = Output.SHOW_MESSAGE.value
+            self.codigo_buffer[malos] = -1
+            idx = idx[~invalido]
+        if idx.size:
+            code = self.slot_de[self.codigo_buffer[idx], NUMERO_DE[s[idx]]]
+            falla = (code < 0) | (self.stock[idx, np.maximum(code, 0)] <= 0)
+            malos = idx[falla]
+            siguiente[malos] = Estado.INICIO.value
+            salida[malos] = Output.SHOW_MESSAGE.value
+            resetear[malos] = True
+            buenos = idx[~falla]
+            self.slot[buenos] = code[~falla]
+            self.credito[buenos] = 0
+
+        # Monedas en ESPERANDO_DINERO: acumular crédito
+        m = (clase == _MONEDA) & (e == Estado.ESPERANDO_DINERO.value)
+        self.credito[m] += VALOR_DE[s[m]]
+
+        # CONFIRMAR en ESPERANDO_DINERO: crédito insuficiente → mensaje; si alcanza → entrega y reset
+        m = (clase == _CONFIRMAR) & (e == Estado.ESPERANDO_DINERO.value)
+        idx = np.nonzero(m)[0]
+        if idx.size:
+            slots = self.slot[idx]
+            falta = self.credito[idx] < self.precio[slots]
+            cortos = idx[falta]
+            siguiente[cortos] = Estado.ESPERANDO_DINERO.value
+            salida[cortos] = Output.SHOW_MESSAGE.value
+            entregas = idx[~falta]
+            self.stock[entregas, slots[~falta]] -= 1
+            resetear[entregas] = True
+
+        # CANCELAR: devuelve crédito si lo hay, siempre resetea
+        m = clase == _CANCELAR
+        salida[m & (self.credito <= 0)] = Output.SHOW_MESSAGE.value
+        resetear |= m
+
+        self.codigo_buffer[resetear] = -1
+        self.slot[resetear] = -1
+        self.credito[resetear] = 0
+        self.estado = np.where(activo, siguiente, e)
+
+        self.pasos_maquina += self.n
+        self.segundos += time.perf_counter() - t0
+        return np.where(activo, salida, SIN_SALIDA)
+
+    def ejecutar(self, matriz):
+        matriz = np.asarray(matriz)
+        salidas = np.empty(matriz.shape, dtype=np.int8)
+        for t in range(matriz.shape[1]):
+            salidas[:, t] = self.paso(matriz[:, t])
+        return salidas
+
+    def maquinas_pasos_por_segundo(self):
+        return self.pasos_maquina / self.segundos if self.segundos else 0.0
+
+
+# -----------------------------
+# Generador de entradas aleatorias
+# -----------------------------
+# Las monedas y CONFIRMAR tienen más peso para que ocurran compras completas
+
+def generar_entradas(n, pasos, semilla=0):
+    rng = np.random.default_rng(semilla)
+    pesos = np.array([3.0 if CLASE[i] in (_MONEDA, _CONFIRMAR) else 1.0 for i in range(len(SIMBOLOS))])
+    return rng.choice(len(SIMBOLOS), size=(n, pasos), p=pesos / pesos.sum()).astype(np.int8)
+
+
+# -----------------------------
+# Verificación diferencial contra la máquina escalar
+# -----------------------------
+# Corre las mismas entradas en FlotaVectorizada y en MaquinaDispensadoraMealy (una por máquina,
+# cada una con su copia del catálogo) y compara salidas, estado final y stock
+# Lanza AssertionError con la primera diferencia encontrada
+
+def verificar_contra_escalar(n=200, pasos=300, semilla=0, productos=None):
+    from maquina import MaquinaDispensadoraMealy
+    from salidas_headless import GrabadoraSalidas
+
+    productos = PRODUCTOS if productos is None else productos
+    matriz = generar_entradas(n, pasos, semilla)
+    flota = FlotaVectorizada(n, productos)
+    salidas = flota.ejecutar(matriz)
+
+    for i in range(n):
+        grabadora = GrabadoraSalidas()
+        catalogo = copy.deepcopy(productos)
+        m = MaquinaDispensadoraMealy(grabadora.funciones, catalogo)
+        for s in matriz[i]:
+            entrada, valor = SIMBOLOS[s]
+            m.procesar_entrada(entrada, valor)
+
+        esperado = [salida.value for salida, _ in grabadora.registro]
+        obtenido = salidas[i].tolist()
+        assert esperado == obtenido, f"máquina {i}: salidas {esperado} != {obtenido}"
+
+        buffer = LETRAS.index(m.codigo_buffer) if m.codigo_buffer else -1
+        slot = flota.codigos.index(m.selected_code) if m.selected_code else -1
+        assert (m.estado.value, buffer, slot, m.credito) == (
+            flota.estado[i], flota.codigo_buffer[i], flota.slot[i], flota.credito[i]
+        ), f"máquina {i}: estado final distinto"
+        stock = [catalogo[c]["stock"] for c in flota.codigos]
+        assert stock == flota.stock[i].tolist(), f"máquina {i}: stock distinto"
+    return True
+
+
+if __name__ == "__main__":
+    verificar_contra_escalar()
+    print("verificación diferencial contra MaquinaDispensadoraMealy: OK")
+
+    flota = FlotaVectorizada(20_000)
+    flota.ejecutar(generar_entradas(20_000, 200, semilla=1))
+    print(f"{flota.maquinas_pasos_por_segundo():,.0f} máquinas-pasos/s")
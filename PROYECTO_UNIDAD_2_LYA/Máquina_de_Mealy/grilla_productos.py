@@ -0,0 +1,220 @@
+# grilla_productos.py
+import tkinter as tk
+
+# -----------------------------
+# Grilla de productos virtualizada (un solo Canvas)
+# -----------------------------
+# Antes cada producto era un Frame con cinco widgets colocados con place(): con cientos de posiciones
+# eso son miles de widgets de Tk y segundos en construir y refrescar
+# Aquí toda la grilla es un Canvas con scroll; cada tarjeta es un grupo de items (fondo, código, imagen,
+# nombre, precio) y solo existen las tarjetas de las filas visibles (más una fila de margen)
+# Al desplazarse, las tarjetas que salen de la vista se reciclan para los códigos que entran:
+# se mueven con un solo canvas.move por tarjeta y se les cambia el contenido
+# Construir y refrescar cuesta lo mismo con 16 productos que con miles: depende de lo visible
+#
+# codigos:       orden de las tarjetas (catalogo.codigos(): A1..A4, B1..B4... de izquierda a derecha)
+# productos:     catálogo de la máquina; se lee al dibujar cada tarjeta
+# versiones:     inventario.versiones; refrescar() solo redibuja tarjetas visibles cuya versión cambió
+# fotos(code):   PhotoImage de la caché compartida de miniaturas, o None (quien la da puede pedirla en
+#                segundo plano y entregarla después con poner_foto)
+#
+# refrescar(miniaturas): revisa las tarjetas visibles (textos, color, y la foto si miniaturas=True)
+# poner_foto(code, foto): llegó la miniatura de 'code' (None = no tiene); si su tarjeta está visible se muestra
+# invalidar():           olvida lo que muestran las tarjetas (el siguiente refrescar las redibuja todas)
+# visibles():            códigos con tarjeta en este momento
+
+TARJETA_ANCHO = 148
+TARJETA_ALTO = 130
+SEPARACION = 12
+FILAS_MARGEN = 1            # filas dibujadas de más arriba y abajo de lo visible
+COLOR_DISPONIBLE = "#ffffff"
+COLOR_SIN_STOCK = "#f3adad"   # rojo claro = sin stock
+FONDO = "#1f1f1f"
+
+
+class _Tarjeta:
+    __slots__ = ("tag", "fondo", "codigo", "imagen", "nombre", "precio", "x", "y", "code", "version", "foto")
+
+    def __init__(self, canvas, numero):
+        self.tag = f"tarjeta{numero}"
+        tags = ("tarjeta", self.tag)
+        ancho, alto = TARJETA_ANCHO, TARJETA_ALTO
+        self.fondo = canvas.create_rectangle(0, 0, ancho, alto, fill=COLOR_DISPONIBLE, outline="#888888", tags=tags)
+        self.codigo = canvas.create_text(8, 6, anchor="nw", font=("Arial", 9, "bold"), tags=tags)
+        self.imagen = canvas.create_image(ancho // 2, 50, anchor="center", tags=tags)
+        self.nombre = canvas.create_text(ancho // 2, 84, width=ancho - 16, justify="center", tags=tags)
+        self.precio = canvas.create_text(ancho // 2, 112, font=("Arial", 10, "bold"), tags=tags)
+        self.x = self.y = 0
+        self.code = None
+        self.version = None
+        self.foto = None
+
+
+class GrillaProductos(tk.Frame):
+    def __init__(self, parent, codigos, productos, versiones, fotos, ancho=696, alto=500):
+        super().__init__(parent, bg=FONDO)
+        self.codigos = list(codigos)
+        self.productos = productos
+        self.versiones = versiones
+        self.fotos = fotos
+        self.miniaturas = False        # se vuelve True con el primer refrescar(miniaturas=True)
+
+        self.canvas = tk.Canvas(self, bg=FONDO, highlightthickness=0, width=ancho, height=alto,
+                                yscrollincrement=TARJETA_ALTO + SEPARACION)   # la rueda avanza una fila
+        self.barra = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._al_desplazar)
+        self.barra.pack(side="right", fill="y")
+        self.canvas.pack(side="left", expand=True, fill="both")
+
+        self._columnas = 0
+        self._tarjetas = {}     # índice en codigos → _Tarjeta visible
+        self._por_codigo = {}   # código → _Tarjeta visible
+        self._libres = []       # tarjetas fuera de la vista, listas para reciclar
+        self._creadas = 0
+        self._mostrado = {}     # item → opciones aplicadas con itemconfigure (no repetir las mismas)
+        self.config_llamadas = 0
+
+        self.canvas.bind("<Configure>", self._al_redimensionar)
+        for evento in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(evento, self._rueda)
+        self._distribuir()
+
+    # ---------------------------
+    # Geometría
+    # ---------------------------
+    # Antes de que la ventana tenga tamaño real (primer <Configure>) se usa el tamaño pedido del Canvas
+    def _tamano(self):
+        ancho, alto = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if ancho <= 1 or alto <= 1:
+            ancho, alto = int(self.canvas["width"]), int(self.canvas["height"])
+        return ancho, alto
+
+    def _distribuir(self):
+        # Columnas según el ancho; si cambian, todas las tarjetas se vuelven a colocar
+        ancho, _ = self._tamano()
+        columnas = max(1, (ancho - SEPARACION) // (TARJETA_ANCHO + SEPARACION))
+        if columnas != self._columnas:
+            self._columnas = columnas
+            for indice in list(self._tarjetas):
+                self._soltar(indice)
+        filas = -(-len(self.codigos) // columnas)
+        alto_total = SEPARACION + filas * (TARJETA_ALTO + SEPARACION)
+        self.canvas.configure(scrollregion=(0, 0, ancho, alto_total))
+        self._actualizar_visibles()
+
+    def _posicion(self, indice):
+        fila, columna = divmod(indice, self._columnas)
+        return (SEPARACION + columna * (TARJETA_ANCHO + SEPARACION),
+                SEPARACION + fila * (TARJETA_ALTO + SEPARACION))
+
+    def _rango_visible(self):
+        _, alto = self._tamano()
+        arriba = self.canvas.canvasy(0)
+        paso = TARJETA_ALTO + SEPARACION
+        primera = max(0, int(arriba // paso) - FILAS_MARGEN)
+        ultima = int((arriba + alto) // paso) + FILAS_MARGEN
+        return primera * self._columnas, min(len(self.codigos), (ultima + 1) * self._columnas)
+
+    def _actualizar_visibles(self):
+        inicio, fin = self._rango_visible()
+        for indice in [i for i in self._tarjetas if not inicio <= i < fin]:
+            self._soltar(indice)
+        for indice in range(inicio, fin):
+            if indice not in self._tarjetas:
+                self._asignar(indice)
+
+    def _al_desplazar(self, primero, ultimo):
+        self.barra.set(primero, ultimo)
+        self._actualizar_visibles()
+
+    def _al_redimensionar(self, event=None):
+        self._distribuir()
+
+    def _rueda(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.canvas.yview_scroll(-1, "units")
+        else:
+            self.canvas.yview_scroll(1, "units")
+
+    # ---------------------------
+    # Tarjetas: reciclar y dibujar
+    # ---------------------------
+    def _asignar(self, indice):
+        if self._libres:
+            tarjeta = self._libres.pop()
+            self.canvas.itemconfigure(tarjeta.tag, state="normal")
+        else:
+            tarjeta = _Tarjeta(self.canvas, self._creadas)
+            self._creadas += 1
+        x, y = self._posicion(indice)
+        self.canvas.move(tarjeta.tag, x - tarjeta.x, y - tarjeta.y)
+        tarjeta.x, tarjeta.y = x, y
+        tarjeta.code = self.codigos[indice]
+        tarjeta.version = None
+        self._tarjetas[indice] = tarjeta
+        self._por_codigo[tarjeta.code] = tarjeta
+        self._dibujar(tarjeta)
+        self._poner_foto(tarjeta, self.fotos(tarjeta.code) if self.miniaturas else None)
+
+    def _soltar(self, indice):
+        tarjeta = self._tarjetas.pop(indice)
+        self._por_codigo.pop(tarjeta.code, None)
+        self.canvas.itemconfigure(tarjeta.tag, state="hidden")
+        self._libres.append(tarjeta)
+
+    def _dibujar(self, tarjeta):
+        code = tarjeta.code
+        tarjeta.version = self.versiones.get(code)
+        prod = self.productos.get(code)
+        self._config(tarjeta.codigo, text=code)
+        if not prod:
+            # Si el producto no existe, mostrar valores por defecto
+            self._config(tarjeta.nombre, text="N/A")
+            self._config(tarjeta.precio, text="$--")
+            self._config(tarjeta.fondo, fill=COLOR_DISPONIBLE)
+            return
+        self._config(tarjeta.nombre, text=prod["nombre"])
+        self._config(tarjeta.precio, text=f"${prod['precio']}")
+        self._config(tarjeta.fondo, fill=COLOR_SIN_STOCK if prod["stock"] <= 0 else COLOR_DISPONIBLE)
+
+    def _config(self, item, **opciones):
+        # itemconfigure solo si el valor cambió respecto a lo último que se aplicó a ese item
+        if self._mostrado.get(item) == opciones:
+            return
+        self._mostrado[item] = opciones
+        self.canvas.itemconfigure(item, **opciones)
+        self.config_llamadas += 1
+
+    def _poner_foto(self, tarjeta, foto):
+        # La tarjeta guarda la referencia: un PhotoImage sin referencias en Python desaparece del Canvas
+        tarjeta.foto = foto
+        self._config(tarjeta.imagen, image=foto if foto is not None else "")
+
+    # ---------------------------
+    # API
+    # ---------------------------
+    def refrescar(self, miniaturas=True):
+        if miniaturas:
+            self.miniaturas = True
+        versiones = self.versiones
+        for tarjeta in list(self._tarjetas.values()):
+            if versiones.get(tarjeta.code) != tarjeta.version or tarjeta.version is None:
+                self._dibujar(tarjeta)
+            if miniaturas:
+                # fotos() también detecta si el archivo cambió; None = todavía no está (o no hay imagen)
+                foto = self.fotos(tarjeta.code)
+                if foto is not None:
+                    self._poner_foto(tarjeta, foto)
+
+    def poner_foto(self, code, foto):
+        tarjeta = self._por_codigo.get(code)
+        if tarjeta is not None:
+            self._poner_foto(tarjeta, foto)
+
+    def invalidar(self):
+        self._mostrado.clear()
+        for tarjeta in self._tarjetas.values():
+            tarjeta.version = None
+
+    def visibles(self):
+        return list(self._por_codigo)
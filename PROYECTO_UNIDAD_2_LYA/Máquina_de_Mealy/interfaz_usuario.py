@@ -1,26 +1,22 @@
 # interfaz_usuario.py
 import tkinter as tk
-from tkinter import messagebox
-from PIL import Image, ImageTk
-import os
 
-from definiciones import Input, PRODUCTOS
+from definiciones import Input
 from maquina import MaquinaDispensadoraMealy
 from salidas import set_app
-from pantalla_grafo import PantallaGrafo
+from pantalla_grafo import PantallaGrafo, preparar_grafo
+from trabajos import EjecutorFondo
+from planificador_ui import PlanificadorDisplay
+from temporizadores import Temporizadores
+from reloj import RelojTk
+from miniaturas import MINIATURAS
+from grilla_productos import GrillaProductos
 
 # -------------------------
-# Directorio de imágenes y extensiones soportadas
+# Ajustes globales de tamaño
 # -------------------------
-
-IMG_DIR = os.path.join(os.path.dirname(__file__), "IMG")
-IMG_EXTS = [".png", ".jpg", ".jpeg", ".gif", ".webp"]
-
-# -------------------------
-# Ajustes globales de tamaño de tarjeta (producto)
-# -------------------------
-CARD_W = 50   # ancho de cada tarjeta 
-CARD_H = 130  # alto de cada tarjeta
+# El tamaño de las tarjetas de producto está en grilla_productos.py
+TECLAS_POR_FILA = 5  # teclas por renglón del keypad (catálogos con más letras o números)
 
 # -------------------------
 # Helper: cargar imagen de producto (busca por varias extensiones)
@@ -29,18 +25,17 @@ CARD_H = 130  # alto de cada tarjeta
 # Revisa varias extensiones posibles (png, jpg, etc.)
 # Redimensiona la imagen a un tamaño de miniatura
 # Devuelve un objeto PhotoImage para usar en Tkinter
+# Usa la caché de miniaturas (miniaturas.py): solo decodifica si el archivo cambió
+# preparar_miniatura hace la parte de PIL (sin widgets) y puede correr en un hilo de fondo;
+# la conversión a PhotoImage siempre se hace en el hilo de Tk
 
-def cargar_imagen_producto(code, thumb_size=(CARD_W-10, 60)):
-    for ext in IMG_EXTS:
-        path = os.path.join(IMG_DIR, f"{code}{ext}")
-        if os.path.exists(path):
-            try:
-                img = Image.open(path)
-                img.thumbnail(thumb_size, Image.LANCZOS)
-                return ImageTk.PhotoImage(img)
-            except Exception:
-                return None
-    return None
+THUMB_SIZE = (40, 60)   # también nombra los archivos de la caché en disco: cambiarlo invalida la caché
+
+def preparar_miniatura(code, thumb_size=THUMB_SIZE):
+    return MINIATURAS.preparar(code, thumb_size)
+
+def cargar_imagen_producto(code, thumb_size=THUMB_SIZE):
+    return MINIATURAS.cargar(code, thumb_size)
 
 
 # -------------------------
@@ -55,15 +50,15 @@ class PantallaMain(tk.Frame):
         super().__init__(parent, bg="#2a2a2a")
         self.app = app
         self.maquina = app.maquina
-        self.product_widgets = {}   # diccionario con widgets de cada producto
-        self.product_images = {}    # cache de imágenes de productos
+        self._miniaturas_pendientes = set()
+        self._grafo_pendiente = False   # VER GRAFO ya mandó un render que no ha terminado
 
         self._build_layout()         # construir la interfaz
 
 
     def _build_layout(self):
         # Construye el layout de la pantalla principal.
-        # Divide en dos columnas: Izquierda: grilla de productos (4x4), Derecha: display, keypad, ranura de monedas y bandeja.
+        # Divide en dos columnas: Izquierda: grilla de productos (con scroll), Derecha: display, keypad, ranura de monedas y bandeja.
         
         
         # --------- Left: grid de productos ----------
@@ -90,57 +85,11 @@ class PantallaMain(tk.Frame):
         tk.Label(left, text="Máquina Expendedora", bg="#1f1f1f", fg="white",
                  font=("Arial", 14, "bold")).pack(pady=(0,8))
 
-        # Frame para la grilla de productos
-        grid_frame = tk.Frame(left, bg="#1f1f1f")
-        grid_frame.grid_propagate(False)
-        grid_frame.pack(expand=True, fill="both")
-
-        letras = ['A', 'B', 'C', 'D']
-    
-        # configurar las columnas con minsize para que tengan al menos el ancho de la tarjeta
-        for r in range(4):
-            grid_frame.rowconfigure(r, weight=1, minsize=CARD_H + 8)
-            grid_frame.columnconfigure(r, weight=1, minsize=CARD_W + 12)
-
-        # Crear tarjetas A1..D4 con imagen, nombre y precio
-        for row in range(4):
-            for col in range(4):
-                code = f"{letras[row]}{col+1}"
-
-                # Frame de la tarjeta
-                card = tk.Frame(grid_frame, bg="#ffffff", bd=1, relief="raised",
-                                width=CARD_W, height=CARD_H)
-                card.grid(row=row, column=col, sticky="nsew", padx=6, pady=6)
-                card.grid_propagate(False)    # evita que el contenido cambie el tamaño
-                card.pack_propagate(False)
-
-                # Código del producto
-                lbl_code = tk.Label(card, text=code, anchor="nw", font=("Arial", 9, "bold"), bg="#ffffff")
-                lbl_code.place(x=8, y=6)
-
-                # Imagen del producto
-                img_holder = tk.Frame(card, bg="#ffffff", width=CARD_W, height=50)
-                img_holder.place(x=40, y=25)
-                img_holder.pack_propagate(False)
-                img_label = tk.Label(img_holder, bg="#ffffff")
-                img_label.pack(expand=True)
-
-                # Nombre del producto
-                lbl_name = tk.Label(card, text="Nombre", bg="#ffffff", wraplength=80, justify="center")
-                lbl_name.place(x=30, y=65)
-
-                # Precio del producto
-                lbl_price = tk.Label(card, text="$--", bg="#ffffff", font=("Arial", 10, "bold"))
-                lbl_price.place(x=50, y=100)
-                
-                # Guardar referencias de widgets en diccionario
-                self.product_widgets[code] = {
-                    "frame": card,
-                    "img_label": img_label,
-                    "nombre_label": lbl_name,
-                    "precio_label": lbl_price,
-                    "code_label": lbl_code
-                }
+        # Grilla de productos: un Canvas con scroll que solo dibuja las tarjetas visibles (grilla_productos.py)
+        # Con PRODUCTOS son 4 columnas, una fila por letra (A1..A4, B1..B4...); con catálogos grandes se desplaza
+        self.grilla = GrillaProductos(left, self.maquina.catalogo.codigos(), self.maquina.productos,
+                                      self.maquina.inventario.versiones, fotos=self._foto)
+        self.grilla.pack(expand=True, fill="both")
 
         # --------- Right display + keypad + monedero + dispensador ----------
         
@@ -196,21 +145,22 @@ class PantallaMain(tk.Frame):
         keypad_wr = tk.Frame(right, bg="#222222")
         keypad_wr.pack(pady=(6,12))
 
-        # Botones de letras (A-D)
+        # Las teclas salen del catálogo de la máquina (A-D y 1-4 con PRODUCTOS); TECLAS_POR_FILA por renglón
+        # Botones de letras
         letras_frame = tk.Frame(keypad_wr, bg="#222222")
         letras_frame.pack()
-        for letra in ['A', 'B', 'C', 'D']:
+        for i, letra in enumerate(self.maquina.catalogo.letras):
             b = tk.Button(letras_frame, text=letra, width=4, height=2,
                           command=lambda L=letra: self._press_letra(L))
-            b.pack(side="left", padx=6, pady=6)
+            b.grid(row=i // TECLAS_POR_FILA, column=i % TECLAS_POR_FILA, padx=6, pady=6)
 
-        # Botones de números (1-4)
+        # Botones de números
         nums_frame = tk.Frame(keypad_wr, bg="#222222")
         nums_frame.pack()
-        for numero in ['1', '2', '3', '4']:
+        for i, numero in enumerate(self.maquina.catalogo.numeros):
             b = tk.Button(nums_frame, text=numero, width=4, height=2,
                           command=lambda N=numero: self._press_numero(N))
-            b.pack(side="left", padx=6, pady=6)
+            b.grid(row=i // TECLAS_POR_FILA, column=i % TECLAS_POR_FILA, padx=6, pady=6)
 
         # Botones acción (Confirmar, Cancelar, Ver Grafo)
         acciones = tk.Frame(right, bg="#222222")
@@ -270,25 +220,37 @@ class PantallaMain(tk.Frame):
             self.show_temporary_message("Seleccione un producto primero.", 1200)
 
     def _ver_grafo(self):
-        # Intenta generar el grafo usando Graphviz
+        # Genera el grafo (Graphviz) y prepara la imagen (PIL) en segundo plano;
+        # la UI sigue respondiendo y al terminar se muestra PantallaGrafo
+        # Se dibuja con una copia de los contadores: las transiciones más usadas se ven más gruesas
+        # Mientras haya un render pendiente, los clics repetidos se ignoran
+        if self._grafo_pendiente:
+            return
+        self._grafo_pendiente = True
+        self.app.ejecutor.enviar(
+            preparar_grafo, list(self.maquina.conteo),
+            al_terminar=self._grafo_listo,
+            al_fallar=self._grafo_fallo,
+        )
+
+    def _grafo_listo(self, img):
+        self._grafo_pendiente = False
+        if img is None:
+            self.show_temporary_message("Graphviz no disponible o error al generar grafo.", 1400)
+            return
         try:
-            from salidas import generar_grafo_png
-            ruta = generar_grafo_png("grafo_estados")
+            # Cargar la imagen en el frame PantallaGrafo y mostrarlo
+            self.app.obtener_pantalla("PantallaGrafo").mostrar_imagen(img)
+            self.app.mostrar_pantalla("PantallaGrafo")
         except Exception as e:
-            ruta = None
-            print("[PantallaMain] generar_grafo_png error:", e)
+            # Si Graphviz no está disponible o falla, mostrar mensaje temporal
+            print("[PantallaMain] no se pudo mostrar PantallaGrafo:", e)
+            self.show_temporary_message("No se pudo mostrar grafo.", 1200)
 
-        if ruta and os.path.exists(ruta):
-            try:
-                # # Cargar la imagen en el frame PantallaGrafo y mostrarlo
-                self.app.frames["PantallaGrafo"].cargar_imagen(ruta)
-                self.app.mostrar_pantalla("PantallaGrafo")
-            except Exception as e:
-                # Si Graphviz no está disponible o falla, mostrar mensaje temporal
-                print("[PantallaMain] no se pudo mostrar PantallaGrafo:", e)
-                self.show_temporary_message("No se pudo mostrar grafo.", 1200)
-        else:
-            self.show_temporary_message("Graphviz no disponible o error al generar grafo.", 1400)
+    def _grafo_fallo(self, error):
+        self._grafo_pendiente = False
+        print("[PantallaMain] generar_grafo_png error:", error)
+        self.show_temporary_message("Graphviz no disponible o error al generar grafo.", 1400)
 
     def _confirmar(self):
         # Envía la acción de confirmar compra a la máquina
@@ -300,51 +262,62 @@ class PantallaMain(tk.Frame):
     def show_temporary_message(self, msg, ms=1200):
         # Muestra un mensaje temporal en el display derecho
         # Después de 'ms' milisegundos, restaura el texto anterior
-        prev = self.info_label.cget("text")
-        self.info_label.config(text=msg)
-        self.after(ms, lambda: self.info_label.config(text=prev))
+        poner = self.app.planificador.poner
+        prev = self.app.planificador.valor(self.info_label, "text")
+        poner(self.info_label, text=msg)
+        self.app.temporizadores.programar("display", ms, lambda: poner(self.info_label, text=prev))
 
     def _refresh_display_from_machine(self):
         # Sincroniza el display con el estado actual de la máquina
+        # Escribe sobre lo que acaban de poner las salidas; el planificador solo aplica el resultado final
+        # El display vuelve a reflejar la máquina: un reset pendiente ya no aplica
+        self.app.temporizadores.cancelar("display")
+        poner = self.app.planificador.poner
         code = self.maquina.selected_code or self.maquina.codigo_buffer or "__"
         prod = self.maquina.selected_product
         credito = self.maquina.credito
         # Display izquierdo: código seleccionado
-        self.display_code_label.config(text=code)
+        poner(self.display_code_label, text=code)
         # Display derecho: información del producto y crédito
         if prod:
-            self.info_label.config(text=f"{prod['nombre']}\nPrecio: ${prod['precio']}\nIngresado: ${credito}")
+            poner(self.info_label, text=f"{prod['nombre']}\nPrecio: ${prod['precio']}\nIngresado: ${credito}")
         else:
-            self.info_label.config(text=f"Ingrese código\nIngresado: ${credito}")
-
-    def refresh_products(self):
-        # Refresca las tarjetas de productos desde el catálogo PRODUCTOS
-        for code, widgets in self.product_widgets.items():
-            prod = PRODUCTOS.get(code)
-            if not prod:
-                # Si el producto no existe, mostrar valores por defecto
-                widgets["nombre_label"].config(text="N/A")
-                widgets["precio_label"].config(text="$--")
-                continue
-            # Actualizar nombre y precio.
-            widgets["nombre_label"].config(text=prod["nombre"])
-            widgets["precio_label"].config(text=f"${prod['precio']}")
-
-            # Cargar imagen del producto (si existe)
-            img = cargar_imagen_producto(code)
-            if img:
-                widgets["img_label"].config(image=img)
-                widgets["img_label"].image = img
-                self.product_images[code] = img
-            else:
-                # Si no hay imagen, limpiar el espacio
-                widgets["img_label"].config(image="", text="")
-
-            # Si no hay stock, atenuar la tarjeta con un color distinto
-            if prod["stock"] <= 0:
-                widgets["frame"].config(bg="#f3adad")   # rojo claro = sin stock
-            else:
-                widgets["frame"].config(bg="#ffffff")   # blanco = disponible
+            poner(self.info_label, text=f"Ingrese código\nIngresado: ${credito}")
+
+    def refresh_products(self, miniaturas=True):
+        # Refresca las tarjetas de productos desde el catálogo de la máquina (PRODUCTOS por omisión)
+        # Solo se revisan las tarjetas visibles de la grilla; de ellas, solo se redibujan las que cambiaron
+        # de versión en el inventario (venta, reposición, precio) y solo los items con un valor distinto
+        # miniaturas=False: solo textos y colores (el primer refresco, antes de que la ventana se dibuje)
+        self.grilla.refrescar(miniaturas)
+
+    @property
+    def config_llamadas(self):
+        # contador de itemconfigure reales sobre las tarjetas
+        return self.grilla.config_llamadas
+
+    def foto_producto(self, code):
+        # Miniatura ya lista del producto (o None); la usa la animación de entrega
+        return MINIATURAS.foto_vigente(code, THUMB_SIZE)
+
+    def _foto(self, code):
+        # Imagen del producto (si existe): de la caché en memoria si el archivo no cambió,
+        # si no, se decodifica en segundo plano (una sola vez aunque se pida varias veces)
+        # y la grilla la recibe en _aplicar_miniatura; mientras tanto la tarjeta queda sin imagen
+        photo = MINIATURAS.foto_vigente(code, THUMB_SIZE)
+        if photo is None and code not in self._miniaturas_pendientes:
+            self._miniaturas_pendientes.add(code)
+            self.app.ejecutor.enviar(
+                preparar_miniatura, code,
+                al_terminar=lambda res, code=code: self._aplicar_miniatura(code, *res),
+            )
+        return photo
+
+    def _aplicar_miniatura(self, code, firma, img):
+        # Corre en el hilo de Tk cuando la miniatura ya está decodificada
+        self._miniaturas_pendientes.discard(code)
+        photo = MINIATURAS.guardar_foto(code, THUMB_SIZE, firma, img) if img is not None else None
+        self.grilla.poner_foto(code, photo)
 
 
 # -------------------------
@@ -358,6 +331,17 @@ class VendingMachineApp:
         self.root.configure(bg="#2a2a2a")
         self.maquina = maquina
 
+        # Trabajo bloqueante (Graphviz, decodificar imágenes) fuera del hilo de Tk
+        self.ejecutor = EjecutorFondo(root)
+
+        # Textos del display: un solo config por widget y por evento (ver planificador_ui.py)
+        self.planificador = PlanificadorDisplay(root)
+
+        # Todos los callbacks diferidos (resets del display, animación, cancelación por inactividad)
+        # son temporizadores con nombre sobre un solo root.after (ver temporizadores.py y reloj.py)
+        self.temporizadores = Temporizadores(RelojTk(root))
+        maquina.temporizadores = self.temporizadores
+
         # Contenedor principal donde se apilan los frames (pantallas)
         # Se usa como stack para cambiar entre PantallaMain y PantallaGrafo
         self.container = tk.Frame(root, bg="#2a2a2a")
@@ -366,14 +350,15 @@ class VendingMachineApp:
         # Crear frames:
         # PantallaMain: vista principal con display, keypad, ranura y bandeja
         # PantallaGrafo: vista separada para mostrar el grafo generado en PNG
+        # Solo PantallaMain se construye al arrancar; las demás la primera vez que se piden (obtener_pantalla)
+        # Los frames se colocan en la misma celda de la grilla (superpuestos) y tkraise() decide cuál se ve
         self.frames = {}
-        self.frames["PantallaMain"] = PantallaMain(parent=self.container, app=self)
-        self.frames["PantallaGrafo"] = PantallaGrafo(parent=self.container, app=self)
-       
-        # Colocar los frames en la grilla (superpuestos en el mismo espacio)
-        # Se usa tkraise() para decidir cuál se muestra
-        for f in self.frames.values():
-            f.grid(row=0, column=0, sticky="nsew")
+        self.obtener_pantalla("PantallaMain")
+
+        # Acciones que esperan a que la ventana ya se vea (ver al_primera_pintura)
+        self._tras_pintura = []
+        self._pintada = False
+        self.frames["PantallaMain"].bind("<Expose>", self._primera_pintura)
 
         # Registrar la app en salidas.py para que las funciones de salida puedan actualizar la UI
         set_app(self)
@@ -392,22 +377,59 @@ class VendingMachineApp:
         # Mostrar la pantalla principal
         self.mostrar_pantalla("PantallaMain")
 
-        # Refrescar productos visuales (nombres, precios, imagenes, stock)
-        main.refresh_products()
+        # Refrescar productos visuales (nombres, precios, stock); las imágenes se piden cuando la ventana
+        # ya se dibujó y van apareciendo conforme se decodifican en segundo plano
+        main.refresh_products(miniaturas=False)
+        self.al_primera_pintura(lambda: main.refresh_products())
 
         # Registrar app en salidas
         set_app(self)
 
+    # Obtener pantalla:
+    # Regresa el frame de la pantalla y lo construye si todavía no existe
+    # Un frame recién construido queda debajo del que se está viendo: solo mostrar_pantalla lo levanta
+    PANTALLAS = {"PantallaMain": PantallaMain, "PantallaGrafo": PantallaGrafo}
+
+    def obtener_pantalla(self, page_name):
+        frame = self.frames.get(page_name)
+        if frame is None:
+            frame = self.frames[page_name] = self.PANTALLAS[page_name](parent=self.container, app=self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            frame.lower()
+        return frame
+
     # Mostrar pantalla:
     # Normaliza nombres y decide qué frame levantar
     # Por compatibilidad, cualquier nombre distinto a PantallaGrafo muestra PantallaMain
     def mostrar_pantalla(self, page_name):
-        if page_name in ("PantallaGrafo", "PantallaGrafo"):
-            frame = self.frames.get("PantallaGrafo")
+        if page_name == "PantallaGrafo":
+            frame = self.obtener_pantalla("PantallaGrafo")
+        else:
+            frame = self.obtener_pantalla("PantallaMain")
+        frame.tkraise()
+
+    # Primera pintura:
+    # al_primera_pintura(fn) corre fn() una sola vez, cuando la pantalla principal ya se dibujó
+    # (su primer <Expose>, y después lo que Tk tenía pendiente en idle, que incluye el redibujo)
+    # Si la ventana ya se dibujó, fn() corre de inmediato
+    def al_primera_pintura(self, fn):
+        if self._pintada:
+            fn()
         else:
-            frame = self.frames.get("PantallaMain")
-        if frame:
-            frame.tkraise()
+            self._tras_pintura.append(fn)
+
+    def _primera_pintura(self, event=None):
+        self.frames["PantallaMain"].unbind("<Expose>")
+        self.root.after_idle(self._correr_tras_pintura)
+
+    def _correr_tras_pintura(self):
+        self._pintada = True
+        pendientes, self._tras_pintura = self._tras_pintura, []
+        for fn in pendientes:
+            try:
+                fn()
+            except Exception as e:
+                print("[VendingMachineApp] error tras la primera pintura:", e)
 
     # Métodos auxiliares que pueden usarse desde UI 
     def ingresar_letra(self, letra):
@@ -0,0 +1,181 @@
+# inventario.py
+import itertools
+import random
+import sys
+import threading
+
+from catalogo import CATALOGO, Catalogo
+from definiciones import PRODUCTOS
+
+# -----------------------------
+# Inventario concurrente con reservas
+# -----------------------------
+# Envuelve un catálogo con la forma de PRODUCTOS ({código: {"nombre", "precio", "stock"}})
+# La máquina aparta una unidad al seleccionar el producto (reservar) y la descuenta al entregar (confirmar)
+# Si la compra se cancela, la unidad se devuelve (liberar)
+# Disponible = stock - reservado, así dos máquinas no pueden vender la misma última unidad
+# Cada código usa uno de 'franjas' candados (lock striping): operaciones sobre códigos distintos
+# casi nunca compiten por el mismo candado
+# El stock sigue viviendo en el diccionario del catálogo, así la UI lo lee igual que antes
+#
+# Notificación de cambios: versiones[código] cambia cada vez que cambia algo visible del producto
+# (stock al vender o reponer, nombre o precio con actualizar()); las reservas no cuentan
+# Quien dibuja el catálogo guarda la última versión que vio y solo redibuja los códigos cuya versión cambió
+#
+# catalogo: trie de los códigos (catalogo.py) con el que las máquinas validan el teclado; los códigos
+# de un inventario no cambian, así que se arma una vez y lo comparten todas las máquinas del inventario
+
+class InventarioConcurrente:
+    def __init__(self, productos=None, franjas=8):
+        self.productos = PRODUCTOS if productos is None else productos
+        self.catalogo = CATALOGO if self.productos is PRODUCTOS else Catalogo(self.productos)
+        self.reservado = dict.fromkeys(self.productos, 0)
+        self._reloj = itertools.count(1)   # next() es atómico: versiones únicas y crecientes
+        self.versiones = {code: next(self._reloj) for code in self.productos}
+        self._candados = [threading.Lock() for _ in range(franjas)]
+        self._candado_de = {
+            code: self._candados[i % franjas] for i, code in enumerate(sorted(self.productos))
+        }
+
+    def disponible(self, code):
+        with self._candado_de[code]:
+            return self.productos[code]["stock"] - self.reservado[code]
+
+    def reservar(self, code):
+        # Aparta una unidad; regresa False si no hay unidades libres
+        with self._candado_de[code]:
+            if self.productos[code]["stock"] - self.reservado[code] <= 0:
+                return False
+            self.reservado[code] += 1
+            return True
+
+    def confirmar(self, code):
+        # Convierte una reserva en venta: descuenta el stock
+        with self._candado_de[code]:
+            self.reservado[code] -= 1
+            self.productos[code]["stock"] -= 1
+            self.versiones[code] = next(self._reloj)
+
+    def liberar(self, code):
+        # Devuelve una unidad reservada sin venderla
+        with self._candado_de[code]:
+            self.reservado[code] -= 1
+
+    def reponer(self, code, cantidad):
+        with self._candado_de[code]:
+            self.productos[code]["stock"] += cantidad
+            self.versiones[code] = next(self._reloj)
+
+    def actualizar(self, code, **campos):
+        # Cambia nombre/precio/stock de un producto, p. ej. actualizar("A1", precio=13)
+        with self._candado_de[code]:
+            self.productos[code].update(campos)
+            self.versiones[code] = next(self._reloj)
+
+
+# Inventario compartido por todas las máquinas que usan el catálogo global PRODUCTOS
+INVENTARIO = InventarioConcurrente(PRODUCTOS)
+
+
+# -----------------------------
+# Prueba de estrés
+# -----------------------------
+# 1) Muchos hilos reservan, confirman y liberan al azar sobre un stock pequeño
+# 2) Muchas máquinas (una por hilo) compran sobre un mismo inventario compartido
+# En ambos casos se verifica que el stock nunca queda negativo, que no sobran reservas
+# y que lo vendido cuadra exactamente con lo descontado
+# Lanza AssertionError si algo no cuadra
+
+def prueba_estres(hilos=32, operaciones=5_000, stock=25):
+    import copy
+    from definiciones import Input, Output
+    from maquina import MaquinaDispensadoraMealy
+    from salidas_headless import funciones_nulas
+
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)   # forzar cambios de hilo muy frecuentes
+    try:
+        # --- 1) operaciones directas sobre el inventario ---
+        catalogo = copy.deepcopy(PRODUCTOS)
+        for prod in catalogo.values():
+            prod["stock"] = stock
+        inv = InventarioConcurrente(catalogo)
+        codigos = list(catalogo)
+        vendidos = [0] * hilos
+        negativos = []
+
+        def trabajador(k):
+            rng = random.Random(k)
+            for _ in range(operaciones):
+                code = rng.choice(codigos)
+                if inv.reservar(code):
+                    if rng.random() < 0.5:
+                        inv.confirmar(code)
+                        vendidos[k] += 1
+                    else:
+                        inv.liberar(code)
+                if catalogo[code]["stock"] < 0:
+                    negativos.append(code)
+
+        _correr_hilos(trabajador, hilos)
+        assert not negativos, f"stock negativo en {set(negativos)}"
+        assert all(v == 0 for v in inv.reservado.values()), "quedaron reservas colgadas"
+        total_inicial = stock * len(codigos)
+        total_final = sum(p["stock"] for p in catalogo.values())
+        assert total_inicial - total_final == sum(vendidos), "lo vendido no cuadra con el stock"
+        assert all(p["stock"] >= 0 for p in catalogo.values())
+
+        # --- 2) máquinas completas compitiendo por la última unidad ---
+        # En cada ronda se repone UNA unidad de A1 y todas las máquinas intentan comprarla a la vez
+        catalogo = copy.deepcopy(PRODUCTOS)
+        inv = InventarioConcurrente(catalogo)
+        entregas = [0] * hilos
+        rondas = max(1, operaciones // 50)
+        sobreventas = []
+
+        def cerrar_ronda():
+            if catalogo["A1"]["stock"] < 0 or sum(entregas) > cerrar_ronda.repuesto:
+                sobreventas.append(catalogo["A1"]["stock"])
+            catalogo["A1"]["stock"] = 1
+            cerrar_ronda.repuesto += 1
+        cerrar_ronda.repuesto = 0
+        barrera = threading.Barrier(hilos, action=cerrar_ronda)
+
+        def comprador(k):
+            funciones = dict(funciones_nulas)
+
+            def contar_entrega(machine, payload=None):
+                entregas[k] += 1
+                machine._reset()
+
+            funciones[Output.DELIVER] = contar_entrega
+            m = MaquinaDispensadoraMealy(funciones, inventario=inv)
+            for _ in range(rondas):
+                barrera.wait()
+                m.procesar_entrada(Input.LETRA, "A")
+                m.procesar_entrada(Input.NUMERO, "1")
+                m.procesar_entrada(Input.INSERT_20, None)
+                m.procesar_entrada(Input.CONFIRMAR, None)
+                m.procesar_entrada(Input.CANCELAR, None)
+            barrera.wait()
+
+        _correr_hilos(comprador, hilos)
+        assert not sobreventas, f"sobreventa en {len(sobreventas)} de {rondas} rondas"
+        assert sum(entregas) == rondas, "cada unidad repuesta debe venderse exactamente una vez"
+        assert all(v == 0 for v in inv.reservado.values()), "quedaron reservas colgadas"
+    finally:
+        sys.setswitchinterval(intervalo)
+    return True
+
+
+def _correr_hilos(fn, n):
+    hilos = [threading.Thread(target=fn, args=(k,)) for k in range(n)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+
+if __name__ == "__main__":
+    prueba_estres()
+    print("prueba de estrés del inventario: OK")
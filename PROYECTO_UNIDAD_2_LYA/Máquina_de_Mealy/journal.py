@@ -0,0 +1,412 @@
+# journal.py
+import copy
+import json
+import os
+import shutil
+import struct
+import time
+import zlib
+
+from definiciones import Input, Output, PRODUCTOS
+
+# -----------------------------
+# Journal binario de solo-anexar (write-ahead log)
+# -----------------------------
+# Guarda cada entrada de procesar_entrada (antes de aplicarla), cada salida emitida y cada reset
+# Al arrancar, se reconstruye el catálogo y la transacción en curso repitiendo las entradas
+# sobre una máquina headless (ver recuperar)
+#
+# Formato del archivo:
+#   MAGIA, luego registros: cabecera <BII (tipo, longitud del cuerpo, crc32 del cuerpo) + cuerpo
+#   CATALOGO: JSON del catálogo al crear el journal (siempre es el primer registro)
+#   ENTRADA:  <QBB (tiempo en µs, Input.value, tipo de valor) + valor (utf-8 o JSON)
+#   SALIDA:   <QB (tiempo en µs, Output.value) + payload en JSON (vacío si es None)
+#   RESET:    <Q (tiempo en µs); la UI llama machine._reset() fuera de procesar_entrada
+#   ESTADO:   JSON {"catalogo", "maquina"}: foto completa; se escribe una al reabrir el journal y otra
+#             cada 'foto_cada' entradas, así la recuperación solo decodifica desde la última
+# Si el proceso muere a mitad de una escritura, el último registro queda cortado o con crc malo:
+# la lectura se detiene ahí y al reabrir se trunca el archivo en el último registro válido
+#
+# Políticas de fsync (qué tanto dato se puede perder contra qué tan rápido se escribe):
+#   "evento":    flush + fsync en cada entrada (no se pierde nada, la más lenta)
+#   "lote":      fsync cada 'cada_n' entradas
+#   "intervalo": fsync si pasaron 'intervalo' segundos desde el último (se revisa al anexar)
+#   "nunca":     solo lo que decida el sistema operativo (para medir)
+# Las salidas se escriben al buffer pero solo se sincronizan junto con la siguiente entrada
+#
+# Tamaño: al abrir un journal de más de 'compactar_bytes' se compacta (ver compactar): el archivo vuelve
+# a empezar con el catálogo y la foto actuales y el historial anterior queda en '<journal>.1'
+
+MAGIA = b"MEALYJ1\n"
+
+CATALOGO, ENTRADA, SALIDA, ESTADO, RESET = 1, 2, 3, 4, 5
+
+CABECERA = struct.Struct("<BII")
+_ENTRADA = struct.Struct("<QBB")
+_SALIDA = struct.Struct("<QB")
+_RESET = struct.Struct("<Q")
+
+# tipo de valor en un registro ENTRADA
+_NINGUNO, _TEXTO, _JSON = 0, 1, 2
+
+_INPUT_DE = {e.value: e for e in Input}
+_OUTPUT_DE = {o.value: o for o in Output}
+
+POLITICAS = ("evento", "lote", "intervalo", "nunca")
+
+RUTA_JOURNAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal_maquina.bin")
+
+FOTO_CADA = 1_000               # entradas entre dos registros ESTADO
+COMPACTAR_BYTES = 4 * 1024 * 1024
+
+
+def _us():
+    return time.time_ns() // 1000
+
+
+def codificar_registro(tipo, cuerpo):
+    return CABECERA.pack(tipo, len(cuerpo), zlib.crc32(cuerpo)) + cuerpo
+
+
+def _codificar_valor(valor):
+    if valor is None:
+        return _NINGUNO, b""
+    if isinstance(valor, str):
+        return _TEXTO, valor.encode("utf-8")
+    return _JSON, json.dumps(valor).encode("utf-8")
+
+
+def _decodificar_valor(tipo_valor, datos):
+    if tipo_valor == _NINGUNO:
+        return None
+    if tipo_valor == _TEXTO:
+        return datos.decode("utf-8")
+    return json.loads(datos)
+
+
+# -----------------------------
+# Lectura
+# -----------------------------
+# leer_registros(ruta) genera (offset, tipo, datos decodificados)
+#   CATALOGO / ESTADO → diccionario
+#   ENTRADA → (tiempo_us, Input, valor)
+#   SALIDA  → (tiempo_us, Output, payload)
+#   RESET   → tiempo_us
+# Se detiene en el primer registro incompleto o corrupto; 'fin_valido(ruta)' da ese offset
+
+def _iterar(f):
+    if f.read(len(MAGIA)) != MAGIA:
+        raise ValueError("no es un journal de la máquina")
+    offset = len(MAGIA)
+    while True:
+        cabecera = f.read(CABECERA.size)
+        if len(cabecera) < CABECERA.size:
+            return offset
+        tipo, longitud, crc = CABECERA.unpack(cabecera)
+        cuerpo = f.read(longitud)
+        if len(cuerpo) < longitud or zlib.crc32(cuerpo) != crc:
+            return offset
+        yield offset, tipo, cuerpo
+        offset += CABECERA.size + longitud
+
+
+def decodificar(tipo, cuerpo):
+    if tipo == ENTRADA:
+        t, entrada, tipo_valor = _ENTRADA.unpack_from(cuerpo)
+        return t, _INPUT_DE[entrada], _decodificar_valor(tipo_valor, cuerpo[_ENTRADA.size:])
+    if tipo == SALIDA:
+        t, salida = _SALIDA.unpack_from(cuerpo)
+        resto = cuerpo[_SALIDA.size:]
+        return t, _OUTPUT_DE[salida], json.loads(resto) if resto else None
+    if tipo == RESET:
+        return _RESET.unpack(cuerpo)[0]
+    return json.loads(cuerpo)
+
+
+def leer_registros(ruta):
+    with open(ruta, "rb") as f:
+        for offset, tipo, cuerpo in _iterar(f):
+            yield offset, tipo, decodificar(tipo, cuerpo)
+
+
+def fin_valido(ruta):
+    with open(ruta, "rb") as f:
+        it = _iterar(f)
+        while True:
+            try:
+                next(it)
+            except StopIteration as fin:
+                return fin.value
+
+
+# -----------------------------
+# Journal → escritura
+# -----------------------------
+
+class Journal:
+    def __init__(self, ruta, catalogo=None, politica="lote", cada_n=64, intervalo=1.0, foto_cada=FOTO_CADA):
+        if politica not in POLITICAS:
+            raise ValueError(f"política de fsync desconocida: {politica}")
+        self.ruta = ruta
+        self.politica = politica
+        self.cada_n = cada_n
+        self.intervalo = intervalo
+        self._sin_sync = 0
+        self._ultimo_sync = time.monotonic()
+        self.entradas = 0
+        self.fsyncs = 0
+        self.foto_cada = foto_cada
+        self.fuente_foto = None    # callable → foto de la máquina (lo conecta abrir_journal)
+        self._desde_foto = 0
+
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) < len(MAGIA)
+        if not nuevo:
+            # descartar una cola cortada por un crash antes de seguir anexando
+            fin = fin_valido(ruta)
+            if fin < os.path.getsize(ruta):
+                with open(ruta, "r+b") as f:
+                    f.truncate(fin)
+        self._f = open(ruta, "wb" if nuevo else "ab")
+        if nuevo:
+            catalogo = PRODUCTOS if catalogo is None else catalogo
+            self._f.write(MAGIA)
+            self._f.write(codificar_registro(CATALOGO, json.dumps(catalogo).encode("utf-8")))
+            self.sincronizar()
+
+    def registrar_entrada(self, entrada, valor=None):
+        # La foto periódica va antes de la entrada: es el estado previo a aplicarla
+        if self.fuente_foto is not None and self.foto_cada and self._desde_foto >= self.foto_cada:
+            self.registrar_estado(self.fuente_foto())
+        tipo_valor, datos = _codificar_valor(valor)
+        cuerpo = _ENTRADA.pack(_us(), entrada.value, tipo_valor) + datos
+        self._f.write(codificar_registro(ENTRADA, cuerpo))
+        self.entradas += 1
+        self._sin_sync += 1
+        self._desde_foto += 1
+
+        if self.politica == "evento":
+            self.sincronizar()
+        elif self.politica == "lote":
+            if self._sin_sync >= self.cada_n:
+                self.sincronizar()
+        elif self.politica == "intervalo":
+            if time.monotonic() - self._ultimo_sync >= self.intervalo:
+                self.sincronizar()
+
+    def registrar_salida(self, salida, payload=None):
+        cuerpo = _SALIDA.pack(_us(), salida.value)
+        if payload is not None:
+            cuerpo += json.dumps(payload).encode("utf-8")
+        self._f.write(codificar_registro(SALIDA, cuerpo))
+
+    def registrar_reset(self):
+        self._f.write(codificar_registro(RESET, _RESET.pack(_us())))
+
+    def registrar_estado(self, datos):
+        # Registro ESTADO: foto completa (catálogo + máquina), ver foto()
+        self._f.write(codificar_registro(ESTADO, json.dumps(datos).encode("utf-8")))
+        self._desde_foto = 0
+
+    def sincronizar(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._sin_sync = 0
+        self._ultimo_sync = time.monotonic()
+        self.fsyncs += 1
+
+    def cerrar(self):
+        if not self._f.closed:
+            self.sincronizar()
+            self._f.close()
+
+
+# -----------------------------
+# Fotos y recuperación
+# -----------------------------
+# foto(maquina): diccionario JSON con el catálogo y la transacción en curso (registro ESTADO)
+# maquina_desde_foto(foto, funciones): máquina headless con su propia copia del catálogo, en ese punto
+# recuperar(ruta) → (catálogo, estado de la máquina) tal como quedaron tras la última entrada válida
+# Parte de la última foto (o del catálogo inicial) y repite las entradas y resets que le siguen;
+# lo anterior a esa foto solo se recorre (cabecera y crc), no se decodifica
+# Las salidas no se ejecutan (funciones_inertes): los resets de la UI vienen en el propio journal
+# Si el proceso terminó después de DELIVER y antes del reset de la UI, la compra ya se entregó y el
+# cambio ya se dio: se cierra como la habría cerrado la UI (si no, el crédito se devolvería o gastaría otra vez)
+
+def foto(maquina):
+    return {"catalogo": copy.deepcopy(maquina.productos), "maquina": maquina.exportar_estado()}
+
+
+def maquina_desde_foto(datos, funciones=None):
+    from maquina import MaquinaDispensadoraMealy
+    from salidas_headless import funciones_inertes
+
+    m = MaquinaDispensadoraMealy(
+        funciones_inertes if funciones is None else funciones,
+        productos=copy.deepcopy(datos["catalogo"]),
+    )
+    if datos.get("maquina"):
+        m.restaurar_estado(datos["maquina"])
+    return m
+
+
+def recuperar(ruta):
+    cola = []
+    with open(ruta, "rb") as f:
+        for _, tipo, cuerpo in _iterar(f):
+            if tipo == CATALOGO or tipo == ESTADO:
+                cola = []
+            if tipo != SALIDA:
+                cola.append((tipo, cuerpo))
+
+    m = None
+    for tipo, cuerpo in cola:
+        datos = decodificar(tipo, cuerpo)
+        if tipo == CATALOGO:
+            m = maquina_desde_foto({"catalogo": datos})
+        elif tipo == ESTADO:
+            m = maquina_desde_foto(datos)
+        elif tipo == ENTRADA:
+            _, entrada, valor = datos
+            m.procesar_entrada(entrada, valor)
+        elif tipo == RESET:
+            m._reset()
+    if m is None:
+        raise ValueError("journal sin catálogo inicial")
+    if m._entregado:
+        m._reset()
+    return m.productos, m.exportar_estado()
+
+
+# compactar(ruta, maquina): reescribe el journal como catálogo + foto de 'maquina' (ya recuperada)
+# El historial completo se copia antes a '<ruta>.1' (reemplaza la copia anterior) para reproduccion.py
+# En cada paso 'ruta' es un journal válido: copia, archivo nuevo completo con fsync y os.replace atómico
+
+def compactar(ruta, maquina):
+    shutil.copyfile(ruta, ruta + ".1")
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(MAGIA)
+        f.write(codificar_registro(CATALOGO, json.dumps(maquina.productos).encode("utf-8")))
+        f.write(codificar_registro(ESTADO, json.dumps(foto(maquina)).encode("utf-8")))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+# abrir_journal(maquina, ruta, politica, ...)
+# Si ya existe un journal: restaura sobre 'maquina' el catálogo y la transacción en curso,
+# y sigue anexando al mismo archivo (compactado si pasó de 'compactar_bytes'). Si no existe: lo crea con
+# el catálogo actual. Deja el journal conectado a la máquina (maquina.journal), con fotos periódicas, y lo regresa
+
+def abrir_journal(maquina, ruta=RUTA_JOURNAL, politica="lote", compactar_bytes=COMPACTAR_BYTES, **opciones):
+    existia = os.path.exists(ruta) and os.path.getsize(ruta) >= len(MAGIA)
+    compactado = False
+    if existia:
+        catalogo, estado = recuperar(ruta)
+        for code, prod in catalogo.items():
+            if code in maquina.productos:
+                maquina.inventario.actualizar(code, **prod)
+        maquina.restaurar_estado(estado)
+        if compactar_bytes and os.path.getsize(ruta) > compactar_bytes:
+            compactar(ruta, maquina)
+            compactado = True
+
+    journal = Journal(ruta, maquina.productos, politica=politica, **opciones)
+    if existia and not compactado:
+        journal.registrar_estado(foto(maquina))
+        journal.sincronizar()
+    journal.fuente_foto = lambda: foto(maquina)
+    maquina.journal = journal
+    return journal
+
+
+# -----------------------------
+# Prueba de recuperación
+# -----------------------------
+# 1) Un proceso hijo compra con el journal en política "evento" y muere (os._exit) dentro de DELIVER,
+#    antes del reset de la UI. Al recuperar: la compra queda cerrada (INICIO, sin crédito), el stock
+#    bajó una sola vez y CANCELAR o CONFIRMAR no devuelven ni entregan nada otra vez
+# 2) Un journal con muchas entradas: la recuperación parte de la última foto periódica, y al pasar de
+#    'compactar_bytes' se compacta sin cambiar el estado recuperado
+# Lanza AssertionError si algo no cuadra
+
+_HIJO = """
+import copy, os
+from definiciones import Input, Output, PRODUCTOS
+from journal import abrir_journal
+from maquina import MaquinaDispensadoraMealy
+from salidas_headless import funciones_nulas
+
+funciones = dict(funciones_nulas)
+funciones[Output.DELIVER] = lambda machine, payload=None: os._exit(0)
+m = MaquinaDispensadoraMealy(funciones, productos=copy.deepcopy(PRODUCTOS))
+abrir_journal(m, {ruta!r}, politica="evento")
+for caracter in {codigo!r}:
+    m.procesar_entrada(Input.LETRA if caracter.isalpha() else Input.NUMERO, caracter)
+for _ in range({monedas}):
+    m.procesar_entrada(Input.INSERT_20)
+m.procesar_entrada(Input.CONFIRMAR)
+os._exit(1)
+"""
+
+
+def prueba_recuperacion():
+    import subprocess
+    import sys
+    import tempfile
+    from definiciones import Estado
+    from maquina import MaquinaDispensadoraMealy
+    from salidas_headless import GrabadoraSalidas
+
+    carpeta = tempfile.mkdtemp(prefix="journal_")
+    try:
+        # 1) muerte justo después de DELIVER
+        ruta = os.path.join(carpeta, "entrega.bin")
+        codigo = next(c for c, p in sorted(PRODUCTOS.items()) if p["stock"] > 0)
+        monedas = -(-PRODUCTOS[codigo]["precio"] // 20) + 1   # de más: hay cambio que no debe volver a salir
+        hijo = subprocess.run(
+            [sys.executable, "-c", _HIJO.format(ruta=ruta, codigo=codigo, monedas=monedas)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        assert hijo.returncode == 0, "el proceso hijo no llegó a DELIVER"
+
+        grabadora = GrabadoraSalidas()
+        m = MaquinaDispensadoraMealy(grabadora.funciones, productos=copy.deepcopy(PRODUCTOS))
+        journal = abrir_journal(m, ruta)
+        assert (m.estado, m.credito, m._reserva) == (Estado.INICIO, 0, None), m.exportar_estado()
+        assert m.productos[codigo]["stock"] == PRODUCTOS[codigo]["stock"] - 1
+        m.procesar_entrada(Input.CANCELAR)
+        m.procesar_entrada(Input.CONFIRMAR)
+        salidas = {salida for salida, _ in grabadora.registro}
+        assert not salidas & {Output.RETURN_CHANGE, Output.DELIVER}, grabadora.registro
+        journal.cerrar()
+        _, estado = recuperar(ruta)
+        assert (estado["estado"], estado["credito"]) == ("INICIO", 0), estado
+
+        # 2) fotos periódicas y compactación
+        ruta = os.path.join(carpeta, "largo.bin")
+        m = MaquinaDispensadoraMealy(GrabadoraSalidas().funciones, productos=copy.deepcopy(PRODUCTOS))
+        journal = abrir_journal(m, ruta, politica="nunca", foto_cada=100)
+        for i in range(2_500):
+            m.procesar_entrada(Input.LETRA, codigo[0])
+            m.procesar_entrada(Input.CANCELAR)
+            if i % 7 == 0:
+                m._reset()
+        m.procesar_entrada(Input.LETRA, codigo[0])
+        esperado = (copy.deepcopy(m.productos), m.exportar_estado())
+        journal.cerrar()
+        assert sum(1 for _, tipo, _ in leer_registros(ruta) if tipo == ESTADO) >= 50
+        assert recuperar(ruta) == esperado
+
+        tam = os.path.getsize(ruta)
+        m = MaquinaDispensadoraMealy(GrabadoraSalidas().funciones, productos=copy.deepcopy(PRODUCTOS))
+        abrir_journal(m, ruta, compactar_bytes=tam // 2).cerrar()
+        assert os.path.getsize(ruta) < tam // 10 and os.path.getsize(ruta + ".1") == tam
+        assert recuperar(ruta) == esperado
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    prueba_recuperacion()
+    print("prueba de recuperación del journal: OK")
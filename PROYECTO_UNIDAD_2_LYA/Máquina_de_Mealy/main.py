@@ -1,9 +1,32 @@
 # main.py
+import time
+_INICIO = time.perf_counter()   # para la medición del arranque (--medir-arranque, ver arranque.py)
+
+import sys
 import tkinter as tk
 from interfaz_usuario import VendingMachineApp
 from maquina import MaquinaDispensadoraMealy 
+from journal import abrir_journal
+from metricas import desde_entorno
+from trazas import Trazador, ruta_traza
+from definiciones import Estado
+
+_IMPORTADO = time.perf_counter()
 
 def main():
+    # Traza Chrome (python main.py --traza traza.json o MEALY_TRAZA): se instala antes de crear widgets
+    # para que también queden envueltos los command= de los botones
+    ruta = ruta_traza()
+    trazador = Trazador(ruta) if ruta else None
+    if trazador is not None:
+        trazador.instalar_tk()
+
+    # Medición del arranque (python main.py --medir-arranque): imprime los tiempos y cierra la ventana
+    medicion = None
+    if "--medir-arranque" in sys.argv[1:]:
+        from arranque import MedicionArranque
+        medicion = MedicionArranque(_INICIO, _IMPORTADO)
+
     root = tk.Tk()
 
     # Tamaño de la ventana
@@ -23,10 +46,40 @@ def main():
 
     # Crear máquina 
     maquina = MaquinaDispensadoraMealy()
+
+    # Journal: si la sesión anterior se cortó, recupera stock y la compra en curso
+    journal = abrir_journal(maquina) if medicion is None else abrir_journal(maquina, medicion.ruta_journal)
+
     app = VendingMachineApp(root, maquina)
+    if maquina.estado != Estado.INICIO:
+        app.frames["PantallaMain"]._refresh_display_from_machine()
+
+    # Métricas de latencia solo si se piden (MEALY_METRICAS=puerto o MEALY_METRICAS=archivo.prom)
+    metricas = desde_entorno(app, maquina)
+
+    if trazador is not None:
+        trazador.instrumentar_maquina(maquina)
+        trazador.instrumentar_app(app)
+
+    def cerrar():
+        journal.cerrar()
+        if metricas is not None:
+            metricas.cerrar()
+        if trazador is not None:
+            trazador.cerrar()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", cerrar)
+
+    if medicion is not None:
+        medicion.marcar("ventana")
+        medicion.seguir(app, al_terminar=cerrar)
 
     root.mainloop()
 
+    if medicion is not None:
+        medicion.reportar()
+
 
 # Ejecutar la aplicación desde el main siempre
 if __name__ == "__main__":
@@ -1,163 +1,196 @@
 # maquina.py
-from definiciones import Estado, Input, Output, PRODUCTOS
-from salidas import funciones_salidas
+import types
+
+from definiciones import (
+    Estado, Input, Output, VALOR_MONEDAS, INACTIVIDAD_MS,
+)
+from especificacion import compilar_tabla, transiciones
+from inventario import INVENTARIO, InventarioConcurrente
+
+# funciones: diccionario Output → handler que recibe las salidas de la máquina
+# Por omisión se usan las salidas de la interfaz (salidas.py, que importa tkinter)
+# Para simulaciones sin interfaz se pasa salidas_headless.funciones_nulas o una GrabadoraSalidas
+# Más handlers por salida: maquina.suscribir(Output.X, fn); fn recibe (machine) o (machine, payload)
+# productos: catálogo que consulta y descuenta la máquina (por omisión el global PRODUCTOS)
+# inventario: InventarioConcurrente compartido con otras máquinas que usan el mismo catálogo
+# Las teclas válidas salen del trie de códigos del inventario (inventario.catalogo, ver catalogo.py):
+# cada tecla se valida contra el código que lleva escrito, no contra listas fijas de letras y números
+# Al seleccionar un producto se aparta una unidad; se descuenta al entregar y se libera al cancelar
+# temporizadores: temporizadores.Temporizadores (lo conecta la UI); con él, una transacción abierta
+# sin entradas durante INACTIVIDAD_MS se cancela sola (entrada CANCELAR, igual que el botón)
 
 class MaquinaDispensadoraMealy:
-    def __init__(self):
+    def __init__(self, funciones=None, productos=None, inventario=None):
+        if funciones is None:
+            from salidas import funciones_salidas
+            funciones = funciones_salidas
+
         self.estado = Estado.INICIO
         self.codigo_buffer = ""       # primero letra, luego número
         self.selected_code = None     # snapshot del código seleccionado
         self.selected_product = None  # snapshot del producto seleccionado
         self.credito = 0              # crédito acumulado
-        self.funciones = funciones_salidas 
+        self._suscriptores = {salida: [] for salida in Output}
+        self.conectar_salidas(funciones)
+        if inventario is None:
+            inventario = INVENTARIO if productos is None else InventarioConcurrente(productos)
+        self.inventario = inventario
+        self.productos = inventario.productos
+        self.catalogo = inventario.catalogo
+        self._reserva = None          # código con una unidad apartada en el inventario
+        self.journal = None           # journal.Journal que registra entradas y salidas (opcional)
+        self.temporizadores = None    # temporizadores.Temporizadores para la cancelación automática
+        self._entregado = False       # ya se emitió DELIVER y falta el reset de la UI
+        self.conteo = [0] * _N_TRANSICIONES   # veces que se tomó cada transición (especificacion.transiciones())
 
+    # La función de transición se resuelve con la tabla precompilada _TRANSICIONES:
+    # una búsqueda por estado y otra por entrada, sin crear objetos por evento
+    # Entradas que no pertenecen a Input se ignoran igual que antes
     def procesar_entrada(self, entrada, valor=None):
-        
-        # ---------------------------
-        # 1) ENTRADA LETRA (A–D)
-        # ---------------------------
-        if entrada == Input.LETRA:
-            letra = str(valor).upper()
-            if letra not in ['A','B','C','D']:
-                self._emit(Output.SHOW_MESSAGE, f"Letra inválida: {valor}")
-                return
-
-            self.codigo_buffer = letra
-            self.selected_code = None
-            self.selected_product = None
-            self.estado = Estado.BUILD_CODE
-            self._emit(Output.SHOW_CODE) 
-            return
-
-        # ---------------------------
-        # 2) ENTRADA NÚMERO (1–4)
-        # ---------------------------
-        if entrada == Input.NUMERO:
-            if self.estado != Estado.BUILD_CODE or not self.codigo_buffer:
-                self._emit(Output.SHOW_MESSAGE, "Seleccione primero una letra (A-D).")
-                return
-
-            numero = str(valor)
-            if numero not in ['1','2','3','4']:
-                self._emit(Output.SHOW_MESSAGE, f"Número inválido: {valor}")
-                self._reset_buffer()
-                return
-
-            codigo = f"{self.codigo_buffer}{numero}"
-            prod = PRODUCTOS.get(codigo)
-
-            if not prod:
-                self._emit(Output.SHOW_MESSAGE, f"Código {codigo} no existe.")
-                self._reset()
-                return
-
-            if prod['stock'] <= 0:
-                self._emit(Output.SHOW_MESSAGE, f"Sin stock: {codigo}")
-                self._reset()
-                return
-
-            # Selección válida → guardar snapshot
-            self.selected_code = codigo
-            self.selected_product = {
-                "nombre": prod["nombre"],
-                "precio": prod["precio"],
-                "stock": prod["stock"]
-            }
-
-            self.credito = 0
-            self.estado = Estado.ESPERANDO_DINERO
-
-            # Mandar nombre y precio del producto seleccionado
-            self._emit(Output.SHOW_PRICE, {
-                "nombre": self.selected_product["nombre"],
-                "precio": self.selected_product["precio"]
-            })
-
-            return
-
-        # ---------------------------
-        # 3) ENTRADA DINERO ($1, $5, $10, $20)
-        # ---------------------------
-        if entrada in (Input.INSERT_1, Input.INSERT_5, Input.INSERT_10, Input.INSERT_20):
-            if self.estado != Estado.ESPERANDO_DINERO:
-                self._emit(Output.SHOW_MESSAGE, "Seleccione un producto primero.")
-                return
-
-            added = {
-                Input.INSERT_1: 1,
-                Input.INSERT_5: 5,
-                Input.INSERT_10: 10,
-                Input.INSERT_20: 20
-            }[entrada]
-
-            # Acumular crédito
-            self.credito += added
-
-            # Emitir actualización de crédito
-            self._emit(Output.UPDATE_TOTAL, self.credito)
-
-            # No despachamos aquí, solo mostramos el total
-            return
-
-        # ---------------------------
-        # 4) BOTÓN CONFIRMAR COMPRA
-        # ---------------------------
-        if entrada == Input.CONFIRMAR:
-            if self.estado != Estado.ESPERANDO_DINERO:
-                self._emit(Output.SHOW_MESSAGE, "No hay transacción en curso.")
-                return
-
-            if self.credito < self.selected_product['precio']:
-                falta = self.selected_product['precio'] - self.credito
-                self._emit(Output.SHOW_MESSAGE, f"Faltan ${falta}")
-                return
-
-            # Ahora sí despachamos
-            change = self.credito - self.selected_product['precio']
-            self._deliver_and_finish(change)
-            return
-
-        # ---------------------------
-        # 5) BOTÓN CANCELAR
-        # ---------------------------
-        if entrada == Input.CANCELAR:
-            if self.credito > 0:
-                amt = self.credito
-                self._emit(Output.RETURN_CHANGE, amt)
-                self._reset()
-            else:
-                self._emit(Output.SHOW_MESSAGE, "Operación cancelada.")
-                self._reset()
-            return
-
+        manejador = _TRANSICIONES[self.estado].get(entrada)
+        if manejador is not None:
+            if self.journal is not None:
+                self.journal.registrar_entrada(entrada, valor)
+            manejador(self, entrada, valor)
+            if self.temporizadores is not None:
+                self._vigilar_inactividad()
 
     # =========================================================
-    #   ENTREGAR PRODUCTO 
+    # GUARDAS Y ACCIONES (las nombra maquina_spec.json)
     # =========================================================
-    def _deliver_and_finish(self, change):
-    # Descontar stock
+    # Guardas: (entrada, valor) → bool. Acciones: (entrada, valor) → payload de la salida
+    # El orden en que se prueban, el estado siguiente y la salida que se emite están en la especificación
+
+    # 1) LETRA
+    # Mientras se escriben las letras de un código (BUILD_CODE, sin números todavía) la letra se agrega
+    # si así empieza algún código (A → AB); si no, empieza un código nuevo con esa letra
+    def _codigo_con_letra(self, valor):
+        letra = str(valor).upper()
+        if self.estado is Estado.BUILD_CODE and self.codigo_buffer.isalpha():
+            extendido = self.codigo_buffer + letra
+            if self.catalogo.es_prefijo(extendido):
+                return extendido
+        return letra if self.catalogo.es_prefijo(letra) else None
+
+    def _letra_invalida(self, entrada, valor):
+        return self._codigo_con_letra(valor) is None
+
+    def _seleccionar_letra(self, entrada, valor):
+        codigo = self._codigo_con_letra(valor)
+        self._liberar_reserva()
+        self.codigo_buffer = codigo
+        self.selected_code = None
+        self.selected_product = None
+
+    # 2) NÚMERO
+    def _sin_letra(self, entrada, valor):
+        return not self.codigo_buffer
+
+    def _numero_invalido(self, entrada, valor):
+        return str(valor) not in self.catalogo.numeros
+
+    def _codigo_incompleto(self, entrada, valor):
+        # Hay códigos más largos que empiezan así (p. ej. A1 en un catálogo A10..A19): se sigue escribiendo
+        nodo = self.catalogo.nodo(self.codigo_buffer + str(valor))
+        return nodo is not None and nodo.codigo is None
+
+    def _agregar_numero(self, entrada, valor):
+        self.codigo_buffer += str(valor)
+
+    def _codigo_inexistente(self, entrada, valor):
+        return not self.productos.get(self.codigo_buffer + str(valor))
+
+    def _reservar_unidad(self, entrada, valor):
+        # Aparta una unidad (atómico: dos máquinas no pueden tomar la última); True si la obtuvo
+        return self.inventario.reservar(self.codigo_buffer + str(valor))
+
+    def _seleccionar_producto(self, entrada, valor):
+        # Selección válida → guardar snapshot; la unidad ya quedó apartada por _reservar_unidad
+        codigo = self.codigo_buffer + str(valor)
+        prod = self.productos[codigo]
+        self._reserva = codigo
+        self.selected_code = codigo
+        self.selected_product = {
+            "nombre": prod["nombre"],
+            "precio": prod["precio"],
+            "stock": prod["stock"]
+        }
+        self.credito = 0
+        return {"nombre": prod["nombre"], "precio": prod["precio"]}
+
+    # 3) DINERO ($1, $5, $10, $20)
+    def _sumar_credito(self, entrada, valor):
+        # Acumular crédito (no despachamos aquí, solo mostramos el total)
+        self.credito += VALOR_MONEDAS[entrada]
+        return self.credito
+
+    # 4) CONFIRMAR COMPRA
+    def _credito_insuficiente(self, entrada, valor):
+        return self.credito < self.selected_product["precio"]
+
+    def _unidad_apartada(self, entrada, valor):
+        # Si se confirma otra vez sin reset (la UI resetea al final de la animación), se aparta otra unidad
+        if not self.selected_code or self._reserva is not None:
+            return True
+        if self.inventario.reservar(self.selected_code):
+            self._reserva = self.selected_code
+            return True
+        return False
+
+    def _entregar(self, entrada, valor):
+        # Descontar stock: se confirma la unidad apartada
         if self.selected_code:
-            PRODUCTOS[self.selected_code]['stock'] -= 1
+            self.inventario.confirmar(self.selected_code)
+            self._reserva = None
+        self._entregado = True
+        return {
+            "nombre": self.selected_product["nombre"],
+            "precio": self.selected_product["precio"],
+            "cambio": self.credito - self.selected_product["precio"],
+        }
+
+    # 5) CANCELAR
+    def _hay_credito(self, entrada, valor):
+        return self.credito > 0
+
+    def _credito_a_devolver(self, entrada, valor):
+        return self.credito
 
-    # Emitir salida DELIVER
-        self._emit(Output.DELIVER, {
-        "nombre": self.selected_product['nombre'],
-        "precio": self.selected_product['precio'],
-        "cambio": change
-    })
-        
+    # Texto de las ramas con 'mensaje' en la especificación
+    def _mensaje(self, plantilla, valor):
+        precio = self.selected_product["precio"] if self.selected_product else 0
+        return plantilla.format(
+            valor=valor,
+            codigo=self.codigo_buffer + str(valor),
+            faltante=precio - self.credito,
+            seleccionado=self.selected_code,
+            letras=self.catalogo.rango_letras(),
+        )
 
 
     # =========================================================
     # RESETEAR BUFFER Y ESTADO
     # =========================================================
+    def _liberar_reserva(self):
+        if self._reserva is not None:
+            self.inventario.liberar(self._reserva)
+            self._reserva = None
+
     def _reset_buffer(self):
+        self._liberar_reserva()
         self.codigo_buffer = ""
         self.selected_code = None
         self.selected_product = None
         self.estado = Estado.INICIO
 
     def _reset(self):
+        # La UI también resetea por su cuenta (fin de animación, cambio devuelto): queda en el journal
+        if self.journal is not None:
+            self.journal.registrar_reset()
+        if self.temporizadores is not None:
+            self.temporizadores.cancelar("inactividad")
+        self._entregado = False
+        self._liberar_reserva()
         self.codigo_buffer = ""
         self.selected_code = None
         self.selected_product = None
@@ -165,20 +198,143 @@ class MaquinaDispensadoraMealy:
         self.estado = Estado.INICIO
 
 
+    # =========================================================
+    # CANCELACIÓN AUTOMÁTICA POR INACTIVIDAD
+    # =========================================================
+    # Después de cada entrada: si hay una transacción abierta (código a medias, producto elegido
+    # o crédito) se vuelve a armar el temporizador "inactividad"; si no, se quita
+    # Tras DELIVER no se arma: la compra ya terminó y la UI resetea al final de la animación
+    def _vigilar_inactividad(self):
+        abierta = (self.estado is not Estado.INICIO or self.credito > 0) and not self._entregado
+        if abierta:
+            self.temporizadores.programar("inactividad", INACTIVIDAD_MS, self._cancelar_por_inactividad)
+        else:
+            self.temporizadores.cancelar("inactividad")
+
+    def _cancelar_por_inactividad(self):
+        self.procesar_entrada(Input.CANCELAR)
+
+
+    # =========================================================
+    # EXPORTAR / RESTAURAR ESTADO (journal, checkpoints)
+    # =========================================================
+    # exportar_estado: diccionario serializable (JSON) con la transacción en curso
+    # restaurar_estado: vuelve a poner la máquina en ese punto, incluida la unidad reservada
+    # "entregado": ya se emitió DELIVER y faltaba el reset de la UI (journal.recuperar cierra esa compra)
+    def exportar_estado(self):
+        return {
+            "estado": self.estado.name,
+            "codigo_buffer": self.codigo_buffer,
+            "selected_code": self.selected_code,
+            "selected_product": dict(self.selected_product) if self.selected_product else None,
+            "credito": self.credito,
+            "reserva": self._reserva,
+            "entregado": self._entregado,
+        }
+
+    def restaurar_estado(self, datos):
+        self._liberar_reserva()
+        self._entregado = datos.get("entregado", False)   # fotos anteriores no lo tienen
+        self.estado = Estado[datos["estado"]]
+        self.codigo_buffer = datos["codigo_buffer"]
+        self.selected_code = datos["selected_code"]
+        self.selected_product = dict(datos["selected_product"]) if datos["selected_product"] else None
+        self.credito = datos["credito"]
+        if datos["reserva"] and self.inventario.reservar(datos["reserva"]):
+            self._reserva = datos["reserva"]
+
+
     # =========================================================
     # SALIDAS
     # =========================================================
+    # Los handlers se enlazan una sola vez (conectar_salidas / suscribir): ahí se revisa su firma
+    # y se guarda, por cada Output, un único callable (maquina, payload). Emitir es una llamada directa
+    # Orden por salida: primero el handler de 'funciones', luego los suscriptores en orden de suscripción
+    def conectar_salidas(self, funciones):
+        # Reemplaza los handlers principales (diccionario Output → handler); los suscriptores se conservan
+        self.funciones = funciones
+        self._despacho = {salida: self._compilar_salida(salida) for salida in Output}
+
+    def suscribir(self, salida, fn):
+        # Agrega otro handler para 'salida' (métricas, bitácoras, pruebas); regresa fn
+        self._suscriptores[salida].append((fn, _enlazar(fn)))
+        self._despacho[salida] = self._compilar_salida(salida)
+        return fn
+
+    def desuscribir(self, salida, fn):
+        self._suscriptores[salida] = [par for par in self._suscriptores[salida] if par[0] is not fn]
+        self._despacho[salida] = self._compilar_salida(salida)
+
+    def _compilar_salida(self, salida):
+        principal = self.funciones.get(salida)
+        enlazados = [_enlazar(principal)] if principal else []
+        enlazados += [enlazado for _, enlazado in self._suscriptores[salida]]
+
+        if not enlazados:
+            def sin_handler(machine, payload=None):
+                print("[maquina] salida sin handler:", salida)
+            return sin_handler
+        if len(enlazados) == 1:
+            return enlazados[0]
+
+        enlazados = tuple(enlazados)
+        def difundir(machine, payload=None):
+            for fn in enlazados:
+                fn(machine, payload)
+        return difundir
+
     def _emit(self, salida, payload=None):
-        fn = self.funciones.get(salida)
-
-        if not fn:
-            print("[maquina] salida sin handler:", salida)
-            return
-
-        try:
-            if payload is None:
-                fn(self)
-            else:
-                fn(self, payload)
-        except TypeError:
-            fn(self)
+        if self.journal is not None:
+            self.journal.registrar_salida(salida, payload)
+        self._despacho[salida](self, payload)
+
+
+# -----------------------------
+# Enlace de handlers de salida
+# -----------------------------
+# Un handler puede recibir (machine) o (machine, payload); se decide una vez leyendo su firma
+# Los que no aceptan payload se envuelven para ignorarlo; los demás se usan tal cual
+# (si el payload es None, reciben None, igual que con su valor por omisión)
+# Las funciones simples (todas las de salidas.py) se resuelven con su __code__; inspect solo se importa
+# para lo demás (métodos, partial, envueltas con functools.wraps), así no se carga en el arranque
+
+_CO_VARARGS = 0x04   # inspect.CO_VARARGS: la función tiene *args
+
+
+def _acepta_payload(fn):
+    if isinstance(fn, types.FunctionType) and not hasattr(fn, "__wrapped__"):
+        codigo = fn.__code__
+        return bool(codigo.co_flags & _CO_VARARGS) or codigo.co_argcount >= 2
+    import inspect
+    try:
+        firma = inspect.signature(fn)
+    except (TypeError, ValueError):
+        return True   # callables sin firma inspeccionable (p. ej. de C): se les pasa el payload
+    posicionales = 0
+    for p in firma.parameters.values():
+        if p.kind is p.VAR_POSITIONAL:
+            return True
+        if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD):
+            posicionales += 1
+    return posicionales >= 2
+
+
+def _enlazar(fn):
+    if _acepta_payload(fn):
+        return fn
+
+    def sin_payload(machine, payload=None):
+        fn(machine)
+    return sin_payload
+
+
+# =========================================================
+# TABLA DE TRANSICIONES (se compila una sola vez al importar)
+# =========================================================
+# _TRANSICIONES[estado][entrada] -> manejador(maquina, entrada, valor)
+# Sale de maquina_spec.json (ver especificacion.py): el mismo archivo del que se dibuja el grafo
+# Las guardas que no dependen de datos (estado correcto o no) quedan resueltas en la tabla
+# Las que dependen de datos (stock, crédito, símbolo válido) son las ramas de cada manejador
+
+_TRANSICIONES = compilar_tabla(MaquinaDispensadoraMealy)
+_N_TRANSICIONES = len(transiciones())
@@ -0,0 +1,329 @@
+# metricas.py
+import functools
+import os
+import threading
+import time
+
+from maquina import _enlazar
+
+# -----------------------------
+# Métricas de latencia (opcionales)
+# -----------------------------
+# Nada de esto corre si no se pide: Metricas.instrumentar_maquina / instrumentar_app reemplazan
+# procesar_entrada, los handlers de salida, refresh_products y generar_grafo_png por versiones que miden;
+# quitar() deja todo como estaba. Sin instrumentar, la máquina no paga ni una comparación
+#
+# Histograma: estilo HDR, buckets log-lineales sobre nanosegundos (32 sub-buckets por potencia de 2,
+# error relativo ≤ 3 %); registrar es un índice con bit_length y un incremento en un diccionario
+# Contadores: eventos por (estado, entrada) antes de la transición
+#
+# Exportación en formato de texto de Prometheus (exposicion()):
+#   escribir(ruta)              → archivo .prom (se escribe a un temporal y se renombra)
+#   servir(puerto)              → http://127.0.0.1:<puerto>/metrics en un hilo de fondo
+# main.py lo activa con la variable de entorno MEALY_METRICAS (ver desde_entorno)
+
+_SUB_BITS = 6
+_LINEAL = 1 << _SUB_BITS          # valores < 64 ns: un bucket por nanosegundo
+_MITAD = _LINEAL >> 1
+
+# Límites (en segundos) de los buckets que se exportan; el histograma interno es mucho más fino
+LIMITES_EXPORTADOS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _indice(ns):
+    if ns < _LINEAL:
+        return ns
+    e = ns.bit_length() - _SUB_BITS
+    return e * _MITAD + (ns >> e)
+
+
+def _limite_inferior(indice):
+    if indice < _LINEAL:
+        return indice
+    e = indice // _MITAD - 1
+    return (indice - e * _MITAD) << e
+
+
+def _limite_superior(indice):
+    # primer valor que ya cae en el siguiente bucket
+    return _limite_inferior(indice + 1)
+
+
+class Histograma:
+    def __init__(self):
+        self.cuentas = {}
+        self.total = 0
+        self.suma_ns = 0
+        self.maximo_ns = 0
+
+    def registrar(self, ns):
+        i = _indice(ns) if ns > 0 else 0
+        self.cuentas[i] = self.cuentas.get(i, 0) + 1
+        self.total += 1
+        self.suma_ns += ns
+        if ns > self.maximo_ns:
+            self.maximo_ns = ns
+
+    def copia(self):
+        # Foto para exportar desde otro hilo: dict(cuentas) se copia sin soltar el GIL (registrar no puede
+        # agregar un bucket a la mitad) y el total sale de esa copia, así _count, +Inf y los buckets cuadran
+        foto = Histograma()
+        foto.cuentas = dict(self.cuentas)
+        foto.total = sum(foto.cuentas.values())
+        foto.suma_ns = self.suma_ns
+        foto.maximo_ns = self.maximo_ns
+        return foto
+
+    def percentil(self, p):
+        # valor (ns) por debajo del cual queda la fracción p de las muestras (punto medio del bucket)
+        if not self.total:
+            return 0
+        objetivo = p * self.total
+        acumulado = 0
+        for i in sorted(self.cuentas):
+            acumulado += self.cuentas[i]
+            if acumulado >= objetivo:
+                return min((_limite_inferior(i) + _limite_superior(i) - 1) / 2, self.maximo_ns)
+        return self.maximo_ns
+
+    def acumulado_hasta(self, limite_ns):
+        # muestras ≤ limite_ns (un bucket cuenta si termina antes del límite)
+        return sum(c for i, c in self.cuentas.items() if _limite_superior(i) - 1 <= limite_ns)
+
+    def resumen(self):
+        return {
+            "total": self.total,
+            "promedio_us": self.suma_ns / self.total / 1000 if self.total else 0.0,
+            **{f"p{c * 100:g}_us": self.percentil(c) / 1000 for c in CUANTILES},
+            "maximo_us": self.maximo_ns / 1000,
+        }
+
+
+# -----------------------------
+# Registro de métricas
+# -----------------------------
+# histogramas[(nombre, etiquetas)] y contadores[(nombre, etiquetas)]; etiquetas es una tupla de pares
+# Las escrituras vienen del hilo de Tk (y generar_grafo_png del hilo de fondo, con su propio histograma)
+# y no toman candado; exposicion() corre en otro hilo (servidor HTTP, volcado a archivo), así que copia
+# histogramas y contadores y toma una foto de cada histograma (Histograma.copia) antes de recorrerlo
+
+class Metricas:
+    def __init__(self, prefijo="mealy"):
+        self.prefijo = prefijo
+        self.histogramas = {}
+        self.contadores = {}
+        self.archivo = None       # ruta .prom que reescribe volcar() (desde_entorno)
+        self.servidor = None      # servidor HTTP de servir()
+        self._deshacer = []
+
+    def histograma(self, nombre, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        h = self.histogramas.get(clave)
+        if h is None:
+            h = self.histogramas[clave] = Histograma()
+        return h
+
+    def medido(self, fn, nombre, **etiquetas):
+        # fn envuelta: cada llamada registra su duración en el histograma (nombre, etiquetas)
+        h = self.histograma(nombre, **etiquetas)
+        reloj = time.perf_counter_ns
+
+        @functools.wraps(fn)
+        def envuelta(*args, **kwargs):
+            t0 = reloj()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                h.registrar(reloj() - t0)
+        return envuelta
+
+    # ---------------------------
+    # Instrumentación
+    # ---------------------------
+    def instrumentar_maquina(self, maquina):
+        # procesar_entrada: histograma y contador por (estado, entrada); handlers de salida: uno por handler
+        original = maquina.procesar_entrada
+        contadores = self.contadores
+        series = {}    # (estado, entrada) → (histograma, clave del contador)
+        reloj = time.perf_counter_ns
+
+        def procesar_entrada(entrada, valor=None):
+            serie = series.get((maquina.estado, entrada))
+            if serie is None:
+                etiquetas = {"estado": _nombre(maquina.estado), "entrada": _nombre(entrada)}
+                llave = ("eventos", tuple(sorted(etiquetas.items())))
+                contadores.setdefault(llave, 0)
+                serie = series[(maquina.estado, entrada)] = (self.histograma("procesar_entrada", **etiquetas), llave)
+            h, llave = serie
+            t0 = reloj()
+            try:
+                return original(entrada, valor)
+            finally:
+                h.registrar(reloj() - t0)
+                contadores[llave] += 1
+
+        maquina.procesar_entrada = procesar_entrada
+        self._deshacer.append(lambda: vars(maquina).pop("procesar_entrada", None))
+
+        funciones = maquina.funciones
+        medidas = {}
+        for salida, fn in funciones.items():
+            medidas[salida] = self.medido(_enlazar(fn), "salida", handler=getattr(fn, "__name__", str(fn)),
+                                          salida=salida.name)
+        maquina.conectar_salidas(medidas)
+        self._deshacer.append(lambda: maquina.conectar_salidas(funciones))
+
+    def instrumentar_app(self, app):
+        # refresh_products de PantallaMain y generar_grafo_png de salidas.py
+        import salidas
+        main = app.frames["PantallaMain"]
+        main.refresh_products = self.medido(main.refresh_products, "refresh_products")
+        self._deshacer.append(lambda: vars(main).pop("refresh_products", None))
+
+        original = salidas.generar_grafo_png
+        salidas.generar_grafo_png = self.medido(original, "generar_grafo_png")
+        self._deshacer.append(lambda: setattr(salidas, "generar_grafo_png", original))
+
+    def quitar(self):
+        while self._deshacer:
+            self._deshacer.pop()()
+
+    # ---------------------------
+    # Exportación (formato de texto de Prometheus)
+    # ---------------------------
+    # <prefijo>_<nombre>_segundos: histograma (buckets LIMITES_EXPORTADOS, _sum, _count)
+    # <prefijo>_<nombre>_cuantiles_segundos: resumen con los cuantiles de CUANTILES
+    # <prefijo>_<nombre>_total: contadores
+    def exposicion(self):
+        lineas = []
+        por_nombre = {}
+        for (nombre, etiquetas), h in list(self.histogramas.items()):
+            por_nombre.setdefault(nombre, []).append((etiquetas, h.copia()))
+        for nombre, series in por_nombre.items():
+            metrica = f"{self.prefijo}_{nombre}_segundos"
+            lineas.append(f"# HELP {metrica} Latencia de {nombre}")
+            lineas.append(f"# TYPE {metrica} histogram")
+            for etiquetas, h in series:
+                for limite in LIMITES_EXPORTADOS:
+                    cuenta = h.acumulado_hasta(limite * 1e9)
+                    lineas.append(f"{metrica}_bucket{_etiquetas(etiquetas, le=repr(limite))} {cuenta}")
+                lineas.append(f"{metrica}_bucket{_etiquetas(etiquetas, le='+Inf')} {h.total}")
+                lineas.append(f"{metrica}_sum{_etiquetas(etiquetas)} {h.suma_ns / 1e9:.9f}")
+                lineas.append(f"{metrica}_count{_etiquetas(etiquetas)} {h.total}")
+            cuantiles = f"{self.prefijo}_{nombre}_cuantiles_segundos"
+            lineas.append(f"# TYPE {cuantiles} summary")
+            for etiquetas, h in series:
+                for c in CUANTILES:
+                    lineas.append(f"{cuantiles}{_etiquetas(etiquetas, quantile=str(c))} {h.percentil(c) / 1e9:.9f}")
+                lineas.append(f"{cuantiles}_sum{_etiquetas(etiquetas)} {h.suma_ns / 1e9:.9f}")
+                lineas.append(f"{cuantiles}_count{_etiquetas(etiquetas)} {h.total}")
+
+        por_nombre = {}
+        for (nombre, etiquetas), valor in list(self.contadores.items()):
+            por_nombre.setdefault(nombre, []).append((etiquetas, valor))
+        for nombre, series in por_nombre.items():
+            metrica = f"{self.prefijo}_{nombre}_total"
+            lineas.append(f"# TYPE {metrica} counter")
+            for etiquetas, valor in series:
+                lineas.append(f"{metrica}{_etiquetas(etiquetas)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def escribir(self, ruta):
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.exposicion())
+        os.replace(temporal, ruta)
+
+    def servir(self, puerto=9464, host="127.0.0.1"):
+        # Servidor HTTP en un hilo daemon; GET /metrics regresa exposicion(). Regresa el servidor
+        # http.server se importa aquí: sin MEALY_METRICAS=puerto no se paga en el arranque
+        import http.server
+        metricas = self
+
+        class Manejador(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.exposicion().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        self.servidor = http.server.ThreadingHTTPServer((host, puerto), Manejador)
+        threading.Thread(target=self.servidor.serve_forever, name="metricas-http", daemon=True).start()
+        return self.servidor
+
+    def volcar(self):
+        if self.archivo:
+            try:
+                self.escribir(self.archivo)
+            except OSError as e:
+                print("[metricas] no se pudo escribir:", e)
+
+    def cerrar(self):
+        # Al salir: último volcado al archivo y se apaga el servidor
+        self.volcar()
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
+
+
+def _nombre(valor):
+    return getattr(valor, "name", str(valor))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas, **extra):
+    pares = list(etiquetas) + list(extra.items())
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+# -----------------------------
+# Activación desde main.py
+# -----------------------------
+# MEALY_METRICAS=9464            → servidor en http://127.0.0.1:9464/metrics
+# MEALY_METRICAS=metricas.prom   → archivo reescrito cada INTERVALO_ESCRITURA_MS y al cerrar
+# Sin la variable regresa None y no se instrumenta nada
+
+INTERVALO_ESCRITURA_MS = 5000
+
+
+def desde_entorno(app, maquina, variable="MEALY_METRICAS"):
+    destino = os.environ.get(variable)
+    if not destino:
+        return None
+    metricas = Metricas()
+    metricas.instrumentar_maquina(maquina)
+    metricas.instrumentar_app(app)
+    if destino.isdigit():
+        try:
+            metricas.servir(int(destino))
+            print(f"[metricas] http://127.0.0.1:{destino}/metrics")
+        except OSError as e:
+            print("[metricas] no se pudo abrir el puerto:", e)
+        return metricas
+
+    metricas.archivo = destino
+
+    def periodico():
+        metricas.volcar()
+        app.temporizadores.programar("metricas", INTERVALO_ESCRITURA_MS, periodico)
+
+    app.temporizadores.programar("metricas", INTERVALO_ESCRITURA_MS, periodico)
+    return metricas
@@ -0,0 +1,113 @@
+# miniaturas.py
+import hashlib
+import os
+
+# -------------------------
+# Directorio de imágenes y extensiones soportadas
+# -------------------------
+IMG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IMG")
+IMG_EXTS = [".png", ".jpg", ".jpeg", ".gif", ".webp"]
+
+# Miniaturas ya escaladas en disco (sobreviven entre ejecuciones)
+DIR_MINIATURAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_miniaturas")
+
+
+# -------------------------
+# Caché de miniaturas en dos niveles
+# -------------------------
+# Nivel 1 (memoria): (código, tamaño) → (firma del archivo, PhotoImage ya creado)
+# Nivel 2 (disco): miniatura PNG ya escalada, nombrada con un hash de (ruta, mtime, tamaño del archivo, tamaño pedido)
+# La firma de un archivo es (ruta, mtime_ns, bytes); si el archivo cambia, cambia la firma y se vuelve a decodificar
+# Una ruta encontrada se recuerda por código, así no se prueban las 5 extensiones en cada refresco
+#
+# foto_vigente(code, size): PhotoImage del nivel 1 si el archivo no cambió (solo un os.stat), si no None
+# preparar(code, size): imagen PIL escalada (nivel 2 o decodificando el original); sin widgets, apta para hilos
+# guardar_foto(code, size, firma, img): crea el PhotoImage (hilo de Tk) y lo guarda en el nivel 1
+# PIL se importa en el primer preparar/guardar_foto (normalmente en el hilo de fondo), no al importar el módulo
+
+class CacheMiniaturas:
+    def __init__(self, img_dir=IMG_DIR, dir_cache=DIR_MINIATURAS):
+        self.img_dir = img_dir
+        self.dir_cache = dir_cache
+        self._rutas = {}
+        self._fotos = {}
+        self.decodificadas = 0   # cuántas veces se decodificó una imagen original
+
+    def firma(self, code):
+        ruta = self._rutas.get(code)
+        if ruta is not None:
+            try:
+                st = os.stat(ruta)
+                return (ruta, st.st_mtime_ns, st.st_size)
+            except OSError:
+                # se borró o renombró: volver a buscar. pop y no del: el hilo de fondo (preparar) y el de Tk
+                # (foto_vigente) pueden llegar aquí a la vez con el mismo código y el segundo daría KeyError
+                self._rutas.pop(code, None)
+
+        for ext in IMG_EXTS:
+            ruta = os.path.join(self.img_dir, f"{code}{ext}")
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            self._rutas[code] = ruta
+            return (ruta, st.st_mtime_ns, st.st_size)
+        return None
+
+    def foto_vigente(self, code, size):
+        entrada = self._fotos.get((code, size))
+        if entrada is not None and entrada[0] == self.firma(code):
+            return entrada[1]
+        return None
+
+    def preparar(self, code, size):
+        # Regresa (firma, imagen PIL escalada) o (None, None) si no hay imagen o no se pudo abrir
+        firma = self.firma(code)
+        if firma is None:
+            return None, None
+
+        from PIL import Image
+        clave = hashlib.sha1(repr((firma, size)).encode("utf-8")).hexdigest()[:16]
+        ruta_mini = os.path.join(self.dir_cache, f"{code}-{size[0]}x{size[1]}-{clave}.png")
+        try:
+            img = Image.open(ruta_mini)
+            img.load()
+            return firma, img
+        except OSError:
+            pass
+
+        try:
+            img = Image.open(firma[0])
+            img.thumbnail(size, Image.LANCZOS)
+            self.decodificadas += 1
+        except Exception:
+            return None, None
+
+        try:
+            os.makedirs(self.dir_cache, exist_ok=True)
+            temporal = f"{ruta_mini}.{os.getpid()}.{id(img)}.tmp"
+            img.save(temporal, format="PNG")
+            os.replace(temporal, ruta_mini)
+        except OSError as e:
+            print("[miniaturas] no se pudo guardar en disco:", e)
+        return firma, img
+
+    def guardar_foto(self, code, size, firma, img):
+        from PIL import ImageTk
+        foto = ImageTk.PhotoImage(img)
+        self._fotos[(code, size)] = (firma, foto)
+        return foto
+
+    def cargar(self, code, size):
+        # Versión síncrona: nivel 1, luego nivel 2 / original
+        foto = self.foto_vigente(code, size)
+        if foto is not None:
+            return foto
+        firma, img = self.preparar(code, size)
+        if img is None:
+            return None
+        return self.guardar_foto(code, size, firma, img)
+
+
+# Caché compartida por toda la interfaz
+MINIATURAS = CacheMiniaturas()
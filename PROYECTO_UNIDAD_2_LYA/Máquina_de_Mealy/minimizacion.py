@@ -0,0 +1,293 @@
+# minimizacion.py
+import argparse
+import collections
+import copy
+import time
+
+from catalogo import SIMBOLOS_ENTRADA
+from definiciones import PRODUCTOS
+from maquina import MaquinaDispensadoraMealy
+from salidas_headless import GrabadoraSalidas
+
+# -----------------------------
+# Minimización y equivalencia de máquinas de Mealy
+# -----------------------------
+# La máquina real tiene datos (buffer, producto elegido, crédito, stock), así que su máquina de Mealy
+# "de verdad" es la de configuraciones: explorar() corre MaquinaDispensadoraMealy (en modo headless,
+# con la tabla compilada de maquina_spec.json) desde INICIO con todos los símbolos de entrada y arma
+# la tabla finita (configuración, símbolo) → (configuración, salidas)
+# Para que sea finita se acota: catálogo pequeño (catalogo_reducido) y crédito máximo (limite_credito);
+# lo que pasa el límite va a un sumidero LIMITE igual para cualquier máquina que se explore
+#
+# minimizar(mealy):     refinamiento de particiones (Moore): empieza agrupando por fila de salidas
+#                       y parte los bloques hasta que los sucesores de cada estado caen en los mismos bloques
+# equivalentes(a, b):   Hopcroft–Karp con union-find sobre la máquina producto; recorre en anchura,
+#                       así el contraejemplo es una secuencia de entradas de largo mínimo
+# verificar_refactor(): explora la máquina actual y otra clase (un refactor) con las mismas cotas y las compara
+#
+# La equivalencia se prueba para todas las secuencias dentro de las cotas (crédito ≤ limite_credito
+# con ese catálogo), no para cualquier catálogo
+
+LIMITE = ("LIMITE",)
+
+
+# -----------------------------
+# Máquina de Mealy finita
+# -----------------------------
+# simbolos: alfabeto de entrada (tuplas (Input, valor))
+# siguiente[q][s]: índice del estado siguiente; salida[q][s]: índice en 'salidas' de lo que se emite
+# salidas: alfabeto de salida (tuplas de (nombre de Output, payload congelado), una por emisión)
+# etiquetas[q]: descripción del estado (la configuración de la máquina, o la del representante)
+
+class MealyFinita:
+    def __init__(self, simbolos, siguiente, salida, salidas, inicial=0, etiquetas=None):
+        self.simbolos = list(simbolos)
+        self.siguiente = siguiente
+        self.salida = salida
+        self.salidas = salidas
+        self.inicial = inicial
+        self.etiquetas = etiquetas if etiquetas is not None else list(range(len(siguiente)))
+
+    def __len__(self):
+        return len(self.siguiente)
+
+    def transiciones(self):
+        return len(self.siguiente) * len(self.simbolos)
+
+    def correr(self, entradas):
+        # Salidas que produce una secuencia de símbolos (o de índices de símbolo) desde el estado inicial
+        indice = {s: i for i, s in enumerate(self.simbolos)}
+        q = self.inicial
+        resultado = []
+        for simbolo in entradas:
+            s = simbolo if isinstance(simbolo, int) else indice[simbolo]
+            resultado.append(self.salidas[self.salida[q][s]])
+            q = self.siguiente[q][s]
+        return resultado
+
+
+# -----------------------------
+# Explorar la máquina real
+# -----------------------------
+
+def catalogo_reducido(codigos=("A1", "B2"), tope_stock=2):
+    # Copia de PRODUCTOS con solo 'codigos' y stock ≤ tope_stock (los demás códigos "no existen")
+    return {c: dict(PRODUCTOS[c], stock=min(PRODUCTOS[c]["stock"], tope_stock)) for c in codigos}
+
+
+def _congelar(valor):
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    return valor
+
+
+def explorar(clase=MaquinaDispensadoraMealy, productos=None, simbolos=SIMBOLOS_ENTRADA,
+             limite_credito=40, max_configuraciones=1_000_000):
+    catalogo = copy.deepcopy(catalogo_reducido() if productos is None else productos)
+    grabadora = GrabadoraSalidas()          # headless: DELIVER resetea la máquina
+    m = clase(grabadora.funciones, productos=catalogo)
+    inventario = m.inventario
+    codigos = sorted(catalogo)
+    simbolos = list(simbolos)
+
+    configuraciones = []    # (datos de exportar_estado, stock, reservado)
+    indice = {}
+    salidas, indice_salida = [], {}
+    siguiente, salida = [], []
+
+    def clave():
+        datos = m.exportar_estado()
+        stock = tuple(catalogo[c]["stock"] for c in codigos)
+        reservado = tuple(inventario.reservado[c] for c in codigos)
+        return (_congelar(datos), stock, reservado), (datos, stock, reservado)
+
+    def poner(configuracion):
+        datos, stock, reservado = configuracion
+        m._reserva = None
+        for c, s, r in zip(codigos, stock, reservado):
+            catalogo[c]["stock"] = s
+            inventario.reservado[c] = r
+        if datos["reserva"]:
+            inventario.reservado[datos["reserva"]] -= 1   # restaurar_estado la vuelve a apartar
+        m.restaurar_estado(datos)
+
+    def estado_de(k, configuracion):
+        q = indice.get(k)
+        if q is None:
+            if len(configuraciones) >= max_configuraciones:
+                raise RuntimeError(f"[minimizacion] más de {max_configuraciones} configuraciones")
+            q = indice[k] = len(configuraciones)
+            configuraciones.append(configuracion)
+            siguiente.append(None)
+            salida.append(None)
+            pendientes.append(q)
+        return q
+
+    def salida_de(emitidas):
+        s = indice_salida.get(emitidas)
+        if s is None:
+            s = indice_salida[emitidas] = len(salidas)
+            salidas.append(emitidas)
+        return s
+
+    pendientes = collections.deque()
+    estado_de(*clave())
+    registro = grabadora.registro
+
+    while pendientes:
+        q = pendientes.popleft()
+        if configuraciones[q] is None:
+            # el sumidero no se simula: se queda ahí con la salida LIMITE
+            siguiente[q] = [q] * len(simbolos)
+            salida[q] = [salida_de(LIMITE)] * len(simbolos)
+            continue
+        fila_sig, fila_sal = [], []
+        for entrada, valor in simbolos:
+            poner(configuraciones[q])
+            registro.clear()
+            m.procesar_entrada(entrada, valor)
+            fila_sal.append(salida_de(tuple((o.name, _congelar(p)) for o, p in registro)))
+            if m.credito > limite_credito:
+                fila_sig.append(estado_de(LIMITE, None))
+            else:
+                fila_sig.append(estado_de(*clave()))
+        siguiente[q], salida[q] = fila_sig, fila_sal
+
+    etiquetas = [LIMITE if c is None else c[0] for c in configuraciones]
+    return MealyFinita(simbolos, siguiente, salida, salidas, 0, etiquetas)
+
+
+# -----------------------------
+# Minimizar (refinamiento de particiones)
+# -----------------------------
+# Ronda 0: dos estados van juntos si emiten lo mismo con cada símbolo
+# Ronda i: además, con cada símbolo sus sucesores estaban en el mismo bloque en la ronda i-1
+# Las rondas solo parten bloques: cuando el número de bloques no cambia, la partición es estable
+# Cada ronda es un recorrido de la tabla (O(estados · símbolos)) con un diccionario de firmas
+# Regresa (máquina mínima, bloque[q] de cada estado original, rondas)
+
+def minimizar(mealy):
+    n = len(mealy)
+    firmas = {}
+    bloque = [firmas.setdefault(tuple(fila), len(firmas)) for fila in mealy.salida]
+    bloques = len(firmas)
+    rondas = 0
+    while True:
+        rondas += 1
+        firmas = {}
+        nuevo = [
+            firmas.setdefault((bloque[q], *[bloque[p] for p in mealy.siguiente[q]]), len(firmas))
+            for q in range(n)
+        ]
+        if len(firmas) == bloques:
+            break
+        bloque, bloques = nuevo, len(firmas)
+
+    representante = [None] * bloques
+    for q in range(n):
+        if representante[bloque[q]] is None:
+            representante[bloque[q]] = q
+    minima = MealyFinita(
+        mealy.simbolos,
+        [[bloque[p] for p in mealy.siguiente[r]] for r in representante],
+        [list(mealy.salida[r]) for r in representante],
+        mealy.salidas,
+        bloque[mealy.inicial],
+        [mealy.etiquetas[r] for r in representante],
+    )
+    return minima, bloque, rondas
+
+
+# -----------------------------
+# Equivalencia (Hopcroft–Karp)
+# -----------------------------
+# Los estados de a y b son nodos de un union-find (los de b desplazados len(a))
+# Se parte de (inicial_a, inicial_b); cada par visitado une sus sucesores. Si ya estaban en la misma
+# clase no hace falta revisarlos otra vez, por eso el costo es casi lineal en las transiciones
+# Si en algún par las salidas difieren, la ruta en anchura hasta ese par es el contraejemplo
+# Regresa (True, None) o (False, {"entradas": [...], "salida_a": ..., "salida_b": ...})
+
+def equivalentes(a, b):
+    if a.simbolos != b.simbolos:
+        raise ValueError("[minimizacion] las máquinas no tienen el mismo alfabeto de entrada")
+    padre = list(range(len(a) + len(b)))
+    desplazamiento = len(a)
+
+    def raiz(x):
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    inicio = (a.inicial, b.inicial)
+    padre[raiz(a.inicial)] = raiz(b.inicial + desplazamiento)
+    previo = {inicio: None}
+    cola = collections.deque([inicio])
+    k = len(a.simbolos)
+
+    while cola:
+        p, q = cola.popleft()
+        sig_a, sal_a = a.siguiente[p], a.salida[p]
+        sig_b, sal_b = b.siguiente[q], b.salida[q]
+        for s in range(k):
+            if a.salidas[sal_a[s]] != b.salidas[sal_b[s]]:
+                return False, _contraejemplo(a, b, previo, (p, q), s)
+            p2, q2 = sig_a[s], sig_b[s]
+            r1, r2 = raiz(p2), raiz(q2 + desplazamiento)
+            if r1 != r2:
+                padre[r1] = r2
+                previo[(p2, q2)] = ((p, q), s)
+                cola.append((p2, q2))
+    return True, None
+
+
+def _contraejemplo(a, b, previo, par, s):
+    ruta = [s]
+    while previo[par] is not None:
+        par, simbolo = previo[par]
+        ruta.append(simbolo)
+    ruta.reverse()
+    entradas = [a.simbolos[i] for i in ruta]
+    return {
+        "entradas": entradas,
+        "salida_a": a.correr(ruta)[-1],
+        "salida_b": b.correr(ruta)[-1],
+    }
+
+
+def verificar_refactor(clase, referencia=MaquinaDispensadoraMealy, **cotas):
+    # Explora las dos clases con las mismas cotas (productos, limite_credito...) y las compara
+    return equivalentes(explorar(referencia, **cotas), explorar(clase, **cotas))
+
+
+# -----------------------------
+# Línea de comandos
+# -----------------------------
+# python minimizacion.py [--codigos A1,B2] [--stock 2] [--limite 40]
+# Explora la máquina actual, la minimiza y comprueba que la mínima es equivalente a la original
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimiza la máquina de Mealy explorada y verifica equivalencia")
+    parser.add_argument("--codigos", default="A1,B2", help="códigos del catálogo reducido")
+    parser.add_argument("--stock", type=int, default=2, help="stock máximo por código")
+    parser.add_argument("--limite", type=int, default=40, help="crédito máximo explorado")
+    args = parser.parse_args()
+
+    productos = catalogo_reducido(tuple(args.codigos.split(",")), args.stock)
+    t0 = time.perf_counter()
+    mealy = explorar(productos=productos, limite_credito=args.limite)
+    t1 = time.perf_counter()
+    minima, _, rondas = minimizar(mealy)
+    t2 = time.perf_counter()
+    iguales, contraejemplo = equivalentes(mealy, minima)
+    t3 = time.perf_counter()
+
+    print(f"explorada: {len(mealy):,} estados, {mealy.transiciones():,} transiciones, "
+          f"{len(mealy.salidas):,} salidas distintas ({t1 - t0:.2f} s)")
+    print(f"mínima:    {len(minima):,} estados, {minima.transiciones():,} transiciones "
+          f"({rondas} rondas, {t2 - t1:.3f} s)")
+    print(f"equivalencia original/mínima: {'OK' if iguales else contraejemplo} ({t3 - t2:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
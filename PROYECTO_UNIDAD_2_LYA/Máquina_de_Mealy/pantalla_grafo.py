@@ -1,8 +1,6 @@
 # pantalla_grafo.py
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-from graphviz import Digraph
 import os
 
 # Clase PantallaGrafo
@@ -10,7 +8,10 @@ import os
 # Esta pantalla muestra el grafo de estados de la compra
 # Incluye: Un título ("Grafo de la compra"), Un Label (self.canvas) donde se cargará la imagen del grafo, Un botón "Volver" que regresa a la pantalla principal 
 # Método cargar_imagen(ruta): Abre la imagen desde la ruta indicada, Redimensiona la imagen, Convierte la imagen a formato compatible con Tkinter (PhotoImage), Actualiza el Label self.canvas para mostrar la imagen
+# cargar_imagen se divide en preparar_imagen (PIL, apta para segundo plano) y mostrar_imagen (Tk)
 # Si ocurre un error al cargar la imagen, lo muestra en consola.
+# PIL se importa al preparar la primera imagen, no al arrancar; la app construye esta pantalla
+# la primera vez que se pide (VendingMachineApp.obtener_pantalla)
 
 
 class PantallaGrafo(tk.Frame):
@@ -29,10 +30,33 @@ class PantallaGrafo(tk.Frame):
 
     def cargar_imagen(self, ruta):
         try:
-            from PIL import Image, ImageTk
-            img = Image.open(ruta)
-            img = img.resize((900, 300))
-            self.img_tk = ImageTk.PhotoImage(img)
-            self.canvas.config(image=self.img_tk)
+            self.mostrar_imagen(self.preparar_imagen(ruta))
         except Exception as e:
             print("[PantallaGrafo] Error al cargar imagen:", e)
+
+    # preparar_imagen: abre y redimensiona con PIL; no toca widgets, puede correr en un hilo de fondo
+    # mostrar_imagen: convierte a PhotoImage y actualiza el Label; solo en el hilo de Tk
+    @staticmethod
+    def preparar_imagen(ruta):
+        from PIL import Image
+        img = Image.open(ruta)
+        return img.resize((900, 300))
+
+    def mostrar_imagen(self, img):
+        from PIL import ImageTk
+        self.img_tk = ImageTk.PhotoImage(img)
+        self.canvas.config(image=self.img_tk)
+
+
+# -------------------------
+# Helper: generar el grafo y preparar su imagen (para correr en segundo plano)
+# -------------------------
+# Regresa la imagen PIL lista para PantallaGrafo.mostrar_imagen, o None si Graphviz no pudo generarla
+# conteo: contadores de transiciones de la máquina (mapa de calor); None dibuja el grafo sin uso
+
+def preparar_grafo(conteo=None):
+    from salidas import generar_grafo_png
+    ruta = generar_grafo_png("grafo_estados", conteo)
+    if ruta and os.path.exists(ruta):
+        return PantallaGrafo.preparar_imagen(ruta)
+    return None
@@ -0,0 +1,88 @@
+# planificador_ui.py
+
+# -----------------------------
+# Planificador de actualizaciones del display
+# -----------------------------
+# En un mismo evento (tecla, moneda, confirmar) varios lugares escriben los mismos labels:
+# las salidas de la máquina (SHOW_CODE, SHOW_PRICE, UPDATE_TOTAL...) y después
+# PantallaMain._refresh_display_from_machine, que vuelve a escribir encima
+# En vez de llamar widget.config en cada escritura, se anota el valor deseado con
+# poner(widget, text=...) y se aplica todo junto en el siguiente after_idle (cuando Tk termina el evento)
+# Gana la última escritura de cada opción, igual que antes, pero solo se llama config una vez por widget
+# y solo con las opciones cuyo valor es distinto al que ya muestra
+#
+# valor(widget, opcion): lo que va a mostrar el widget (pendiente o ya aplicado), sin esperar al tick
+# aplicar(): aplica ya lo pendiente (lo llama el after_idle; también sirve antes de leer un widget)
+# estadisticas(): escrituras, opciones aplicadas, opciones omitidas (pisadas en el mismo tick o sin cambio)
+
+_SIN_VALOR = object()
+
+
+class PlanificadorDisplay:
+    def __init__(self, root):
+        self.root = root
+        self._deseado = {}    # widget → {opción: valor} pendiente para el próximo tick
+        self._aplicado = {}   # widget → {opción: valor} último valor que se le puso
+        self._tick = None
+
+        self.escrituras = 0
+        self.aplicadas = 0
+        self.omitidas = 0
+        self.ticks = 0
+
+    def poner(self, widget, **opciones):
+        pendiente = self._deseado.setdefault(widget, {})
+        for opcion in opciones:
+            if opcion in pendiente:
+                self.omitidas += 1   # pisada antes de llegar a la pantalla
+        pendiente.update(opciones)
+        self.escrituras += len(opciones)
+        if self._tick is None:
+            self._tick = self.root.after_idle(self.aplicar)
+
+    def valor(self, widget, opcion):
+        pendiente = self._deseado.get(widget)
+        if pendiente and opcion in pendiente:
+            return pendiente[opcion]
+        actual = self._aplicado.get(widget, {}).get(opcion, _SIN_VALOR)
+        return widget.cget(opcion) if actual is _SIN_VALOR else actual
+
+    def aplicar(self):
+        if self._tick is not None:
+            try:
+                self.root.after_cancel(self._tick)
+            except Exception:
+                pass
+            self._tick = None
+        if not self._deseado:
+            return
+
+        deseado, self._deseado = self._deseado, {}
+        self.ticks += 1
+        for widget, opciones in deseado.items():
+            aplicado = self._aplicado.setdefault(widget, {})
+            try:
+                cambios = {}
+                for opcion, nuevo in opciones.items():
+                    actual = aplicado.get(opcion, _SIN_VALOR)
+                    if actual is _SIN_VALOR:
+                        actual = widget.cget(opcion)   # primera vez: lo que dejó quien creó el widget
+                    if actual == nuevo:
+                        self.omitidas += 1
+                    else:
+                        cambios[opcion] = nuevo
+                if cambios:
+                    widget.config(**cambios)
+            except Exception as e:
+                print("[planificador_ui] error al aplicar:", e)
+                continue
+            aplicado.update(cambios)
+            self.aplicadas += len(cambios)
+
+    def estadisticas(self):
+        return {
+            "escrituras": self.escrituras,
+            "aplicadas": self.aplicadas,
+            "omitidas": self.omitidas,
+            "ticks": self.ticks,
+        }
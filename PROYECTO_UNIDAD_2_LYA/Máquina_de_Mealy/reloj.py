@@ -0,0 +1,82 @@
+# reloj.py
+import heapq
+import itertools
+import time
+
+# -----------------------------
+# Relojes: de dónde sale la hora y quién dispara los callbacks diferidos
+# -----------------------------
+# Temporizadores (y con ellos la máquina, salidas.py y las animaciones) programan contra un reloj:
+#   ahora_ms()          → hora actual en milisegundos
+#   despues(ms, fn)     → programa fn; regresa un identificador
+#   cancelar(id)        → quita lo programado
+#
+# RelojTk: hora real (time.monotonic) y callbacks con root.after de Tk
+# RelojVirtual: la hora solo avanza cuando se llama avanzar(ms) / correr(); no hay esperas reales
+#   Los callbacks se ejecutan en orden de vencimiento (y de programación si vencen juntos),
+#   así una simulación da siempre el mismo resultado y un flujo de varios segundos corre en microsegundos
+
+class RelojTk:
+    def __init__(self, root):
+        self.root = root
+
+    def ahora_ms(self):
+        return time.monotonic() * 1000
+
+    def despues(self, ms, fn):
+        return self.root.after(max(0, round(ms)), fn)
+
+    def cancelar(self, ident):
+        try:
+            self.root.after_cancel(ident)
+        except Exception:
+            pass
+
+
+class RelojVirtual:
+    def __init__(self, inicio_ms=0.0):
+        self._ahora = inicio_ms
+        self._heap = []              # (vence, identificador, fn)
+        self._ids = itertools.count(1)
+        self._cancelados = set()
+
+    def ahora_ms(self):
+        return self._ahora
+
+    def despues(self, ms, fn):
+        ident = next(self._ids)
+        heapq.heappush(self._heap, (self._ahora + max(0, ms), ident, fn))
+        return ident
+
+    def cancelar(self, ident):
+        self._cancelados.add(ident)
+
+    def pendientes(self):
+        return sum(1 for _, ident, _ in self._heap if ident not in self._cancelados)
+
+    def avanzar(self, ms):
+        # Adelanta la hora 'ms' milisegundos disparando en orden todo lo que vence en ese lapso
+        fin = self._ahora + ms
+        heap = self._heap
+        while heap and heap[0][0] <= fin:
+            vence, ident, fn = heapq.heappop(heap)
+            if ident in self._cancelados:
+                self._cancelados.discard(ident)
+                continue
+            self._ahora = vence
+            fn()
+        self._ahora = fin
+
+    def correr(self, limite_ms=3_600_000):
+        # Dispara todo lo programado (incluido lo que se programe mientras tanto) hasta vaciar la cola
+        # o hasta 'limite_ms' de hora virtual; regresa la hora virtual al terminar
+        fin = self._ahora + limite_ms
+        heap = self._heap
+        while heap and heap[0][0] <= fin:
+            vence, ident, fn = heapq.heappop(heap)
+            if ident in self._cancelados:
+                self._cancelados.discard(ident)
+                continue
+            self._ahora = vence
+            fn()
+        return self._ahora
@@ -0,0 +1,355 @@
+# reproduccion.py
+import argparse
+import bisect
+import json
+import mmap
+import os
+import random
+import time
+import zlib
+
+from catalogo import SIMBOLOS_ENTRADA
+from definiciones import PRODUCTOS
+from journal import (
+    MAGIA, CABECERA, CATALOGO, ENTRADA, SALIDA, ESTADO, RESET,
+    Journal, decodificar, foto, maquina_desde_foto,
+)
+from salidas_headless import GrabadoraSalidas
+
+# -----------------------------
+# Reproducción de journals con puntos de control
+# -----------------------------
+# Un "evento" es un registro que cambia la máquina: ENTRADA o RESET (las SALIDA solo se leen al comparar)
+# El evento n es el n-ésimo desde el inicio del journal (contando desde 1); estado_en(0) es el catálogo inicial
+#
+# indexar() recorre el journal una vez con una máquina headless y cada 'cada' eventos guarda un punto:
+#   (eventos aplicados, offset del siguiente registro, foto del catálogo y la transacción)
+# Los puntos se guardan junto al journal en '<journal>.puntos' (JSON) con el crc32 de los bytes indexados;
+# si el journal solo creció, se reutilizan y se sigue indexando desde el último punto
+# estado_en(n) = cargar el punto más cercano <= n + repetir a lo más 'cada' eventos
+#
+# El journal se lee con mmap: los registros se recorren sobre el buffer sin una lectura por registro
+#
+# comparar() repite el journal con la lógica actual y compara, entrada por entrada, las salidas
+# obtenidas contra las SALIDA registradas (pruebas de regresión contra tráfico real)
+
+_VERSION_PUNTOS = 1
+
+
+def _registros(datos, offset, fin):
+    # Genera (offset, offset_siguiente, tipo, cuerpo) desde 'offset'; se detiene en una cola cortada o corrupta
+    tam = CABECERA.size
+    while offset + tam <= fin:
+        tipo, longitud, crc = CABECERA.unpack_from(datos, offset)
+        inicio = offset + tam
+        siguiente = inicio + longitud
+        if siguiente > fin:
+            return
+        cuerpo = datos[inicio:siguiente]
+        if zlib.crc32(cuerpo) != crc:
+            return
+        yield offset, siguiente, tipo, cuerpo
+        offset = siguiente
+
+
+def _normalizar(payload):
+    # Las salidas registradas pasaron por JSON (tuplas → listas, claves → str)
+    return None if payload is None else json.loads(json.dumps(payload))
+
+
+class Reproductor:
+    def __init__(self, ruta, cada=10_000, guardar_puntos=True):
+        self.ruta = ruta
+        self.cada = cada
+        self.guardar_puntos = guardar_puntos
+        self.ruta_puntos = ruta + ".puntos"
+        self.puntos = [(0, len(MAGIA), None)]   # foto None: empezar desde el registro CATALOGO
+        self.eventos = 0                          # eventos que hay en la parte indexada
+        self._fin = len(MAGIA)                    # hasta qué byte se indexó
+        self._cargar_puntos()
+
+    # ---------------------------
+    # Acceso al archivo
+    # ---------------------------
+    def _abrir(self):
+        f = open(self.ruta, "rb")
+        try:
+            datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        if datos[:len(MAGIA)] != MAGIA:
+            datos.close()
+            raise ValueError("no es un journal de la máquina")
+        return datos
+
+    def _cargar_puntos(self):
+        try:
+            with open(self.ruta_puntos, encoding="utf-8") as f:
+                guardado = json.load(f)
+        except (OSError, ValueError):
+            return
+        if guardado.get("version") != _VERSION_PUNTOS or guardado.get("cada") != self.cada:
+            return
+        fin = guardado["fin"]
+        try:
+            datos = self._abrir()
+        except (OSError, ValueError):
+            return
+        with datos:
+            if len(datos) < fin or zlib.crc32(memoryview(datos)[:fin]) != guardado["crc"]:
+                return   # el journal se reescribió o se truncó: reindexar desde cero
+        self.puntos = [tuple(p) for p in guardado["puntos"]]
+        self.eventos = guardado["eventos"]
+        self._fin = fin
+
+    def _guardar_puntos(self, datos):
+        guardado = {
+            "version": _VERSION_PUNTOS,
+            "cada": self.cada,
+            "fin": self._fin,
+            "crc": zlib.crc32(memoryview(datos)[:self._fin]),
+            "eventos": self.eventos,
+            "puntos": [list(p) for p in self.puntos],
+        }
+        temporal = f"{self.ruta_puntos}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(guardado, f)
+            os.replace(temporal, self.ruta_puntos)
+        except OSError as e:
+            print("[reproduccion] no se pudieron guardar los puntos:", e)
+
+    # ---------------------------
+    # Núcleo: aplicar registros sobre una máquina
+    # ---------------------------
+    # Avanza desde 'offset' con 'eventos' ya aplicados hasta llegar a 'hasta' eventos (None = hasta el final)
+    # Si 'cada' no es None, va guardando puntos de control en self.puntos
+    # Regresa (máquina, offset del siguiente registro, eventos aplicados)
+    #
+    # Es el lazo caliente de la reproducción: recorre el buffer sin generador intermedio y
+    # decodifica cada entrada distinta una sola vez (se indexa por el cuerpo sin el tiempo;
+    # en la práctica solo hay unas decenas de combinaciones entrada/valor)
+    def _avanzar(self, datos, offset, eventos, m, hasta=None, funciones=None, cada=None):
+        tam = CABECERA.size
+        desempacar = CABECERA.unpack_from
+        fin = len(datos)
+        limite = -1 if hasta is None else hasta
+        proximo_punto = -1 if cada is None else (eventos // cada + 1) * cada
+        decodificadas = {}
+
+        while offset + tam <= fin:
+            tipo, longitud, crc = desempacar(datos, offset)
+            siguiente = offset + tam + longitud
+            if siguiente > fin:
+                break
+            cuerpo = datos[offset + tam:siguiente]
+            if zlib.crc32(cuerpo) != crc:
+                break
+
+            if tipo == ENTRADA or tipo == RESET:
+                if eventos == limite:
+                    break
+                if tipo == ENTRADA:
+                    clave = cuerpo[8:]
+                    par = decodificadas.get(clave)
+                    if par is None:
+                        par = decodificadas[clave] = decodificar(tipo, cuerpo)[1:]
+                    m.procesar_entrada(par[0], par[1])
+                else:
+                    m._reset()
+                eventos += 1
+                if eventos == proximo_punto:
+                    self.puntos.append((eventos, siguiente, foto(m)))
+                    proximo_punto += cada
+            elif tipo == ESTADO:
+                m = maquina_desde_foto(decodificar(tipo, cuerpo), funciones)
+            elif tipo == CATALOGO:
+                m = maquina_desde_foto({"catalogo": decodificar(tipo, cuerpo)}, funciones)
+            offset = siguiente
+        return m, offset, eventos
+
+    # ---------------------------
+    # Índice de puntos de control
+    # ---------------------------
+    def indexar(self):
+        # Indexa lo que falte del journal (todo la primera vez); regresa el total de eventos
+        with self._abrir() as datos:
+            if len(datos) == self._fin:
+                return self.eventos
+            eventos, offset, datos_foto = self.puntos[-1]
+            m = maquina_desde_foto(datos_foto) if datos_foto else None
+            _, offset, eventos = self._avanzar(datos, offset, eventos, m, cada=self.cada)
+            self.eventos = eventos
+            self._fin = offset
+            if self.guardar_puntos:
+                self._guardar_puntos(datos)
+        return self.eventos
+
+    def maquina_en(self, n, funciones=None):
+        # Máquina headless tal como quedó después del evento n
+        self.indexar()
+        if not 0 <= n <= self.eventos:
+            raise IndexError(f"el journal tiene {self.eventos} eventos")
+        i = bisect.bisect_right(self.puntos, n, key=lambda p: p[0]) - 1
+        eventos, offset, datos_foto = self.puntos[i]
+        m = maquina_desde_foto(datos_foto, funciones) if datos_foto else None
+        with self._abrir() as datos:
+            m, _, _ = self._avanzar(datos, offset, eventos, m, hasta=n, funciones=funciones)
+        return m
+
+    def estado_en(self, n):
+        # (catálogo, transacción en curso) después del evento n
+        m = self.maquina_en(n)
+        return m.productos, m.exportar_estado()
+
+    # ---------------------------
+    # Auditoría y regresión
+    # ---------------------------
+    def historial(self, desde, hasta):
+        # Genera (evento, tipo, datos decodificados) de los registros de los eventos desde..hasta,
+        # incluidas las SALIDA que produjo cada uno (quedan con el número del evento que las causó)
+        self.indexar()
+        i = bisect.bisect_right(self.puntos, max(desde - 1, 0), key=lambda p: p[0]) - 1
+        eventos, offset, _ = self.puntos[i]
+        with self._abrir() as datos:
+            for _, _, tipo, cuerpo in _registros(datos, offset, self._fin):
+                if tipo in (ENTRADA, RESET):
+                    eventos += 1
+                if eventos > hasta:
+                    return
+                if eventos >= desde:
+                    yield eventos, tipo, decodificar(tipo, cuerpo)
+
+    def comparar(self, limite=20):
+        # Repite todo el journal con la lógica actual; regresa hasta 'limite' diferencias
+        # (evento, entrada, valor, salidas registradas, salidas obtenidas)
+        grabadora = GrabadoraSalidas(resetear=False)
+        diferencias = []
+        m = None
+        pendiente = None   # (evento, entrada, valor, salidas registradas)
+        eventos = 0
+
+        def cerrar_pendiente():
+            if pendiente is None:
+                return
+            n, entrada, valor, esperadas = pendiente
+            obtenidas = [(s, _normalizar(p)) for s, p in grabadora.registro]
+            if obtenidas != esperadas:
+                diferencias.append((n, entrada, valor, esperadas, obtenidas))
+            grabadora.limpiar()
+
+        with self._abrir() as datos:
+            for _, _, tipo, cuerpo in _registros(datos, len(MAGIA), len(datos)):
+                if tipo == SALIDA:
+                    if pendiente is not None:
+                        _, salida, payload = decodificar(tipo, cuerpo)
+                        pendiente[3].append((salida, payload))
+                    continue
+                cerrar_pendiente()
+                pendiente = None
+                if len(diferencias) >= limite:
+                    break
+                if tipo == CATALOGO:
+                    m = maquina_desde_foto({"catalogo": decodificar(tipo, cuerpo)}, grabadora.funciones)
+                elif tipo == ESTADO:
+                    m = maquina_desde_foto(decodificar(tipo, cuerpo), grabadora.funciones)
+                elif tipo == RESET:
+                    eventos += 1
+                    m._reset()
+                elif tipo == ENTRADA:
+                    eventos += 1
+                    _, entrada, valor = decodificar(tipo, cuerpo)
+                    pendiente = (eventos, entrada, valor, [])
+                    m.procesar_entrada(entrada, valor)
+            else:
+                cerrar_pendiente()
+        return diferencias[:limite]
+
+
+# -----------------------------
+# Journal sintético (pruebas y benchmark)
+# -----------------------------
+# Una máquina headless recibe entradas al azar con el mismo reparto que flota_vectorizada
+# Cada 'reponer' eventos se rellena el stock (sin eso, tras unos miles de compras todo queda agotado)
+
+def generar_journal(ruta, eventos, semilla=0, reponer=2_000):
+    import copy
+    from maquina import MaquinaDispensadoraMealy
+    from salidas_headless import funciones_nulas
+
+    rng = random.Random(semilla)
+    m = MaquinaDispensadoraMealy(funciones_nulas, productos=copy.deepcopy(PRODUCTOS))
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    j = Journal(ruta, m.productos, politica="nunca")
+    m.journal = j
+    try:
+        for k in range(eventos):
+            if k % reponer == reponer - 1:
+                # la reposición no pasa por procesar_entrada: queda en el journal como foto
+                for code in m.productos:
+                    m.inventario.actualizar(code, stock=PRODUCTOS[code]["stock"])
+                j.registrar_estado(foto(m))
+            entrada, valor = rng.choice(SIMBOLOS_ENTRADA)
+            m.procesar_entrada(entrada, valor)
+    finally:
+        j.cerrar()
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce un journal de la máquina")
+    parser.add_argument("journal", help="ruta del journal (ej. journal_maquina.bin)")
+    parser.add_argument("--cada", type=int, default=10_000, help="eventos entre puntos de control")
+    parser.add_argument("--en", type=int, help="mostrar el estado después del evento N")
+    parser.add_argument("--historial", metavar="A:B", help="mostrar los registros de los eventos A..B")
+    parser.add_argument("--comparar", action="store_true",
+                        help="repetir con la lógica actual y comparar las salidas registradas")
+    parser.add_argument("--generar", type=int, metavar="N", help="crear un journal sintético de N entradas")
+    args = parser.parse_args()
+
+    if args.generar:
+        t0 = time.perf_counter()
+        generar_journal(args.journal, args.generar)
+        print(f"journal sintético: {args.generar} entradas en {time.perf_counter() - t0:.2f} s")
+
+    r = Reproductor(args.journal, cada=args.cada)
+    ya_indexados = r.eventos
+    t0 = time.perf_counter()
+    total = r.indexar()
+    dt = time.perf_counter() - t0
+    nuevos = total - ya_indexados
+    ritmo = f"{nuevos / dt:,.0f} eventos/s" if nuevos and dt else "sin eventos nuevos"
+    print(f"{total} eventos, {len(r.puntos)} puntos de control ({ritmo})")
+
+    if args.en is not None:
+        t0 = time.perf_counter()
+        catalogo, estado = r.estado_en(args.en)
+        print(f"estado después del evento {args.en} ({(time.perf_counter() - t0) * 1000:.1f} ms):")
+        print(json.dumps(estado, ensure_ascii=False, indent=2))
+        print("stock:", {code: prod["stock"] for code, prod in catalogo.items()})
+
+    if args.historial:
+        desde, hasta = (int(x) for x in args.historial.split(":"))
+        for n, tipo, datos in r.historial(desde, hasta):
+            if tipo == ENTRADA:
+                print(f"{n:>10}  entrada  {datos[1].name} {datos[2] if datos[2] is not None else ''}")
+            elif tipo == SALIDA:
+                print(f"{n:>10}    salida {datos[1].name} {datos[2] if datos[2] is not None else ''}")
+            elif tipo == RESET:
+                print(f"{n:>10}  reset")
+            elif tipo == ESTADO:
+                print(f"{n:>10}  foto")
+
+    if args.comparar:
+        diferencias = r.comparar()
+        if not diferencias:
+            print("comparación: las salidas coinciden con las registradas")
+        for n, entrada, valor, esperadas, obtenidas in diferencias:
+            print(f"evento {n} ({entrada.name} {valor}):")
+            print("  registradas:", [(s.name, p) for s, p in esperadas])
+            print("  obtenidas:  ", [(s.name, p) for s, p in obtenidas])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,38 @@
 # salidas.py
-from definiciones import Output
+from definiciones import (
+    Output, RETARDO_MENSAJE_MS, RETARDO_CAMBIO_MS, RETARDO_PANTALLA_GRAFO_MS, DURACION_CAIDA_MS,
+)
+import functools
 import os
 import tkinter as tk
 
-# forzar ruta de Graphviz
-os.environ["PATH"] += os.pathsep + r"C:\Program Files\Graphviz\bin"
+from animacion import AnimacionLineal
+from cache_render import renderizar_cacheado
+from especificacion import fuente_dot
 
 # Graphviz libreria para generar el grafo
-try:
-    from graphviz import Digraph
-    _GRAPHVIZ_OK = True
-except Exception:
-    _GRAPHVIZ_OK = False
-    print("[salidas] aviso: graphviz no disponible.")
+# Se importa la primera vez que se genera un grafo, no al arrancar: el import de graphviz cuesta
+# más que toda la máquina de estados y la ventana no lo necesita para mostrarse
+# En ese momento se agrega al PATH la carpeta típica de Graphviz en Windows (ahí está 'dot')
+RUTA_GRAPHVIZ = r"C:\Program Files\Graphviz\bin"
+
+
+def _agregar_graphviz_al_path():
+    path = os.environ.get("PATH", "")
+    if RUTA_GRAPHVIZ not in path:
+        os.environ["PATH"] = path + os.pathsep + RUTA_GRAPHVIZ
+
+
+# _graphviz(): graphviz.Source, o None si la librería no está instalada (el aviso sale una sola vez)
+@functools.lru_cache(maxsize=1)
+def _graphviz():
+    _agregar_graphviz_al_path()
+    try:
+        from graphviz import Source
+    except Exception:
+        print("[salidas] aviso: graphviz no disponible.")
+        return None
+    return Source
 
 # -----------------------------
 # REGISTRO DE APP
@@ -39,44 +59,54 @@ def _call_ui(fn):
         print("[salidas] UI no registrada")
 
 
+# _poner(widget, text=...): los textos del display pasan por el planificador de la app
+# (se aplican una vez por evento y solo si cambian, ver planificador_ui.py)
+
+def _poner(widget, **opciones):
+    _app.planificador.poner(widget, **opciones)
+
+
+# Los callbacks diferidos pasan por los temporizadores con nombre de la app (ver temporizadores.py):
+#   "display":        regresar los textos del display a su estado inicial
+#   "bandeja":        limpiar la bandeja y refrescar productos tras devolver cambio
+#   "pantalla_grafo": pasar a PantallaGrafo después de una entrega
+# Un temporizador nuevo reemplaza al anterior con el mismo nombre, y lo que muestra el estado
+# actual de la máquina (SHOW_CODE, SHOW_PRICE, UPDATE_TOTAL) cancela el reset pendiente del display
+
+def _programar(nombre, ms, fn):
+    _app.temporizadores.programar(nombre, ms, fn)
+
+
+def _display_vigente():
+    _app.temporizadores.cancelar("display")
+
+
 # -----------------------------
 # Generar grafo PNG
 # -----------------------------
-# Esta función construye y exporta un grafo de estados de la máquina expendedora
-# Usa Graphviz para definir nodos (estados) y aristas (transiciones)
-# Cada estado se dibuja con un color distinto para facilitar la lectura
-# Las transiciones muestran la entrada y la salida asociada
-# El grafo se guarda como archivo PNG en la ruta indicada
+# Esta función exporta el grafo de estados de la máquina expendedora
+# El DOT sale de maquina_spec.json (especificacion.fuente_dot), la misma especificación con la que
+# se compila la tabla de transiciones de la máquina: el dibujo ya no puede quedar desfasado
+# Cada estado se dibuja con su color; cada arista lista "ENTRADA [guarda] / SALIDA"
+# El PNG se guarda en la caché de renders (cache_render.py): si el grafo no cambió,
+# se regresa el archivo ya generado sin volver a ejecutar 'dot'
 # Parámetros: nombre_archivo: nombre base del archivo de salida (por defecto "grafo_estados")
+#             conteo: maquina.conteo (copia) para dibujar el mapa de calor de transiciones usadas
 # Retorna: Ruta del archivo PNG generado, o None si ocurre un error
 
-def generar_grafo_png(nombre_archivo="grafo_estados"):
-    if not _GRAPHVIZ_OK:
+# El grafo se arma una sola vez por proceso (la especificación se lee una vez)
+@functools.lru_cache(maxsize=1)
+def _grafo_estados():
+    return _graphviz()(fuente_dot())
+
+
+def generar_grafo_png(nombre_archivo="grafo_estados", conteo=None):
+    Source = _graphviz()
+    if Source is None:
         return None
     try:
-        dot = Digraph(comment="Máquina Expendedora")
-        dot.attr(dpi="800")
-        dot.attr(rankdir="LR", size="8,5")
-
-        # Estados con colores
-        dot.node("INICIO", shape="circle", style="filled", fillcolor="lightblue")
-        dot.node("BUILD_CODE", shape="circle", style="filled", fillcolor="lightgreen")
-        dot.node("ESPERANDO_DINERO", shape="circle", style="filled", fillcolor="yellow")
-        dot.node("PROCESSING", shape="circle", style="filled", fillcolor="orange")
-        dot.node("FIN", shape="circle", style="filled", fillcolor="red")
-
-        # Transiciones
-        dot.edge("INICIO", "BUILD_CODE", label="LETRA / SHOW_CODE")
-        dot.edge("BUILD_CODE", "ESPERANDO_DINERO", label="NUMERO / SHOW_PRICE")
-        dot.edge("ESPERANDO_DINERO", "ESPERANDO_DINERO", label="INSERT_x / UPDATE_TOTAL")
-        dot.edge("ESPERANDO_DINERO", "PROCESSING", label="CONFIRMAR / DELIVER")
-        dot.edge("ESPERANDO_DINERO", "INICIO", label="CANCELAR / RETURN_CHANGE", style="dashed")
-        dot.edge("PROCESSING", "FIN", label="entrega / DELIVER")
-        dot.edge("FIN", "INICIO", label="reset / SHOW_CODE")
-
-        output_path = os.path.abspath(nombre_archivo)
-        rendered = dot.render(output_path, format="png", cleanup=True)
-        return rendered
+        dot = _grafo_estados() if conteo is None else Source(fuente_dot(conteo=conteo))
+        return renderizar_cacheado(dot, nombre_archivo, "png")
     except Exception as e:
         print("[salidas] generar_grafo_png error:", e)
         return None
@@ -95,18 +125,19 @@ def show_code(machine):
 
     def fn():
         main = _app.frames["PantallaMain"]
+        _display_vigente()
 
         # izquierda → código grande
-        main.display_code_label.config(text=code)
+        _poner(main.display_code_label, text=code)
 
         # derecha → nombre/estado del producto
         prod = machine.selected_product
         if prod:
-            main.info_label.config(
+            _poner(main.info_label,
                 text=f"{prod['nombre']}\nPrecio: ${prod['precio']}"
             )
         else:
-            main.info_label.config(text="Esperando número…")
+            _poner(main.info_label, text="Esperando número…")
 
     _call_ui(fn)
 
@@ -126,10 +157,11 @@ def show_price(machine, payload=None):
 
     def fn():
         main = _app.frames["PantallaMain"]
+        _display_vigente()
 
-        main.display_code_label.config(text=machine.selected_code or "--")
+        _poner(main.display_code_label, text=machine.selected_code or "--")
 
-        main.info_label.config(
+        _poner(main.info_label,
             text=f"Producto: {nombre}\n"
                  f"Precio: ${precio}\n"
                  f"Crédito actual: ${machine.credito}"
@@ -150,16 +182,17 @@ def show_price(machine, payload=None):
 def update_total(machine, payload=None):
     def fn():
         main = _app.frames["PantallaMain"]
+        _display_vigente()
 
         prod = machine.selected_product
         if prod:
-            main.info_label.config(
+            _poner(main.info_label,
                 text=f"Producto: {prod['nombre']}\n"
                      f"Precio: ${prod['precio']}\n"
                      f"Crédito actual: ${machine.credito}"
             )
         else:
-            main.info_label.config(text=f"Crédito actual: ${machine.credito}")
+            _poner(main.info_label, text=f"Crédito actual: ${machine.credito}")
 
     _call_ui(fn)
 
@@ -179,14 +212,14 @@ def show_message(machine, payload=None):
     def fn():
         main = _app.frames["PantallaMain"]
 
-        main.info_label.config(text=msg)
-        main.display_code_label.config(text="--")
+        _poner(main.info_label, text=msg)
+        _poner(main.display_code_label, text="--")
 
-        _app.root.after(
-            1500,
+        _programar(
+            "display", RETARDO_MENSAJE_MS,
             lambda: (
-                main.display_code_label.config(text="--"),
-                main.info_label.config(text="Seleccione un producto…")
+                _poner(main.display_code_label, text="--"),
+                _poner(main.info_label, text="Seleccione un producto…")
             )
         )
 
@@ -212,8 +245,9 @@ def deliver(machine, payload=None):
         main = _app.frames["PantallaMain"]
 
         # Mostrar mensaje inicial
-        main.display_code_label.config(text=machine.selected_code or "--")
-        main.info_label.config(
+        _display_vigente()
+        _poner(main.display_code_label, text=machine.selected_code or "--")
+        _poner(main.info_label,
             text=f"Entregando {nombre}...\nCambio: ${cambio}"
         )
 
@@ -229,118 +263,106 @@ def deliver(machine, payload=None):
         canvas.create_rectangle(8, bandeja_y+30, 192, bandeja_y+42,
                                 fill="#777", outline="#444")
 
-        # Obtener imagen del producto desde cache en PantallaMain
-        img = main.product_images.get(machine.selected_code)
-        img_placeholder = img is None
+        # Obtener imagen del producto desde la caché de miniaturas (la misma de la grilla)
+        img = main.foto_producto(machine.selected_code)
 
         # Posición inicial y parámetros animación
+        # La caída dura DURACION_CAIDA_MS: el producto se crea una sola vez y se mueve según el tiempo
         y = -40
         x = int(canvas.winfo_reqwidth() / 2) if canvas.winfo_reqwidth() else 110
         end_y = 40
-        step = 6
 
-        def anim():
-            nonlocal y
+        producto = None
+        if img is not None:
+            try:
+                producto = canvas.create_image(x, y, image=img, anchor="n")
+            except Exception as e:
+                # en caso de error con la imagen, dibujar placeholder
+                print("[deliver] error al dibujar imagen:", e)
+        if producto is None:
+            # rectángulo de respaldo
+            producto = canvas.create_rectangle(x-40, y, x+40, y+40,
+                                               fill="#f39c12", outline="#c87f0a")
+
+        def fin_animacion():
+            # Fin animación
+            _poner(main.info_label,
+                text=f"Compra exitosa!\nCambio: ${cambio}\nGenerando grafo..."
+            )
+            _programar("pantalla_grafo", RETARDO_PANTALLA_GRAFO_MS, lambda: _app.mostrar_pantalla("PantallaGrafo"))
+
+            # refrescar productos (usar el método del frame)
+            try:
+                _app.frames["PantallaMain"].refresh_products()
+            except Exception:
+                print("[deliver] no se pudo refrescar productos")
+
+            # Generar el grafo y preparar su imagen en segundo plano (Tk no se congela);
+            # al terminar se carga en PantallaGrafo desde el hilo de Tk
+            # Es el grafo sin contadores: sale de la caché de renders sin lanzar 'dot'. El mapa de calor
+            # cambia con cada compra (un render nuevo cada vez), así que solo se dibuja con VER GRAFO
+            from pantalla_grafo import preparar_grafo
+            _app.ejecutor.enviar(preparar_grafo,
+                                 al_terminar=grafo_listo, al_fallar=grafo_fallo)
+
+        def restablecer():
+            # no se pudo generar o mostrar el grafo: solo resetear y limpiar
+            _app.temporizadores.cancelar("pantalla_grafo")
+            try:
+                machine._reset()
+            except Exception:
+                pass
             canvas.delete("all")
-            # bandeja visible
-            canvas.create_rectangle(8, bandeja_y+30, 192, bandeja_y+42,
-                                    fill="#777", outline="#444")
-            if img_placeholder:
-                # rectángulo de respaldo
-                canvas.create_rectangle(x-40, y, x+40, y+40,
-                                        fill="#f39c12", outline="#c87f0a")
-            else:
-                # mostrar la imagen (PhotoImage)
-                try:
-                    canvas.create_image(x, y, image=img, anchor="n")
-                except Exception as e:
-                    # en caso de error con la imagen, dibujar placeholder
-                    print("[deliver] error al dibujar imagen:", e)
-                    canvas.create_rectangle(x-40, y, x+40, y+40,
-                                            fill="#f39c12", outline="#c87f0a")
-
-            y += step
-            if y < end_y:
-                _app.root.after(30, anim)
-            else:
-                # Fin animación
-                main.info_label.config(
-                    text=f"Compra exitosa!\nCambio: ${cambio}\nGenerando grafo..."
-                )
-                _app.root.after(5000, lambda: _app.mostrar_pantalla("PantallaGrafo"))
-
-                # refrescar productos (usar el método del frame)
+            _poner(main.display_code_label, text="--")
+            _poner(main.info_label, text="Seleccione un producto…")
+
+        def grafo_listo(img):
+            if img is None:
+                restablecer()
                 try:
                     _app.frames["PantallaMain"].refresh_products()
                 except Exception:
-                    print("[deliver] no se pudo refrescar productos")
-
-                # Intentar generar el grafo y mostrar el frame PantallaGrafo
-                try:
-                    ruta_grafo = generar_grafo_png("grafo_estados")
-                    if ruta_grafo and os.path.exists(ruta_grafo):
-                        # cargar imagen en PantallaGrafo y mostrarla
-                        try:
-                            _app.frames["PantallaGrafo"].cargar_imagen(ruta_grafo)
-
-                            # buscar el botón "Volver" en los hijos de PantallaGrafo y reasignar su comando
-                            pg = _app.frames["PantallaGrafo"]
-                            for child in pg.winfo_children():
-                                # comparamos texto si es Button
-                                if isinstance(child, tk.Button) and child.cget("text").lower() == "volver":
-                                    def on_volver(cb_pg=pg):
-                                        # limpiar canvas de main, resetear máquina y volver a main
-                                        try:
-                                            _app.frames["PantallaMain"].producto_canvas.delete("all")
-                                        except Exception:
-                                            pass
-                                        try:
-                                            machine._reset()
-                                        except Exception:
-                                            pass
-                                        _app.frames["PantallaMain"].display_code_label.config(text="--")
-                                        _app.frames["PantallaMain"].info_label.config(text="Seleccione un producto…")
-                                        try:
-                                            _app.frames["PantallaMain"].refresh_products()
-                                        except Exception:
-                                            pass
-                                        _app.mostrar_pantalla("PantallaMain")
-                                    child.config(command=on_volver)
-                                    break
-                        except Exception as e:
-                            print("[deliver] error mostrando PantallaGrafo:", e)
-                            # fallback: resetear y limpiar
+                    pass
+                return
+            try:
+                # cargar imagen en PantallaGrafo y mostrarla (se construye aquí si es la primera vez)
+                pg = _app.obtener_pantalla("PantallaGrafo")
+                pg.mostrar_imagen(img)
+
+                # buscar el botón "Volver" en los hijos de PantallaGrafo y reasignar su comando
+                for child in pg.winfo_children():
+                    # comparamos texto si es Button
+                    if isinstance(child, tk.Button) and child.cget("text").lower() == "volver":
+                        def on_volver(cb_pg=pg):
+                            # limpiar canvas de main, resetear máquina y volver a main
+                            try:
+                                _app.frames["PantallaMain"].producto_canvas.delete("all")
+                            except Exception:
+                                pass
                             try:
                                 machine._reset()
                             except Exception:
                                 pass
-                            canvas.delete("all")
-                            main.display_code_label.config(text="--")
-                            main.info_label.config(text="Seleccione un producto…")
-                    else:
-                        # no se pudo generar grafo: solo resetear
-                        try:
-                            machine._reset()
-                        except Exception:
-                            pass
-                        canvas.delete("all")
-                        main.display_code_label.config(text="--")
-                        main.info_label.config(text="Seleccione un producto…")
-                        try:
-                            _app.frames["PantallaMain"].refresh_products()
-                        except Exception:
-                            pass
-                except Exception as e:
-                    print("[deliver] Error generando o mostrando grafo:", e)
-                    try:
-                        machine._reset()
-                    except Exception:
-                        pass
-                    canvas.delete("all")
-                    main.display_code_label.config(text="--")
-                    main.info_label.config(text="Seleccione un producto…")
-
-        anim()
+                            _poner(_app.frames["PantallaMain"].display_code_label, text="--")
+                            _poner(_app.frames["PantallaMain"].info_label, text="Seleccione un producto…")
+                            try:
+                                _app.frames["PantallaMain"].refresh_products()
+                            except Exception:
+                                pass
+                            _app.mostrar_pantalla("PantallaMain")
+                        child.config(command=on_volver)
+                        break
+            except Exception as e:
+                print("[deliver] error mostrando PantallaGrafo:", e)
+                restablecer()
+
+        def grafo_fallo(error):
+            print("[deliver] Error generando o mostrando grafo:", error)
+            restablecer()
+
+        # estadísticas de cuadros en animacion.ULTIMAS
+        AnimacionLineal(_app.temporizadores, canvas, [producto], dy=end_y - y,
+                        duracion_ms=DURACION_CAIDA_MS, al_terminar=fin_animacion).iniciar()
 
     _call_ui(fn)
 
@@ -362,8 +384,8 @@ def return_change(machine, payload=None):
     def fn():
         main = _app.frames["PantallaMain"]
 
-        main.display_code_label.config(text="--")
-        main.info_label.config(text=f"Operación cancelada\nCambio: ${amount}")
+        _poner(main.display_code_label, text="--")
+        _poner(main.info_label, text=f"Operación cancelada\nCambio: ${amount}")
 
         canvas = main.producto_canvas
         try:
@@ -373,13 +395,18 @@ def return_change(machine, payload=None):
         except Exception:
             pass
 
-        _app.root.after(
-            2000,
+        _programar(
+            "display", RETARDO_CAMBIO_MS,
             lambda: (
                 (machine._reset() if hasattr(machine, "_reset") else None),
+                _poner(main.display_code_label, text="--"),
+                _poner(main.info_label, text="Seleccione un producto…"),
+            )
+        )
+        _programar(
+            "bandeja", RETARDO_CAMBIO_MS,
+            lambda: (
                 (getattr(_app.frames["PantallaMain"], "refresh_products", lambda: None)()),
-                main.display_code_label.config(text="--"),
-                main.info_label.config(text="Seleccione un producto…"),
                 (canvas.delete("all") if canvas else None)
             )
         )
@@ -0,0 +1,153 @@
+# salidas_headless.py
+from definiciones import (
+    Output, RETARDO_MENSAJE_MS, RETARDO_CAMBIO_MS, RETARDO_PANTALLA_GRAFO_MS, DURACION_CAIDA_MS,
+)
+
+# -----------------------------
+# Salidas sin interfaz (modo headless)
+# -----------------------------
+# Backends de salida para correr la máquina en simulaciones masivas
+# Este módulo NO importa tkinter, PIL ni graphviz: el costo queda solo en la máquina de estados
+# Uso:
+#   MaquinaDispensadoraMealy(funciones_nulas)              → descarta todas las salidas
+#   grabadora = GrabadoraSalidas()
+#   MaquinaDispensadoraMealy(grabadora.funciones)          → guarda tuplas (Output, payload)
+#   salidas = SalidasTemporizadas(temporizadores)
+#   MaquinaDispensadoraMealy(salidas.funciones)            → display simulado con los tiempos de la UI
+#
+# En la UI, la máquina se resetea cuando termina la animación de entrega (ver salidas.deliver)
+# Aquí no hay animación, así que DELIVER resetea la máquina en el momento
+#
+# Para reproducir un journal se usa funciones_inertes (o GrabadoraSalidas(resetear=False)):
+# ahí los resets ya vienen registrados en el journal y se aplican en el mismo punto en que ocurrieron
+
+
+def _nada(machine, payload=None):
+    pass
+
+
+def _fin_entrega(machine, payload=None):
+    machine._reset()
+
+
+# Diccionario con la misma forma que salidas.funciones_salidas, pero sin efectos
+funciones_nulas = {salida: _nada for salida in Output}
+funciones_nulas[Output.DELIVER] = _fin_entrega
+
+# Igual, pero DELIVER tampoco hace nada (reproducción de journals)
+funciones_inertes = {salida: _nada for salida in Output}
+
+
+# -----------------------------
+# GrabadoraSalidas → registro compacto en memoria
+# -----------------------------
+# registro: lista de tuplas (Output, payload) en el orden en que se emitieron
+# funciones: diccionario Output → handler listo para pasarse a la máquina
+
+class GrabadoraSalidas:
+    def __init__(self, resetear=True):
+        self.resetear = resetear
+        self.registro = []
+        self.funciones = {salida: self._grabador(salida) for salida in Output}
+
+    def _grabador(self, salida):
+        guardar = self.registro.append
+
+        if salida is Output.DELIVER and self.resetear:
+            def fn(machine, payload=None):
+                guardar((salida, payload))
+                machine._reset()
+        else:
+            def fn(machine, payload=None):
+                guardar((salida, payload))
+        return fn
+
+    def limpiar(self):
+        self.registro.clear()
+
+
+# -----------------------------
+# SalidasTemporizadas → la UI sin widgets, con sus tiempos
+# -----------------------------
+# Reproduce lo que hace salidas.py con el display (codigo / info) y sus resets diferidos,
+# usando los mismos temporizadores con nombre y los mismos retardos de definiciones.py
+# Con un reloj.RelojVirtual, un flujo completo (animación de entrega, paso a PantallaGrafo,
+# resets del display) se simula sin esperas reales
+# Tras una entrega, al pasar a PantallaGrafo se hace lo que hace el botón "Volver": resetear la máquina
+#
+# entregas: compras que terminaron todo el flujo; devoluciones: cancelaciones con cambio devuelto
+
+INICIO_INFO = "Seleccione un producto…"
+
+
+class SalidasTemporizadas:
+    def __init__(self, temporizadores):
+        self.temporizadores = temporizadores
+        self.codigo = "--"
+        self.info = INICIO_INFO
+        self.entregas = 0
+        self.devoluciones = 0
+        self.funciones = {
+            Output.SHOW_CODE: self._show_code,
+            Output.SHOW_PRICE: self._show_price,
+            Output.UPDATE_TOTAL: self._update_total,
+            Output.DELIVER: self._deliver,
+            Output.RETURN_CHANGE: self._return_change,
+            Output.SHOW_MESSAGE: self._show_message,
+            Output.SHOW_CHANGE: self._return_change,
+        }
+
+    def _display_inicial(self):
+        self.codigo = "--"
+        self.info = INICIO_INFO
+
+    def _show_code(self, machine):
+        self.temporizadores.cancelar("display")
+        self.codigo = machine.selected_code or machine.codigo_buffer or "--"
+        prod = machine.selected_product
+        self.info = f"{prod['nombre']}\nPrecio: ${prod['precio']}" if prod else "Esperando número…"
+
+    def _show_price(self, machine, payload=None):
+        self.temporizadores.cancelar("display")
+        self.codigo = machine.selected_code or "--"
+        self.info = f"Producto: {payload['nombre']}\nPrecio: ${payload['precio']}\nCrédito actual: ${machine.credito}"
+
+    def _update_total(self, machine, payload=None):
+        self.temporizadores.cancelar("display")
+        prod = machine.selected_product
+        if prod:
+            self.info = f"Producto: {prod['nombre']}\nPrecio: ${prod['precio']}\nCrédito actual: ${machine.credito}"
+        else:
+            self.info = f"Crédito actual: ${machine.credito}"
+
+    def _show_message(self, machine, payload=None):
+        self.codigo = "--"
+        self.info = payload
+        self.temporizadores.programar("display", RETARDO_MENSAJE_MS, self._display_inicial)
+
+    def _return_change(self, machine, payload=None):
+        self.codigo = "--"
+        self.info = f"Operación cancelada\nCambio: ${payload}"
+        self.devoluciones += 1
+
+        def fin():
+            machine._reset()
+            self._display_inicial()
+        self.temporizadores.programar("display", RETARDO_CAMBIO_MS, fin)
+
+    def _deliver(self, machine, payload=None):
+        self.temporizadores.cancelar("display")
+        self.codigo = machine.selected_code or "--"
+        self.info = f"Entregando {payload['nombre']}...\nCambio: ${payload['cambio']}"
+
+        def volver():
+            # PantallaGrafo + botón "Volver" en un solo paso
+            machine._reset()
+            self._display_inicial()
+            self.entregas += 1
+
+        def fin_animacion():
+            self.info = f"Compra exitosa!\nCambio: ${payload['cambio']}\nGenerando grafo..."
+            self.temporizadores.programar("pantalla_grafo", RETARDO_PANTALLA_GRAFO_MS, volver)
+
+        self.temporizadores.programar("animacion", DURACION_CAIDA_MS, fin_animacion)
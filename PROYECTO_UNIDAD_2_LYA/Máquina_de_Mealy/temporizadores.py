@@ -0,0 +1,88 @@
+# temporizadores.py
+import heapq
+import itertools
+
+# -----------------------------
+# Registro de temporizadores con nombre
+# -----------------------------
+# Cada temporizador tiene un nombre ("display", "inactividad", "animacion"...)
+# programar(nombre, ms, fn) reemplaza al que ya tuviera ese nombre: un reset viejo del display
+# ya no puede dispararse después y pisar lo que se mostró mientras tanto
+# cancelar(nombre) lo quita; pendiente(nombre) dice si sigue programado
+#
+# Todos comparten un solo callback del reloj: se guardan en un heap por hora de vencimiento y el
+# tick se programa para el primero que vence. Al reemplazar o cancelar, la entrada vieja se
+# queda en el heap marcada como vieja (no coincide su número de secuencia) y se descarta al salir
+#
+# reloj: reloj.RelojTk(root) en la interfaz, reloj.RelojVirtual() en simulaciones y pruebas
+
+class Temporizadores:
+    def __init__(self, reloj):
+        self.reloj = reloj
+        self._heap = []         # (vence, secuencia, nombre)
+        self._activos = {}      # nombre → (vence, secuencia, fn)
+        self._secuencia = itertools.count()
+        self._tick = None
+        self._tick_vence = None
+        self.disparados = 0
+
+    def programar(self, nombre, ms, fn):
+        vence = self.reloj.ahora_ms() + ms
+        secuencia = next(self._secuencia)
+        self._activos[nombre] = (vence, secuencia, fn)
+        heapq.heappush(self._heap, (vence, secuencia, nombre))
+        self._reprogramar_tick()
+
+    def cancelar(self, nombre):
+        self._activos.pop(nombre, None)
+
+    def cancelar_todos(self):
+        self._activos.clear()
+        self._heap.clear()
+        self._reprogramar_tick()
+
+    def pendiente(self, nombre):
+        return nombre in self._activos
+
+    def restante_ms(self, nombre):
+        activo = self._activos.get(nombre)
+        return None if activo is None else max(0.0, activo[0] - self.reloj.ahora_ms())
+
+    def _primero(self):
+        # Descarta entradas de temporizadores cancelados o reemplazados
+        heap = self._heap
+        while heap:
+            vence, secuencia, nombre = heap[0]
+            activo = self._activos.get(nombre)
+            if activo is not None and activo[1] == secuencia:
+                return vence
+            heapq.heappop(heap)
+        return None
+
+    def _reprogramar_tick(self):
+        vence = self._primero()
+        if vence == self._tick_vence:
+            return
+        if self._tick is not None:
+            self.reloj.cancelar(self._tick)
+            self._tick = None
+        self._tick_vence = vence
+        if vence is not None:
+            self._tick = self.reloj.despues(vence - self.reloj.ahora_ms(), self._disparar)
+
+    def _disparar(self):
+        self._tick = None
+        self._tick_vence = None
+        ahora = self.reloj.ahora_ms()
+        while True:
+            vence = self._primero()
+            if vence is None or vence > ahora:
+                break
+            _, _, nombre = heapq.heappop(self._heap)
+            _, _, fn = self._activos.pop(nombre)
+            self.disparados += 1
+            try:
+                fn()
+            except Exception as e:
+                print(f"[temporizadores] error en '{nombre}':", e)
+        self._reprogramar_tick()
@@ -0,0 +1,102 @@
+# trabajos.py
+import queue
+import time
+
+# -----------------------------
+# Ejecutor en segundo plano para trabajo bloqueante
+# -----------------------------
+# Tkinter no es seguro entre hilos: solo el hilo principal puede tocar widgets
+# Aquí el trabajo pesado (ejecutar 'dot', abrir/redimensionar imágenes con PIL) corre en hilos,
+# y cuando termina, su resultado se mete en una cola
+# El hilo de Tk revisa la cola con root.after cada 'intervalo_ms' mientras haya trabajos pendientes
+# y ejecuta ahí los callbacks (al_terminar / al_fallar), que ya pueden tocar widgets
+#
+# Latencia del loop de eventos: en cada revisión se mide cuánto se atrasó el after respecto a lo
+# programado; si Tk estuviera bloqueado, ese atraso crece. latencia() regresa el resumen.
+#
+# El pool de hilos (y concurrent.futures) se crea con el primer trabajo, no al construir la app:
+# en el arranque el primer trabajo llega después de la primera pintura (las miniaturas)
+
+class EjecutorFondo:
+    def __init__(self, root, hilos=2, intervalo_ms=15):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self.hilos = hilos
+        self._pool = None
+        self._listos = queue.SimpleQueue()
+        self._pendientes = 0
+        self._sondeo = None
+        self._esperado = 0.0
+
+        # estadísticas de latencia del loop de eventos (en segundos)
+        self._lat_muestras = 0
+        self._lat_total = 0.0
+        self._lat_max = 0.0
+
+    # enviar(fn, *args, al_terminar=cb, al_fallar=cb_error)
+    # fn corre en un hilo del pool; al_terminar(resultado) o al_fallar(excepcion) corren en el hilo de Tk
+    def enviar(self, fn, *args, al_terminar=None, al_fallar=None):
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="fondo")
+        self._pendientes += 1
+        futuro = self._pool.submit(fn, *args)
+        futuro.add_done_callback(
+            lambda f: self._listos.put((f, al_terminar, al_fallar))
+        )
+        if self._sondeo is None:
+            self._programar_sondeo()
+
+    def _programar_sondeo(self):
+        self._esperado = time.perf_counter() + self.intervalo_ms / 1000
+        self._sondeo = self.root.after(self.intervalo_ms, self._sondear)
+
+    def _sondear(self):
+        atraso = max(0.0, time.perf_counter() - self._esperado)
+        self._lat_muestras += 1
+        self._lat_total += atraso
+        self._lat_max = max(self._lat_max, atraso)
+
+        while True:
+            try:
+                futuro, al_terminar, al_fallar = self._listos.get_nowait()
+            except queue.Empty:
+                break
+            self._pendientes -= 1
+            error = futuro.exception()
+            try:
+                if error is None:
+                    if al_terminar:
+                        al_terminar(futuro.result())
+                elif al_fallar:
+                    al_fallar(error)
+                else:
+                    print("[trabajos] error en segundo plano:", error)
+            except Exception as e:
+                print("[trabajos] error en callback:", e)
+
+        self._sondeo = None
+        if self._pendientes > 0:
+            self._programar_sondeo()
+
+    def pendientes(self):
+        return self._pendientes
+
+    def latencia(self):
+        # Resumen en milisegundos del atraso del loop de Tk mientras hubo trabajos en curso
+        n = self._lat_muestras
+        return {
+            "muestras": n,
+            "media_ms": (self._lat_total / n * 1000) if n else 0.0,
+            "max_ms": self._lat_max * 1000,
+        }
+
+    def cerrar(self):
+        if self._sondeo is not None:
+            try:
+                self.root.after_cancel(self._sondeo)
+            except Exception:
+                pass
+            self._sondeo = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
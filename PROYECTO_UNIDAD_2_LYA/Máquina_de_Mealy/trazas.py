@@ -0,0 +1,269 @@
+# trazas.py
+import functools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from maquina import _enlazar
+
+# -----------------------------
+# Línea de tiempo en formato Chrome Trace Event (opcional)
+# -----------------------------
+# Para saber a dónde se va el tiempo cuando la UI se traba (dot, PIL, refresh_products, cuadros de la
+# animación...) se registra cada llamada como un evento "X" (inicio + duración) con el hilo en que corrió
+# El archivo .json se abre en chrome://tracing o en https://ui.perfetto.dev
+#
+# Qué se envuelve:
+#   instalar_tk():          todos los callbacks de Tk (root.after / after_idle, command= de botones, bind)
+#   instrumentar_maquina(): procesar_entrada (con estado y entrada) y cada handler de salida
+#   instrumentar_app():     refresh_products, miniaturas, generar_grafo_png, preparar_grafo,
+#                           PantallaGrafo.cargar/preparar/mostrar_imagen y los cuadros de AnimacionLineal
+# quitar() deja todo como estaba
+#
+# Los eventos se escriben por lotes a medida que llegan (formato "JSON Array": el ']' final es opcional),
+# así una prueba larga no acumula memoria y el archivo sirve aunque el proceso se corte
+# Costo en la ruta caliente: dos lecturas de reloj y un append bajo candado; el JSON de cada lote
+# lo arma un hilo escritor, así el hilo de Tk no se detiene a serializar
+#
+# Activación: python main.py --traza traza.json   o   MEALY_TRAZA=traza.json python main.py
+
+LOTE = 512
+
+
+class Trazador:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = open(ruta, "w", encoding="utf-8")
+        self._archivo.write("[\n")
+        self._primero = True
+        self._pendientes = []
+        self._candado = threading.Lock()
+        self._hilos = set()
+        self._cabeceras = {}       # (nombre, categoría) → inicio del JSON del evento
+        self._pid = os.getpid()
+        self._deshacer = []
+        self.eventos = 0
+        # Hilo escritor: recibe lotes llenos y los convierte a JSON fuera del hilo de Tk
+        self._lotes = queue.SimpleQueue()
+        self._escritor = threading.Thread(target=self._escribir_lotes, name="trazas", daemon=True)
+        self._escritor.start()
+
+    # ---------------------------
+    # Registro de eventos
+    # ---------------------------
+    # En la ruta caliente solo se guarda una tupla; cuando hay LOTE se pasa la lista completa al escritor
+    def evento(self, nombre, categoria, inicio_ns, fin_ns, args=None):
+        hilo = threading.get_ident()
+        with self._candado:
+            if hilo not in self._hilos:
+                self._hilos.add(hilo)
+                # metadato "M" con el nombre del hilo: categoría None y el nombre en args
+                self._pendientes.append(("thread_name", None, 0, 0, hilo, threading.current_thread().name))
+            self._pendientes.append((nombre, categoria, inicio_ns, fin_ns, hilo, args))
+            self.eventos += 1
+            if len(self._pendientes) >= LOTE:
+                self._lotes.put(self._pendientes)
+                self._pendientes = []
+
+    def _escribir_lotes(self):
+        while True:
+            lote = self._lotes.get()
+            if lote is None:
+                return
+            try:
+                self._escribir(lote)
+            except Exception as e:
+                print("[trazas] error al escribir:", e)
+
+    def _escribir(self, lote):
+        # Solo desde el hilo escritor. Nombre y categoría se codifican una vez; cada evento es un f-string
+        pid = self._pid
+        cabeceras = self._cabeceras
+        registros = []
+        for nombre, categoria, inicio, fin, hilo, args in lote:
+            if categoria is None:
+                registros.append(json.dumps({"name": nombre, "ph": "M", "pid": pid, "tid": hilo,
+                                             "args": {"name": args}}, ensure_ascii=False))
+                continue
+            cabecera = cabeceras.get((nombre, categoria))
+            if cabecera is None:
+                cabecera = cabeceras[(nombre, categoria)] = (
+                    f'{{"name":{json.dumps(nombre, ensure_ascii=False)},"cat":{json.dumps(categoria)},"ph":"X"'
+                )
+            extra = f',"args":{json.dumps(args, ensure_ascii=False, default=str)}' if args else ""
+            registros.append(f'{cabecera},"ts":{inicio / 1000},"dur":{(fin - inicio) / 1000},'
+                             f'"pid":{pid},"tid":{hilo}{extra}}}')
+        if not registros:
+            return
+        texto = ",\n".join(registros)
+        self._archivo.write((texto if self._primero else ",\n" + texto) + "\n")
+        self._archivo.flush()
+        self._primero = False
+
+    def trazado(self, fn, nombre, categoria, args=None):
+        # fn envuelta: cada llamada es un evento con 'nombre'
+        reloj = time.perf_counter_ns
+        evento = self.evento
+
+        @functools.wraps(fn)
+        def envuelta(*a, **k):
+            t0 = reloj()
+            try:
+                return fn(*a, **k)
+            finally:
+                evento(nombre, categoria, t0, reloj(), args)
+        return envuelta
+
+    # ---------------------------
+    # Instrumentación
+    # ---------------------------
+    def instalar_tk(self):
+        # Se llama antes de crear widgets: los command= y bind se registran al crearlos
+        import tkinter as tk
+        registrar = tk.Misc._register
+        trazador = self
+
+        def register_trazado(widget, func, subst=None, needcleanup=1):
+            # after() registra su envoltorio interno 'callit' con el __name__ de la función programada
+            if getattr(func, "__qualname__", "").endswith("after.<locals>.callit"):
+                nombre = f"after {func.__name__}"
+            else:
+                nombre = _nombre(func)
+            return registrar(widget, trazador.trazado(func, nombre, "tk"), subst, needcleanup)
+
+        tk.Misc._register = register_trazado
+        self._deshacer.append(lambda: setattr(tk.Misc, "_register", registrar))
+
+    def instrumentar_maquina(self, maquina):
+        anterior = vars(maquina).get("procesar_entrada")
+        original = maquina.procesar_entrada
+        reloj = time.perf_counter_ns
+        evento = self.evento
+
+        def procesar_entrada(entrada, valor=None):
+            args = {"estado": maquina.estado.name, "entrada": getattr(entrada, "name", str(entrada)), "valor": valor}
+            t0 = reloj()
+            try:
+                return original(entrada, valor)
+            finally:
+                args["hacia"] = maquina.estado.name
+                evento("procesar_entrada", "maquina", t0, reloj(), args)
+
+        maquina.procesar_entrada = procesar_entrada
+
+        def deshacer_entrada():
+            if anterior is None:
+                vars(maquina).pop("procesar_entrada", None)
+            else:
+                maquina.procesar_entrada = anterior
+        self._deshacer.append(deshacer_entrada)
+
+        funciones = maquina.funciones
+        maquina.conectar_salidas({
+            salida: self.trazado(_enlazar(fn), getattr(fn, "__name__", salida.name), "salida",
+                                 {"salida": salida.name})
+            for salida, fn in funciones.items()
+        })
+        self._deshacer.append(lambda: maquina.conectar_salidas(funciones))
+
+    def instrumentar_app(self, app):
+        import animacion
+        import interfaz_usuario
+        import pantalla_grafo
+        import salidas
+
+        main = app.frames["PantallaMain"]
+        anterior = vars(main).get("refresh_products")
+        main.refresh_products = self.trazado(main.refresh_products, "refresh_products", "ui")
+
+        def deshacer_refresh():
+            if anterior is None:
+                vars(main).pop("refresh_products", None)
+            else:
+                main.refresh_products = anterior
+        self._deshacer.append(deshacer_refresh)
+
+        for modulo, nombre, categoria in (
+            (salidas, "generar_grafo_png", "grafo"),
+            (pantalla_grafo, "preparar_grafo", "grafo"),
+            (interfaz_usuario, "preparar_miniatura", "imagen"),
+            (interfaz_usuario, "cargar_imagen_producto", "imagen"),
+        ):
+            self._parchear_funcion(modulo, nombre, categoria)
+
+        for clase, nombre, categoria in (
+            (pantalla_grafo.PantallaGrafo, "cargar_imagen", "imagen"),
+            (pantalla_grafo.PantallaGrafo, "preparar_imagen", "imagen"),
+            (pantalla_grafo.PantallaGrafo, "mostrar_imagen", "imagen"),
+            (animacion.AnimacionLineal, "_cuadro", "animacion"),
+        ):
+            self._parchear_metodo(clase, nombre, categoria)
+
+    def _parchear_funcion(self, modulo, nombre, categoria):
+        # La función puede estar importada con 'from x import nombre' en otros módulos del proyecto:
+        # se reemplaza en todos los que tengan el mismo objeto
+        original = getattr(modulo, nombre, None)
+        if original is None:
+            return
+        trazada = self.trazado(original, nombre, categoria)
+        cambiados = []
+        for otro in list(sys.modules.values()):
+            if getattr(otro, nombre, None) is original:
+                setattr(otro, nombre, trazada)
+                cambiados.append(otro)
+
+        def deshacer():
+            for otro in cambiados:
+                setattr(otro, nombre, original)
+        self._deshacer.append(deshacer)
+
+    def _parchear_metodo(self, clase, nombre, categoria):
+        crudo = vars(clase).get(nombre)
+        if crudo is None:
+            return
+        etiqueta = f"{clase.__name__}.{nombre}"
+        if isinstance(crudo, staticmethod):
+            nuevo = staticmethod(self.trazado(crudo.__func__, etiqueta, categoria))
+        else:
+            nuevo = self.trazado(crudo, etiqueta, categoria)
+        setattr(clase, nombre, nuevo)
+        self._deshacer.append(lambda: setattr(clase, nombre, crudo))
+
+    def quitar(self):
+        while self._deshacer:
+            self._deshacer.pop()()
+
+    def cerrar(self):
+        # Quita los envoltorios, escribe lo pendiente y cierra el arreglo JSON
+        self.quitar()
+        with self._candado:
+            pendientes, self._pendientes = self._pendientes, []
+        if self._archivo is None:
+            return
+        self._lotes.put(pendientes)
+        self._lotes.put(None)
+        self._escritor.join()
+        self._archivo.write("]\n")
+        self._archivo.close()
+        self._archivo = None
+
+
+def _nombre(fn):
+    return getattr(fn, "__qualname__", None) or getattr(fn, "__name__", None) or type(fn).__name__
+
+
+# -----------------------------
+# Activación desde main.py
+# -----------------------------
+# ruta_traza(argv): --traza <ruta> en la línea de comandos o la variable MEALY_TRAZA; None si no se pidió
+
+def ruta_traza(argv=None, variable="MEALY_TRAZA"):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--traza" in argv:
+        i = argv.index("--traza")
+        if i + 1 < len(argv):
+            return argv[i + 1]
+    return os.environ.get(variable) or None